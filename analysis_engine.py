@@ -0,0 +1,145 @@
+"""
+One ingestion, one traversal, every report.
+
+The analyzers used to glob, parse and walk the log directory each on
+their own. AnalysisEngine reads the logs once, as one time-ordered
+stream (event_stream.merge_log_files), and hands every batch of events
+to each registered AnalysisPass in turn. A pass keeps its own state
+between batches and prints its report at the end.
+
+Passes see a single global stream: held keys and pending rolls carry
+over from one log file to the next.
+"""
+
+from itertools import islice
+
+from constants import ANALYSIS_BATCH_SIZE
+from event_stream import merge_log_files
+from key_events import KeyTable
+from hrmAnalysis import HRMAnalyzer
+from simpleAnanlysis import KeyHoldStats, build_parser, print_report as print_home_row_report
+from analyze_overlap import ROLL_KEYS, RollTracker, print_report as print_roll_report
+
+
+class AnalysisPass:
+    """
+    One report computed from the shared event stream.
+
+    start(key_table) is called before the first batch, consume(batch) with
+    every list of (timestamp, key_id, is_press) in time order (ids from
+    key_table), and report() once the stream is exhausted.
+    """
+
+    name = None
+
+    def start(self, key_table):
+        self.key_table = key_table
+
+    def consume(self, batch):
+        raise NotImplementedError
+
+    def report(self):
+        raise NotImplementedError
+
+
+class HRMPass(AnalysisPass):
+    """Tap/hold split, activation timing and ZMK config (hrmAnalysis.py)."""
+
+    name = "hrm"
+
+    def __init__(self):
+        self.analyzer = HRMAnalyzer()
+
+    def consume(self, batch):
+        self.analyzer.analyze_events(batch, self.key_table)
+
+    def report(self):
+        self.analyzer.print_statistics()
+        self.analyzer.generate_zmk_config(self.analyzer.calculate_recommendations())
+
+
+class HomeRowPass(AnalysisPass):
+    """Per-key hold statistics and home row thresholds (simpleAnanlysis.py).
+
+    args are simpleAnanlysis options; the defaults are used if omitted.
+    """
+
+    name = "home-row"
+
+    def __init__(self, args=None):
+        self.hold_stats = KeyHoldStats()
+        self.args = args if args is not None else build_parser().parse_args([])
+
+    def consume(self, batch):
+        self.hold_stats.analyze_events(batch, self.key_table)
+
+    def report(self):
+        print_home_row_report(self.hold_stats, self.args)
+
+
+class RollPass(AnalysisPass):
+    """Cross-hand roll overlap (analyze_overlap.py)."""
+
+    name = "overlap"
+
+    def __init__(self, keys=ROLL_KEYS):
+        self.tracker = RollTracker(keys)
+
+    def start(self, key_table):
+        super().start(key_table)
+        self.tracker.start(key_table)
+
+    def consume(self, batch):
+        self.tracker.analyze_events(batch)
+
+    def report(self):
+        print_roll_report(self.tracker.keys, self.tracker.rolls, self.tracker.stats)
+
+
+# Pass classes by name, in report order
+PASSES = {analysis_pass.name: analysis_pass for analysis_pass in (HRMPass, HomeRowPass, RollPass)}
+
+
+class AnalysisEngine:
+    """Dispatches one event stream to every registered pass."""
+
+    def __init__(self, batch_size=ANALYSIS_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.passes = []
+        self.events_analyzed = 0
+        # Timestamp of the last event consumed (None before the first)
+        self.last_timestamp = None
+
+    def register(self, analysis_pass):
+        self.passes.append(analysis_pass)
+        return analysis_pass
+
+    def run(self, events, key_table):
+        """Feed (timestamp, key_id, is_press) events, in time order, to all passes."""
+        self.start(key_table)
+        self.consume(events)
+
+    def start(self, key_table):
+        for analysis_pass in self.passes:
+            analysis_pass.start(key_table)
+
+    def consume(self, events):
+        """Feed more events after start(); they must not precede those already consumed."""
+        events = iter(events)
+        while True:
+            batch = list(islice(events, self.batch_size))
+            if not batch:
+                break
+            self.events_analyzed += len(batch)
+            self.last_timestamp = batch[-1][0]
+            for analysis_pass in self.passes:
+                analysis_pass.consume(batch)
+
+    def run_logs(self, log_files, cache=None, on_error=None):
+        """Read log_files once, merged into one time-ordered stream, and run all passes."""
+        key_table = KeyTable()
+        self.run(merge_log_files(log_files, key_table, cache, on_error), key_table)
+
+    def report(self):
+        for analysis_pass in self.passes:
+            analysis_pass.report()
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Local analysis server that keeps the log corpus analyzed in memory.
+
+Every CLI run pays for interpreter startup, imports and a full reload of
+./log. The server loads the logs once into an AnalysisEngine (HRM, home
+row and cross-hand roll passes) and answers queries over a Unix socket
+(ANALYSIS_SOCKET), so a tuning session gets its reports back without
+re-parsing anything:
+
+    python3 analysis_server.py &
+    python3 hrmAnalysis.py --connect
+    python3 analysis_server.py --query overlap
+
+Every ANALYSIS_POLL_INTERVAL seconds the server scans the log directory.
+New files that start after everything analyzed so far are fed to the
+passes incrementally, the way the logger produces them, and so are the
+lines appended to the live NDJSON session file (the newest one) since
+it was last read. Anything else (a file changed or removed, or one from
+the past, e.g. after "main.py compact") reloads the corpus. Rendered reports are cached until the
+corpus changes, so repeated queries cost one socket round trip.
+
+Protocol: one JSON request per line, {"query": <name>}, answered by one
+JSON line, {"ok": true, "output": <report text>, "data": <JSON data>}
+or {"ok": false, "error": <message>}.
+"""
+
+import io
+import os
+import json
+import time
+import socket
+import argparse
+import threading
+import socketserver
+from contextlib import redirect_stdout
+
+from analysis_engine import AnalysisEngine, HRMPass, HomeRowPass, RollPass
+from analyze_overlap import ROLL_KEYS, cross_hand
+from constants import ANALYSIS_POLL_INTERVAL, ANALYSIS_SOCKET
+from event_cache import EventCache
+from event_stream import first_timestamp, merge_log_files
+from hrmAnalysis import HRM_KEYS
+from key_events import KeyTable
+from log_compression import strip_compression
+from log_reader import find_log_files, read_ndjson_tail
+from log_writer import NDJSON_EXTENSION
+
+LOG_DIR = "./log"
+
+
+def snapshot(log_files):
+    """(size, mtime) of every log file, to detect changes."""
+    files = {}
+    for filepath in log_files:
+        try:
+            stat = os.stat(filepath)
+        except OSError:
+            continue
+        files[filepath] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+
+def newest_ndjson(log_files):
+    """The newest NDJSON file of log_files (their names sort by time), or None."""
+    ndjson_files = [filepath for filepath in log_files
+                    if strip_compression(filepath).endswith(NDJSON_EXTENSION)]
+    return max(ndjson_files) if ndjson_files else None
+
+
+def distribution_summary(distribution):
+    """Count, mean and quantiles (ms) of a sketches.Distribution."""
+    if not distribution:
+        return {"count": 0}
+    return {
+        "count": len(distribution),
+        "mean_ms": distribution.mean * 1000,
+        "min_ms": distribution.min * 1000,
+        "p50_ms": distribution.quantile(0.5) * 1000,
+        "p95_ms": distribution.quantile(0.95) * 1000,
+        "max_ms": distribution.max * 1000,
+    }
+
+
+class Corpus:
+    """The analyzed log corpus, kept up to date with the log directory."""
+
+    def __init__(self, log_dir=LOG_DIR, roll_keys=ROLL_KEYS, cache=None):
+        self.log_dir = log_dir
+        self.roll_keys = roll_keys
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.reload()
+
+    def reload(self):
+        """Analyze every log file from scratch."""
+        started = time.perf_counter()
+        log_files = find_log_files(self.log_dir)
+        self.files = snapshot(log_files)
+        self.engine = AnalysisEngine()
+        self.hrm = self.engine.register(HRMPass())
+        self.home_row = self.engine.register(HomeRowPass())
+        self.rolls = self.engine.register(RollPass(self.roll_keys))
+        self.key_table = KeyTable()
+        # The logger appends to the newest NDJSON file on every flush; the
+        # offset read up to is kept so refreshes read only the new lines
+        self.live, self.live_offset = newest_ndjson(log_files), 0
+        loaded = {}
+        if self.live is not None:
+            loaded[self.live], self.live_offset = read_ndjson_tail(self.live)
+        self.engine.run(merge_log_files(log_files, self.key_table, self.cache, self.report_error, loaded),
+                        self.key_table)
+        self.reports = {}
+        self.updated = time.time()
+        print(f"Loaded {self.engine.events_analyzed} events from {len(self.files)} log files"
+              f" in {time.perf_counter() - started:.2f}s")
+
+    def report_error(self, filepath, error):
+        print(f"Error reading {filepath}: {error}")
+
+    def refresh(self):
+        """Pick up changes in the log directory; returns True if anything changed.
+
+        New files that start after the last analyzed event, and lines
+        appended to the live session file, are analyzed incrementally;
+        any other change reloads the corpus.
+        """
+        current = snapshot(find_log_files(self.log_dir))
+        if current == self.files:
+            return False
+        new_files = sorted(filepath for filepath in current if filepath not in self.files)
+        changed = [filepath for filepath, stat in self.files.items() if current.get(filepath) != stat]
+        grown = (changed == [self.live] and self.live in current
+                 and current[self.live][0] >= self.files[self.live][0])
+        if changed and not grown:
+            self.reload()
+            return True
+
+        # Only the lines appended since the last read of the live file
+        loaded = {}
+        live, live_offset = self.live, self.live_offset
+        if changed:
+            loaded[live], live_offset = read_ndjson_tail(live, live_offset)
+        # A newer NDJSON file means the logger rotated to it
+        newest = newest_ndjson(new_files)
+        if newest is not None and (live is None or newest > live):
+            live = newest
+            loaded[live], live_offset = read_ndjson_tail(live)
+
+        if not self.appends(sorted(set(new_files) | set(loaded)), loaded):
+            self.reload()
+            return True
+        self.engine.consume(merge_log_files(sorted(set(new_files) | set(loaded)), self.key_table,
+                                            self.cache, self.report_error, loaded))
+        self.live, self.live_offset = live, live_offset
+        self.files = current
+        self.reports = {}
+        self.updated = time.time()
+        appended = len(loaded[changed[0]]) if changed else 0
+        print(f"Added {len(new_files)} log files and {appended} appended events"
+              f" ({self.engine.events_analyzed} events)")
+        return True
+
+    def appends(self, filepaths, loaded):
+        """Whether filepaths (read already if in loaded) all start after the last analyzed event."""
+        last = self.engine.last_timestamp
+        if last is None:
+            return False
+        for filepath in filepaths:
+            try:
+                if filepath in loaded:
+                    events = loaded[filepath]
+                    start = min(events.timestamps) if len(events) else None
+                else:
+                    start = first_timestamp(filepath, self.cache)
+            except Exception:
+                return False
+            if start is not None and start < last:
+                return False
+        return True
+
+    def query(self, name):
+        """(output, data) of a query; rendered reports are cached until the corpus changes."""
+        if name not in QUERIES:
+            raise ValueError(f"unknown query '{name}' (choose from {', '.join(QUERIES)})")
+        if name == "status":
+            return "", self.status()
+        if name not in self.reports:
+            output = io.StringIO()
+            with redirect_stdout(output):
+                data = QUERIES[name](self)
+            self.reports[name] = (output.getvalue(), data)
+        return self.reports[name]
+
+    def status(self):
+        return {
+            "log_dir": self.log_dir,
+            "files": len(self.files),
+            "events": self.engine.events_analyzed,
+            "updated": self.updated,
+        }
+
+
+def query_hrm(corpus):
+    analyzer = corpus.hrm.analyzer
+    corpus.hrm.report()
+    return analyzer.calculate_recommendations(quiet=True)
+
+
+def query_recommendations(corpus):
+    analyzer = corpus.hrm.analyzer
+    recommendations = analyzer.calculate_recommendations()
+    analyzer.generate_zmk_config(recommendations)
+    return recommendations
+
+
+def query_stats(corpus):
+    analyzer = corpus.hrm.analyzer
+    analyzer.print_statistics()
+    return {
+        key: {
+            "taps": distribution_summary(analyzer.pure_taps.get(key)),
+            "holds": distribution_summary(analyzer.hrm_holds.get(key)),
+            "activations": distribution_summary(analyzer.hrm_activation_times.get(key)),
+            "all": distribution_summary(analyzer.all_hold_durations.get(key)),
+        }
+        for key in sorted(HRM_KEYS)
+    }
+
+
+def query_home_row(corpus):
+    corpus.home_row.report()
+    return None
+
+
+def query_overlap(corpus):
+    corpus.rolls.report()
+    tracker = corpus.rolls.tracker
+    return {
+        key: {"presses": stats["count"], "overlaps": stats["overlaps"]}
+        for key, stats in tracker.stats.items()
+    }
+
+
+# Query name -> function printing the report and returning its data
+QUERIES = {
+    "hrm": query_hrm,
+    "recommendations": query_recommendations,
+    "stats": query_stats,
+    "home-row": query_home_row,
+    "overlap": query_overlap,
+    "status": None,
+}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        corpus = self.server.corpus
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                with corpus.lock:
+                    output, data = corpus.query(request.get("query"))
+                response = {"ok": True, "output": output, "data": data}
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class AnalysisServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, corpus):
+        self.corpus = corpus
+        super().__init__(socket_path, RequestHandler)
+
+
+def watch(corpus, stop_event, interval=ANALYSIS_POLL_INTERVAL):
+    while not stop_event.wait(interval):
+        try:
+            with corpus.lock:
+                corpus.refresh()
+        except Exception as e:
+            print(f"Error while refreshing the corpus: {e}")
+
+
+def remove_stale_socket(socket_path):
+    """Remove a socket file left by a server that is gone; error if one still answers."""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+    except OSError:
+        os.remove(socket_path)
+        return
+    raise RuntimeError(f"An analysis server is already listening on {socket_path}")
+
+
+def serve(socket_path=ANALYSIS_SOCKET, log_dir=LOG_DIR, roll_keys=ROLL_KEYS, cache=None,
+          interval=ANALYSIS_POLL_INTERVAL):
+    remove_stale_socket(socket_path)
+    corpus = Corpus(log_dir, roll_keys, cache)
+    stop_event = threading.Event()
+    watcher = threading.Thread(target=watch, args=(corpus, stop_event, interval),
+                               name="log-watcher", daemon=True)
+    watcher.start()
+    server = AnalysisServer(socket_path, corpus)
+    print(f"Serving analyses of {log_dir} on {socket_path} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+
+
+def query(name, socket_path=ANALYSIS_SOCKET):
+    """Send one query to a running server and return (output, data).
+
+    Raises OSError if no server is listening and RuntimeError if the
+    server rejects the query.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps({"query": name}).encode("utf-8") + b"\n")
+        with client.makefile("rb") as reader:
+            response = json.loads(reader.readline())
+    if not response["ok"]:
+        raise RuntimeError(response["error"])
+    return response["output"], response["data"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve HRM, home row and roll reports of the keyboard logs over a Unix socket."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument(
+        "--socket",
+        default=ANALYSIS_SOCKET,
+        help="Unix socket to listen on or query (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--keys",
+        default=",".join(ROLL_KEYS),
+        help="Comma-separated keys for the cross-hand roll report (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=ANALYSIS_POLL_INTERVAL,
+        metavar="SECONDS",
+        help="Seconds between scans for new log files (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    parser.add_argument(
+        "--query",
+        choices=list(QUERIES),
+        help="Query a running server instead of starting one"
+    )
+    args = parser.parse_args()
+
+    if args.query:
+        try:
+            output, data = query(args.query, args.socket)
+        except OSError as e:
+            parser.exit(1, f"No analysis server on {args.socket} ({e}); start one with 'python3 analysis_server.py'\n")
+        if output:
+            print(output, end="")
+        else:
+            print(json.dumps(data, indent=2))
+        return
+
+    keys = [key.strip().lower() for key in args.keys.split(",") if key.strip()]
+    for key in keys:
+        if cross_hand(key) is None:
+            parser.error(f"'{key}' is not a key of either hand")
+
+    cache = None if args.no_cache else EventCache()
+    try:
+        serve(args.socket, args.log_dir, keys, cache, args.interval)
+    except RuntimeError as e:
+        parser.exit(1, f"{e}\n")
+
+
+if __name__ == "__main__":
+    main()
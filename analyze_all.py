@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Run every analysis in one pass over the keyboard logs.
+
+Equivalent to running hrmAnalysis.py, simpleAnanlysis.py and
+analyze_overlap.py, but the logs are read and parsed once and the
+events are walked once, with all reports computed side by side.
+"""
+
+import argparse
+
+from analysis_engine import PASSES, AnalysisEngine, RollPass
+from analyze_overlap import ROLL_KEYS, cross_hand
+from event_cache import EventCache
+from log_reader import find_log_files
+from profiling import add_profile_arguments, profiler_from_args
+
+LOG_DIR = "./log"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compute the HRM, home row and cross-hand roll reports in one pass."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument(
+        "--passes",
+        default=",".join(PASSES),
+        help="Comma-separated reports to compute (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--keys",
+        default=",".join(ROLL_KEYS),
+        help="Comma-separated keys for the cross-hand roll report (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.passes.split(",") if name.strip()]
+    for name in names:
+        if name not in PASSES:
+            parser.error(f"unknown pass '{name}' (choose from {', '.join(PASSES)})")
+
+    keys = [key.strip().lower() for key in args.keys.split(",") if key.strip()]
+    for key in keys:
+        if cross_hand(key) is None:
+            parser.error(f"'{key}' is not a key of either hand")
+
+    engine = AnalysisEngine()
+    for name, analysis_pass in PASSES.items():
+        if name in names:
+            engine.register(RollPass(keys) if analysis_pass is RollPass else analysis_pass())
+
+    profiler = profiler_from_args(args)
+    with profiler.stage("find_log_files"):
+        log_files = find_log_files(args.log_dir)
+    print(f"Analyzing {len(log_files)} log files...")
+    cache = None if args.no_cache else EventCache()
+    try:
+        # Files are parsed as the merged stream reaches them
+        with profiler.stage("run_passes") as stage:
+            engine.run_logs(log_files, cache,
+                            on_error=lambda filepath, e: print(f"Error reading {filepath}: {e}"))
+            stage.events = engine.events_analyzed
+
+        if not engine.events_analyzed:
+            print("No keyboard log data found!")
+            print("Please run 'python main.py start' first and type the test script.")
+        else:
+            print(f"Analyzed {engine.events_analyzed} keyboard events")
+            with profiler.stage("report", engine.events_analyzed):
+                engine.report()
+    finally:
+        profiler.stop()
+    profiler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Bigram flight times: from the release of one key to the press of the next.
+
+Flight time per key pair is what decides whether a fast roll such as
+"jg" in "jgood" trips a hold-tap: a negative flight means the second key
+went down while the first was still held. BigramMatrix counts every
+pair of consecutive presses in a dense key id x key id matrix and keeps,
+per pair, the moments and extremes of its flight times plus a
+fixed-bucket histogram for quantiles. Everything is built in one
+vectorized pass over the event columns (vector_engine.flight_times,
+needs numpy).
+
+Consecutive presses further apart than MAX_FLIGHT_MS are a pause, not a
+bigram, and are left out.
+"""
+
+import argparse
+
+import numpy as np
+
+from event_cache import EventCache
+from hrmAnalysis import HRM_KEYS, LEFT_HAND_KEYS, RIGHT_HAND_KEYS, SPACE_COMBO_KEYS, HRMAnalyzer
+from key_events import KeyTable
+from profiling import NO_PROFILER, add_profile_arguments, profiler_from_args
+from vector_engine import concat_columns, flight_times
+
+LOG_DIR = "./log"
+
+MAX_FLIGHT_MS = 1000
+
+# Histogram buckets of the per-pair flight times, in ms; flights outside
+# the range are counted in the first or last bucket
+HISTOGRAM_MIN_MS = -1000
+HISTOGRAM_BUCKET_MS = 5
+HISTOGRAM_BUCKETS = (MAX_FLIGHT_MS - HISTOGRAM_MIN_MS) // HISTOGRAM_BUCKET_MS
+
+# Pairs seen fewer times are left out of the rankings
+MIN_COUNT = 5
+
+# The keys each HRM key modifies (f+right = shift, j+left = shift, space+m/n = quotes)
+HRM_PARTNERS = {"f": RIGHT_HAND_KEYS, "j": LEFT_HAND_KEYS, "SPACE": SPACE_COMBO_KEYS}
+
+
+class BigramMatrix:
+    """
+    Flight-time statistics of every key pair, indexed by key id.
+
+    counts, sums (ms) and squares are dense len(key_table)^2 arrays;
+    minimum and maximum hold NaN for pairs never seen. Histograms are
+    kept only for the pairs seen: histograms[slot[first, second]].
+    """
+
+    def __init__(self, key_table):
+        self.key_table = key_table
+        size = len(key_table)
+        self.counts = np.zeros((size, size), dtype=np.int64)
+        self.sums = np.zeros((size, size))
+        self.squares = np.zeros((size, size))
+        self.minimum = np.full((size, size), np.nan)
+        self.maximum = np.full((size, size), np.nan)
+        self.slot = np.full((size, size), -1, dtype=np.intp)
+        self.histograms = np.zeros((0, HISTOGRAM_BUCKETS), dtype=np.int64)
+
+    @classmethod
+    def from_columns(cls, timestamps, key_ids, is_press, key_table):
+        """Build the matrix from time-ordered event columns with ids from key_table."""
+        matrix = cls(key_table)
+        first, second, flights = flight_times(timestamps, key_ids, is_press)
+        flights = flights * 1000
+        kept = flights <= MAX_FLIGHT_MS
+        first, second, flights = first[kept], second[kept], flights[kept]
+
+        size = len(key_table)
+        cells = first.astype(np.intp) * size + second
+        shape = (size, size)
+        matrix.counts = np.bincount(cells, minlength=size * size).reshape(shape)
+        matrix.sums = np.bincount(cells, weights=flights, minlength=size * size).reshape(shape)
+        matrix.squares = np.bincount(cells, weights=flights * flights, minlength=size * size).reshape(shape)
+        minimum = np.full(size * size, np.inf)
+        maximum = np.full(size * size, -np.inf)
+        np.minimum.at(minimum, cells, flights)
+        np.maximum.at(maximum, cells, flights)
+        seen = matrix.counts.ravel() > 0
+        minimum[~seen] = np.nan
+        maximum[~seen] = np.nan
+        matrix.minimum = minimum.reshape(shape)
+        matrix.maximum = maximum.reshape(shape)
+
+        # Histograms of the seen pairs only
+        occupied = np.flatnonzero(seen)
+        slot = np.full(size * size, -1, dtype=np.intp)
+        slot[occupied] = np.arange(len(occupied))
+        matrix.slot = slot.reshape(shape)
+        buckets = np.clip((flights - HISTOGRAM_MIN_MS) // HISTOGRAM_BUCKET_MS, 0, HISTOGRAM_BUCKETS - 1)
+        matrix.histograms = np.bincount(
+            slot[cells] * HISTOGRAM_BUCKETS + buckets.astype(np.intp),
+            minlength=len(occupied) * HISTOGRAM_BUCKETS,
+        ).reshape(len(occupied), HISTOGRAM_BUCKETS)
+        return matrix
+
+    def ids(self, first, second):
+        return self.key_table.get(first), self.key_table.get(second)
+
+    def count(self, first, second):
+        first_id, second_id = self.ids(first, second)
+        if first_id is None or second_id is None:
+            return 0
+        return int(self.counts[first_id, second_id])
+
+    def quantile(self, first, second, q):
+        """Flight time (ms) at quantile q of a pair, to the bucket's upper edge; None if unseen."""
+        first_id, second_id = self.ids(first, second)
+        if first_id is None or second_id is None or self.slot[first_id, second_id] < 0:
+            return None
+        histogram = self.histograms[self.slot[first_id, second_id]]
+        bucket = int(np.searchsorted(np.cumsum(histogram), q * histogram.sum()))
+        edge = HISTOGRAM_MIN_MS + (bucket + 1) * HISTOGRAM_BUCKET_MS
+        return float(min(max(edge, self.minimum[first_id, second_id]), self.maximum[first_id, second_id]))
+
+    def stats(self, first, second):
+        """Count, mean, stdev, min, p50, p95 and max flight time (ms) of a pair, or None if unseen."""
+        count = self.count(first, second)
+        if not count:
+            return None
+        first_id, second_id = self.ids(first, second)
+        mean = self.sums[first_id, second_id] / count
+        variance = max(self.squares[first_id, second_id] / count - mean * mean, 0.0)
+        return {
+            "count": count,
+            "mean_ms": float(mean),
+            "stdev_ms": float(np.sqrt(variance)),
+            "min_ms": float(self.minimum[first_id, second_id]),
+            "p50_ms": self.quantile(first, second, 0.5),
+            "p95_ms": self.quantile(first, second, 0.95),
+            "max_ms": float(self.maximum[first_id, second_id]),
+        }
+
+    def means(self):
+        """Mean flight time (ms) of every pair, NaN where unseen."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.sums / self.counts
+
+    def ranked(self, min_count=MIN_COUNT, slowest=True, mask=None):
+        """(first, second) name pairs seen at least min_count times, by mean flight time.
+
+        mask is an optional boolean matrix restricting the pairs.
+        """
+        means = self.means()
+        eligible = self.counts >= min_count
+        if mask is not None:
+            eligible &= mask
+        first_ids, second_ids = np.nonzero(eligible)
+        order = np.argsort(means[first_ids, second_ids], kind="stable")
+        if slowest:
+            order = order[::-1]
+        names = self.key_table.names
+        return [(names[first_ids[i]], names[second_ids[i]]) for i in order]
+
+    def slowest(self, n=10, min_count=MIN_COUNT):
+        return self.ranked(min_count, slowest=True)[:n]
+
+    def fastest(self, n=10, min_count=MIN_COUNT):
+        return self.ranked(min_count, slowest=False)[:n]
+
+    def hrm_cross_hand(self, keys=HRM_KEYS, min_count=MIN_COUNT):
+        """Pairs of an HRM key and a key it modifies, in either order, fastest first."""
+        size = len(self.key_table)
+        mask = np.zeros((size, size), dtype=bool)
+        for key in keys:
+            key_id = self.key_table.get(key)
+            if key_id is None:
+                continue
+            partners = (self.key_table.get(partner) for partner in HRM_PARTNERS.get(key, ()))
+            partner_ids = [partner_id for partner_id in partners if partner_id is not None]
+            mask[key_id, partner_ids] = True
+            mask[partner_ids, key_id] = True
+        return self.ranked(min_count, slowest=False, mask=mask)
+
+
+def load_matrix(log_dir=LOG_DIR, cache=None, profiler=NO_PROFILER):
+    """BigramMatrix of all logs under log_dir."""
+    analyzer = HRMAnalyzer()
+    analyzer.load_logs(use_mmap=True, cache=cache, log_dir=log_dir, profiler=profiler)
+    key_table = KeyTable()
+    with profiler.stage("bigram_matrix", analyzer.event_count):
+        columns = concat_columns(analyzer.iter_chunks(), key_table)
+        return BigramMatrix.from_columns(*columns, key_table)
+
+
+def print_pairs(matrix, pairs):
+    print(f"  {'pair':<14}{'count':>8}{'mean':>9}{'p50':>9}{'p95':>9}{'min':>9}{'max':>9}   (ms)")
+    for first, second in pairs:
+        stats = matrix.stats(first, second)
+        print(f"  {first + ' → ' + second:<14}{stats['count']:>8}{stats['mean_ms']:>9.1f}"
+              f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['min_ms']:>9.1f}{stats['max_ms']:>9.1f}")
+
+
+def print_report(matrix, top=10, min_count=MIN_COUNT):
+    pairs = int((matrix.counts >= min_count).sum())
+    print("=" * 80)
+    print("BIGRAM FLIGHT TIMES (release of the first key → press of the second)")
+    print("=" * 80)
+    print(f"{int(matrix.counts.sum())} bigrams, {pairs} pairs seen at least {min_count} times")
+    print("Negative flight times are overlaps: the second key went down before the first came up.")
+
+    print("\nSlowest pairs (by mean):")
+    print_pairs(matrix, matrix.slowest(top, min_count))
+    print("\nFastest pairs (by mean):")
+    print_pairs(matrix, matrix.fastest(top, min_count))
+
+    cross = matrix.hrm_cross_hand(min_count=min_count)
+    print("\nHRM keys with the keys they modify, fastest first:")
+    if cross:
+        print_pairs(matrix, cross[:top])
+        overlapping = [pair for pair in cross if matrix.stats(*pair)["mean_ms"] < 0]
+        if overlapping:
+            print(f"\n  {len(overlapping)} of these pairs overlap on average; with a hold-tap on the first key")
+            print("  they are the rolls most likely to produce a modifier instead of two letters.")
+    else:
+        print("  No pairs seen often enough")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Flight time (release to next press) for every key pair."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument("--top", type=int, default=10, metavar="N",
+                        help="Pairs to list per ranking (default: %(default)s)")
+    parser.add_argument("--min-count", type=int, default=MIN_COUNT, metavar="N",
+                        help="Leave out pairs seen fewer times (default: %(default)s)")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    profiler = profiler_from_args(args)
+    cache = None if args.no_cache else EventCache()
+    try:
+        matrix = load_matrix(args.log_dir, cache, profiler)
+    finally:
+        profiler.stop()
+
+    if not matrix.counts.any():
+        print("No keyboard log data found!")
+        print("Please run 'python main.py start' first and type the test script.")
+    else:
+        print_report(matrix, args.top, args.min_count)
+    profiler.report()
+
+
+if __name__ == "__main__":
+    main()
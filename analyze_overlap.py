@@ -1,145 +1,172 @@
 #!/usr/bin/env python3
 """
-Analyze keystroke overlap patterns for 'f' and 'j' keys.
-Version 2: Handle the fact that f/j might be interpreted as shift modifiers,
-so we need to look for the PATTERN rather than the literal keys.
-
-Looking for:
-- 'f' key followed by RIGHT-HAND letter (since f+right = shift)
-- 'j' key followed by LEFT-HAND letter (since j+left = shift)
-- Measure the overlap between them
+Analyze keystroke overlap patterns for home row modifier keys.
+Version 3: one pass over the events tracks every configured key at once.
+Since the keys might be interpreted as shift modifiers, we look for the
+PATTERN rather than the literal keys.
+
+Looking for, for each key (by default 'f' and 'j'):
+- the key followed by a letter of the OTHER hand (since f+right = shift,
+  j+left = shift)
+- the overlap between them: how long the key is still held after the
+  cross-hand letter goes down
 """
 
-import json
-import glob
+import argparse
 from collections import defaultdict
 
+from event_cache import EventCache
+from log_reader import find_log_files, open_log_files
+from profiling import NO_PROFILER, add_profile_arguments, profiler_from_args
+
+LOG_DIR = "./log"
+
+# Keys analyzed by default
+ROLL_KEYS = ('f', 'j')
+
 # Define hand positions (QWERTY layout)
 LEFT_HAND = set('qwertasdfgzxcvb12345')
 RIGHT_HAND = set('yuiophjkl;nm,./67890')
 
-def analyze_rolls(log_files):
-    """
-    Analyze f→right-hand and j→left-hand rolls to detect overlap.
-    """
 
-    f_rolls = []  # f followed by right-hand key
-    j_rolls = []  # j followed by left-hand key
+def cross_hand(key):
+    """Keys of the other hand than key (None if key is on neither hand)."""
+    if key in LEFT_HAND:
+        return RIGHT_HAND
+    if key in RIGHT_HAND:
+        return LEFT_HAND
+    return None
+
 
-    f_stats = {'count': 0, 'overlaps': 0, 'overlap_durations': [], 'next_keys': defaultdict(int)}
-    j_stats = {'count': 0, 'overlaps': 0, 'overlap_durations': [], 'next_keys': defaultdict(int)}
+def new_stats():
+    return {'count': 0, 'overlaps': 0, 'overlap_durations': [], 'next_keys': defaultdict(int)}
 
-    for log_file in log_files:
-        try:
-            with open(log_file, 'r') as f:
-                data = json.load(f)
-                records = data.get('records', [])
 
-                if not records:
+class RollTracker:
+    """
+    One-pass state machine for rolls from each of keys into a letter of
+    the other hand.
+
+    A press of a tracked key opens a pending roll, the first cross-hand
+    press after it becomes the roll's next key, and the key's release
+    closes it, so each event costs O(len(keys)). rolls lists every
+    overlapping roll per key; stats counts presses, overlaps, overlap
+    durations (ms) and next keys per key.
+    """
+
+    def __init__(self, keys=ROLL_KEYS):
+        self.keys = [key.lower() for key in keys]
+        self.rolls = {key: [] for key in self.keys}
+        self.stats = {key: new_stats() for key in self.keys}
+        self.source = None  # stored as 'file' in each roll
+        self.start(None)
+
+    def start(self, key_table, source=None):
+        """Begin a new event sequence (pending rolls are dropped)."""
+        self.key_table = key_table
+        self.source = source
+        # Per key id lookups, extended as the key table grows: the lowercased
+        # name, which tracked key (if any) the id is, and for each tracked key
+        # whether the id is a letter of the other hand. Case is folded ('F' is 'f').
+        self.lower_names = []
+        self.tracked = []
+        self.is_cross = [bytearray() for _ in self.keys]
+        # Rolls per tracked key, [press_time, next_id, next_time], until
+        # the key is released; waiting holds those with no next key yet
+        self.pending = [[] for _ in self.keys]
+        self.waiting = [[] for _ in self.keys]
+
+    def _update_lookups(self):
+        keys = self.keys
+        for name in self.key_table.names[len(self.lower_names):]:
+            name = name.lower()
+            self.lower_names.append(name)
+            self.tracked.append(keys.index(name) if name in keys else -1)
+            for index, key in enumerate(keys):
+                self.is_cross[index].append(1 if name in (cross_hand(key) or ()) else 0)
+
+    def analyze_events(self, events):
+        """Feed (timestamp, key_id, is_press) events with ids from the started key table."""
+        if len(self.lower_names) < len(self.key_table):
+            self._update_lookups()
+        keys, stats, rolls = self.keys, self.stats, self.rolls
+        lower_names, tracked, is_cross = self.lower_names, self.tracked, self.is_cross
+        pending, waiting = self.pending, self.waiting
+
+        for timestamp, key_id, is_press in events:
+            index = tracked[key_id]
+            if is_press:
+                # This press is the next key of every roll waiting for a cross-hand key
+                for other, rolls_waiting in enumerate(waiting):
+                    if rolls_waiting and is_cross[other][key_id]:
+                        for roll in rolls_waiting:
+                            roll[1] = key_id
+                            roll[2] = timestamp
+                        waiting[other] = []
+                if index >= 0:
+                    stats[keys[index]]['count'] += 1
+                    roll = [timestamp, None, None]
+                    pending[index].append(roll)
+                    waiting[index].append(roll)
+                continue
+
+            if index < 0 or not pending[index]:
+                continue
+
+            # Release of a tracked key closes its pending rolls
+            key = keys[index]
+            for press_time, next_id, next_time in pending[index]:
+                # Overlap: how long was the key still held after the next key was pressed?
+                if next_id is None or next_time >= timestamp:
                     continue
+                next_button = lower_names[next_id]
+                overlap_ms = (timestamp - next_time) * 1000
+                stats[key]['overlaps'] += 1
+                stats[key]['overlap_durations'].append(overlap_ms)
+                stats[key]['next_keys'][next_button] += 1
+
+                rolls[key].append({
+                    'first_key': key,
+                    'next_key': next_button,
+                    'overlap_ms': overlap_ms,
+                    'hold_duration_ms': (timestamp - press_time) * 1000,
+                    'file': self.source
+                })
+            pending[index] = []
+            waiting[index] = []
+
+
+def analyze_rolls(log_files, keys=ROLL_KEYS, jobs=1, cache=None, profiler=NO_PROFILER):
+    """
+    Analyze rolls from each of keys into a letter of the other hand.
 
-                i = 0
-                while i < len(records):
-                    record = records[i]
-                    button = record['button'].lower()
-                    is_press = record['is_on_press']
-                    timestamp = record['timestamp']
-
-                    # Look for 'f' key press
-                    if button == 'f' and is_press:
-                        f_stats['count'] += 1
-
-                        # Find when 'f' is released
-                        f_release_time = None
-                        for j in range(i + 1, min(i + 30, len(records))):
-                            if records[j]['button'].lower() == 'f' and not records[j]['is_on_press']:
-                                f_release_time = records[j]['timestamp']
-                                break
-
-                        if f_release_time is None:
-                            i += 1
-                            continue
-
-                        # Look for next key press (should be right-hand for cross-hand roll)
-                        for j in range(i + 1, min(i + 30, len(records))):
-                            next_record = records[j]
-                            next_button = next_record['button'].lower()
-
-                            # Skip modifiers and the 'f' release
-                            if next_button in ['shift', 'key.shift', 'ctrl', 'alt', 'cmd', 'f'] or not next_record['is_on_press']:
-                                continue
-
-                            # Check if it's a right-hand key (cross-hand roll)
-                            if any(char in RIGHT_HAND for char in next_button):
-                                next_press_time = next_record['timestamp']
-
-                                # Calculate overlap: how long was f still held after next key pressed?
-                                if next_press_time < f_release_time:
-                                    overlap_ms = (f_release_time - next_press_time) * 1000
-                                    f_stats['overlaps'] += 1
-                                    f_stats['overlap_durations'].append(overlap_ms)
-                                    f_stats['next_keys'][next_button] += 1
-
-                                    f_rolls.append({
-                                        'first_key': 'f',
-                                        'next_key': next_button,
-                                        'overlap_ms': overlap_ms,
-                                        'f_hold_duration_ms': (f_release_time - timestamp) * 1000,
-                                        'file': log_file
-                                    })
-                                break
-
-                    # Look for 'j' key press
-                    elif button == 'j' and is_press:
-                        j_stats['count'] += 1
-
-                        # Find when 'j' is released
-                        j_release_time = None
-                        for j_idx in range(i + 1, min(i + 30, len(records))):
-                            if records[j_idx]['button'].lower() == 'j' and not records[j_idx]['is_on_press']:
-                                j_release_time = records[j_idx]['timestamp']
-                                break
-
-                        if j_release_time is None:
-                            i += 1
-                            continue
-
-                        # Look for next key press (should be left-hand for cross-hand roll)
-                        for j_idx in range(i + 1, min(i + 30, len(records))):
-                            next_record = records[j_idx]
-                            next_button = next_record['button'].lower()
-
-                            # Skip modifiers and the 'j' release
-                            if next_button in ['shift', 'key.shift', 'ctrl', 'alt', 'cmd', 'j'] or not next_record['is_on_press']:
-                                continue
-
-                            # Check if it's a left-hand key (cross-hand roll)
-                            if any(char in LEFT_HAND for char in next_button):
-                                next_press_time = next_record['timestamp']
-
-                                # Calculate overlap
-                                if next_press_time < j_release_time:
-                                    overlap_ms = (j_release_time - next_press_time) * 1000
-                                    j_stats['overlaps'] += 1
-                                    j_stats['overlap_durations'].append(overlap_ms)
-                                    j_stats['next_keys'][next_button] += 1
-
-                                    j_rolls.append({
-                                        'first_key': 'j',
-                                        'next_key': next_button,
-                                        'overlap_ms': overlap_ms,
-                                        'j_hold_duration_ms': (j_release_time - timestamp) * 1000,
-                                        'file': log_file
-                                    })
-                                break
-
-                    i += 1
-
-        except Exception as e:
-            print(f"Error processing {log_file}: {e}")
-            continue
-
-    return f_rolls, j_rolls, f_stats, j_stats
+    Returns (rolls, stats) of a RollTracker, both dicts keyed by key.
+    Each file is scanned once, on its own.
+
+    With jobs > 1 the files are parsed in a process pool first; with an
+    EventCache previously parsed files are not parsed again. Parsing
+    and scanning are one profiler stage, since files are parsed lazily.
+    """
+    tracker = RollTracker(keys)
+
+    # Serially, binary segments are memory-mapped and scanned in place
+    with profiler.stage("analyze_rolls", 0) as stage:
+        for log_file, events, error in open_log_files(log_files, jobs, cache):
+            if error is not None:
+                print(f"Error processing {log_file}: {error}")
+                continue
+
+            try:
+                stage.events += len(events)
+                tracker.start(events.keys, source=log_file)
+                tracker.analyze_events(zip(events.timestamps, events.key_ids, events.is_press))
+            except Exception as e:
+                print(f"Error processing {log_file}: {e}")
+                continue
+            finally:
+                events.close()
+
+    return tracker.rolls, tracker.stats
 
 def print_stats(key_name, stats, rolls):
     """Print statistics for a given key."""
@@ -176,66 +203,96 @@ def print_stats(key_name, stats, rolls):
 
     print()
 
-def main():
-    log_files = sorted(glob.glob('/Users/dsifry/Developer/hrm-tuner/log/*.json'))
-
-    print(f"Analyzing {len(log_files)} log files...\n")
-
-    f_rolls, j_rolls, f_stats, j_stats = analyze_rolls(log_files)
-
+def print_report(keys, rolls, stats):
+    """Print the roll statistics, examples and interpretation of analyze_rolls results."""
+    directions = ", ".join(f"{key}→{'right' if key in LEFT_HAND else 'left'}" for key in keys)
     print("=" * 70)
-    print("CROSS-HAND ROLL ANALYSIS (f→right, j→left)")
+    print(f"CROSS-HAND ROLL ANALYSIS ({directions})")
     print("=" * 70)
     print()
 
-    print_stats('f', f_stats, f_rolls)
-    print_stats('j', j_stats, j_rolls)
+    for key in keys:
+        print_stats(key, stats[key], rolls[key])
 
     # Show examples
-    if f_rolls:
-        print("=" * 70)
-        print("EXAMPLE 'f' CROSS-HAND ROLLS (first 20):")
-        print("=" * 70)
-        for roll in f_rolls[:20]:
-            print(f"f→{roll['next_key']}: overlap={roll['overlap_ms']:.1f}ms, f_held={roll['f_hold_duration_ms']:.1f}ms")
-        print()
-
-    if j_rolls:
-        print("=" * 70)
-        print("EXAMPLE 'j' CROSS-HAND ROLLS (first 20):")
-        print("=" * 70)
-        for roll in j_rolls[:20]:
-            print(f"j→{roll['next_key']}: overlap={roll['overlap_ms']:.1f}ms, j_held={roll['j_hold_duration_ms']:.1f}ms")
-        print()
+    for key in keys:
+        if rolls[key]:
+            print("=" * 70)
+            print(f"EXAMPLE '{key}' CROSS-HAND ROLLS (first 20):")
+            print("=" * 70)
+            for roll in rolls[key][:20]:
+                print(f"{key}→{roll['next_key']}: overlap={roll['overlap_ms']:.1f}ms, {key}_held={roll['hold_duration_ms']:.1f}ms")
+            print()
 
     # Conclusion
     print("=" * 70)
     print("INTERPRETATION:")
     print("=" * 70)
     print()
-    print("These cross-hand rolls (f→right, j→left) are where HRM conflicts occur.")
+    print(f"These cross-hand rolls ({directions}) are where HRM conflicts occur.")
     print("If overlap exists, the keyboard might interpret it as 'shift + key'.")
     print()
 
-    if f_stats['overlaps'] > 0 or j_stats['overlaps'] > 0:
-        avg_overlap = 0
-        total_overlaps = 0
-        if f_stats['overlap_durations']:
-            avg_overlap += sum(f_stats['overlap_durations'])
-            total_overlaps += len(f_stats['overlap_durations'])
-        if j_stats['overlap_durations']:
-            avg_overlap += sum(j_stats['overlap_durations'])
-            total_overlaps += len(j_stats['overlap_durations'])
-
-        if total_overlaps > 0:
-            avg_overlap /= total_overlaps
-            print(f"Average cross-hand overlap: {avg_overlap:.1f}ms")
-            print()
-            print("Recommendations:")
-            print(f"1. Keep 'balanced' flavor (NOT 'tap-preferred')")
-            print(f"2. Set require-prior-idle-ms = 0 (disable idle timeout)")
-            print(f"3. Ensure tapping-term-ms > {avg_overlap + 20:.0f}ms to avoid false shift triggers")
-            print(f"   (Current setting: 150ms should be fine)")
+    durations = [d for key in keys for d in stats[key]['overlap_durations']]
+    if durations:
+        avg_overlap = sum(durations) / len(durations)
+        print(f"Average cross-hand overlap: {avg_overlap:.1f}ms")
+        print()
+        print("Recommendations:")
+        print(f"1. Keep 'balanced' flavor (NOT 'tap-preferred')")
+        print(f"2. Set require-prior-idle-ms = 0 (disable idle timeout)")
+        print(f"3. Ensure tapping-term-ms > {avg_overlap + 20:.0f}ms to avoid false shift triggers")
+        print(f"   (Current setting: 150ms should be fine)")
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Analyze cross-hand roll overlap for home row modifier keys."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument(
+        "--keys",
+        default=",".join(ROLL_KEYS),
+        help="Comma-separated keys to analyze (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse log files in N worker processes (0 = one per CPU core)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    keys = [key.strip().lower() for key in args.keys.split(",") if key.strip()]
+    for key in keys:
+        if cross_hand(key) is None:
+            parser.error(f"'{key}' is not a key of either hand")
+
+    profiler = profiler_from_args(args)
+    with profiler.stage("find_log_files"):
+        log_files = find_log_files(args.log_dir)
+
+    print(f"Analyzing {len(log_files)} log files...\n")
+
+    cache = None if args.no_cache else EventCache()
+    try:
+        rolls, stats = analyze_rolls(log_files, keys, jobs=args.jobs, cache=cache, profiler=profiler)
+    finally:
+        profiler.stop()
+
+    print_report(keys, rolls, stats)
+    profiler.report()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Benchmark the analyzer stages over synthetic corpora.
+
+Each stage (load_logs, analyze_events, calculate_recommendations,
+analyze_rolls) is timed over corpora of increasing size. The report
+gives the median wall time of --repeat runs, throughput (corpus events
+per second) and the peak memory allocated by the stage (tracemalloc).
+calculate_recommendations works on the per-key summaries, whose size
+doesn't grow with the corpus, so it gets no throughput. Peak memory is
+measured in a separate run, because tracing slows the code it watches.
+
+Corpora are binary segments from the synthetic typist (synth_corpus,
+needs numpy), written once per size and seed under --corpus-dir and
+reused on later runs. Stages are timed with the profiling hooks of the analysis CLIs, and
+--profile-dir saves a cProfile stats file and a collapsed-stack file per
+stage and size from one more run. Results are saved as JSON, by default
+benchmarks/<commit>.json. With --baseline the run is compared
+against an earlier results file, and the script exits with status 1 if
+the median time of any stage grew by more than --threshold, or its peak
+memory did. Stages faster than --min-seconds in either run are too noisy
+to compare and are skipped.
+"""
+
+import os
+import sys
+import json
+import statistics
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+
+from analyze_overlap import analyze_rolls
+from hrmAnalysis import HRMAnalyzer
+from log_reader import find_log_files
+from profiling import StageProfiler
+from utils import format_count, parse_count
+
+DEFAULT_SIZES = "10k,1M,10M"
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "hrm-benchmark-corpora")
+RESULTS_DIR = "./benchmarks"
+
+# Typing time per corpus file (about 100k events)
+CORPUS_FILE_SECONDS = 2 * 60 * 60
+
+# Stages whose run time depends on the number of keys, not of events
+PER_KEY_STAGES = {"calculate_recommendations"}
+
+
+def corpus(corpus_root, event_count, seed=0):
+    """Directory of the synthetic corpus of event_count events, written if it isn't there yet."""
+    from synth_corpus import write_corpus
+
+    corpus_dir = os.path.join(corpus_root, f"{format_count(event_count)}-seed{seed}")
+    marker = os.path.join(corpus_dir, ".complete")
+    if not os.path.exists(marker):
+        write_corpus(corpus_dir, event_count, seed, mode="binary", seconds_per_file=CORPUS_FILE_SECONDS)
+        open(marker, "w").close()
+    return corpus_dir
+
+
+def loaded_analyzer(corpus_dir):
+    analyzer = HRMAnalyzer()
+    analyzer.load_logs(log_dir=corpus_dir)
+    return analyzer
+
+
+def analyzed_analyzer(corpus_dir):
+    analyzer = loaded_analyzer(corpus_dir)
+    analyzer.analyze_events()
+    return analyzer
+
+
+# (name, setup(corpus_dir) -> state, stage(state)); only stage is measured
+STAGES = (
+    ("load_logs", lambda corpus_dir: corpus_dir,
+     lambda corpus_dir: HRMAnalyzer().load_logs(log_dir=corpus_dir)),
+    ("analyze_events", loaded_analyzer,
+     lambda analyzer: analyzer.analyze_events()),
+    ("calculate_recommendations", analyzed_analyzer,
+     lambda analyzer: analyzer.calculate_recommendations(quiet=True)),
+    ("analyze_rolls", find_log_files,
+     lambda log_files: analyze_rolls(log_files)),
+)
+
+
+def profile_run(setup, stage, corpus_dir, profiler):
+    """The Stage profiled by profiler over one run of stage (setup is not profiled)."""
+    state = setup(corpus_dir)
+    profiler.start()
+    try:
+        with profiler.stage("stage") as result:
+            stage(state)
+    finally:
+        profiler.stop()
+    return result
+
+
+def measure(setup, stage, corpus_dir, repeat=5, memory=True):
+    """(median and best wall time in seconds, peak traced bytes or None) of one stage."""
+    times = [profile_run(setup, stage, corpus_dir, StageProfiler(memory=False)).seconds
+             for _ in range(max(repeat, 1))]
+
+    peak = None
+    if memory:
+        peak = profile_run(setup, stage, corpus_dir, StageProfiler()).peak_bytes
+    return statistics.median(times), min(times), peak
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold, min_seconds):
+    """Print and return the regressions of results against baseline."""
+    regressions = []
+    skipped = []
+    for size, stages in results["stages"].items():
+        for name, result in stages.items():
+            before = baseline.get("stages", {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            if min(result["seconds"], before["seconds"]) < min_seconds:
+                skipped.append(f"{size} {name}")
+            elif result["seconds"] > before["seconds"] * (1 + threshold):
+                regressions.append(f"{size} {name}: wall time {before['seconds']:.3f}"
+                                   f" -> {result['seconds']:.3f} s")
+            if (result.get("peak_bytes") and before.get("peak_bytes")
+                    and result["peak_bytes"] > before["peak_bytes"] * (1 + threshold)):
+                regressions.append(f"{size} {name}: peak memory {before['peak_bytes'] / 2**20:.1f}"
+                                   f" -> {result['peak_bytes'] / 2**20:.1f} MiB")
+
+    if skipped:
+        print(f"\nNot compared (under {min_seconds} s): {', '.join(skipped)}")
+    if regressions:
+        print(f"\nREGRESSIONS vs {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+    else:
+        print(f"\nNo regressions vs {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the analyzer stages over synthetic corpora.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES,
+                        help="Comma-separated corpus sizes in events (default: %(default)s)")
+    parser.add_argument("--stages", default=",".join(name for name, _, _ in STAGES),
+                        help="Comma-separated stages to run (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, metavar="N",
+                        help="Time each stage N times and keep the median (default: %(default)s)")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the traced run that measures peak memory")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR,
+                        help="Where corpora are generated and reused (default: %(default)s)")
+    parser.add_argument("--profile-dir", metavar="DIR",
+                        help="Also save <size>-<stage>.pstats and .collapsed profiles of each stage to DIR")
+    parser.add_argument("--output", metavar="FILE",
+                        help=f"Results JSON (default: {RESULTS_DIR}/<commit>.json)")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="Earlier results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Allowed wall time / memory growth as a fraction (default: %(default)s)")
+    parser.add_argument("--min-seconds", type=float, default=0.05,
+                        help="Don't compare stages faster than this in either run (default: %(default)s)")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.stages.split(",") if name.strip()]
+    known = [name for name, _, _ in STAGES]
+    for name in names:
+        if name not in known:
+            parser.error(f"unknown stage '{name}' (choose from {', '.join(known)})")
+
+    commit = current_commit()
+    results = {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": args.seed,
+        "stages": {},
+    }
+
+    for event_count in (parse_count(size) for size in args.sizes.split(",")):
+        size = format_count(event_count)
+        print(f"\nCorpus {size} ({event_count:,} events)...")
+        corpus_dir = corpus(args.corpus_dir, event_count, args.seed)
+        print(f"  {'stage':<28}{'wall s':>10}{'events/s':>16}{'peak MiB':>12}")
+
+        stage_results = results["stages"][size] = {}
+        for name, setup, stage in STAGES:
+            if name not in names:
+                continue
+            seconds, best, peak = measure(setup, stage, corpus_dir, args.repeat, not args.no_memory)
+            rate = None
+            if name not in PER_KEY_STAGES:
+                rate = event_count / seconds if seconds else float("inf")
+            stage_results[name] = {
+                "events": event_count,
+                "seconds": seconds,
+                "best_seconds": best,
+                "repeat": args.repeat,
+                "events_per_second": rate,
+                "peak_bytes": peak,
+            }
+            rate_text = f"{rate:,.0f}" if rate is not None else "-"
+            peak_text = f"{peak / 2**20:.1f}" if peak is not None else "-"
+            print(f"  {name:<28}{seconds:>10.3f}{rate_text:>16}{peak_text:>12}")
+
+            if args.profile_dir:
+                os.makedirs(args.profile_dir, exist_ok=True)
+                prefix = os.path.join(args.profile_dir, f"{size}-{name}")
+                profile_run(setup, stage, corpus_dir, StageProfiler(
+                    memory=False, pstats_file=prefix + ".pstats", collapsed_file=prefix + ".collapsed"))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold, args.min_seconds):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Capture clock and capture-path instrumentation ("main.py stats").
+
+Key callbacks stamp events with time.perf_counter_ns(): integer,
+monotonic ticks that NTP adjustments can't move. SessionClock anchors
+them to the wall clock once per session, and the writer thread turns
+ticks into the float timestamps of the log files, so hold times are
+differences of monotonic ticks.
+
+CaptureStats counts what the capture path does: callback latency (from
+callback entry to the event being buffered), flush duration, buffer
+depth at each flush, failed flushes (their events are retried) and
+events dropped because the final flush failed. Histograms
+have one bucket per power of two nanoseconds, so recording is an
+increment. The writer thread saves a snapshot after every flush to
+CAPTURE_STATS_FILE, which "main.py stats" prints.
+"""
+
+import json
+import os
+import time
+
+from constants import CAPTURE_LATENCY_BUDGET_NS, CAPTURE_STATS_FILE
+
+
+class SessionClock:
+    """perf_counter_ns() ticks anchored to the wall clock once per session."""
+
+    def __init__(self):
+        self.wall_ns = time.time_ns()
+        self.ticks_ns = time.perf_counter_ns()
+
+    def to_seconds(self, ticks):
+        """Wall-clock seconds (float) of a tick."""
+        return (self.wall_ns + ticks - self.ticks_ns) / 1e9
+
+    def to_ticks(self, seconds):
+        """Tick of a wall-clock time in seconds."""
+        return round(seconds * 1e9) - self.wall_ns + self.ticks_ns
+
+    def anchor(self):
+        return {"wall_ns": self.wall_ns, "perf_counter_ns": self.ticks_ns}
+
+
+class Log2Histogram:
+    """Counts of nanosecond values by bit length: bucket b holds [2**(b-1), 2**b)."""
+
+    def __init__(self, counts=None):
+        self.counts = list(counts) if counts else [0] * 64
+        self.max = 0
+
+    def record(self, ns):
+        self.counts[ns.bit_length()] += 1
+        if ns > self.max:
+            self.max = ns
+
+    def total(self):
+        return sum(self.counts)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (None if empty)."""
+        total = self.total()
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(2 ** bucket, self.max) if bucket else 0
+        return self.max
+
+    def to_dict(self):
+        return {"counts": self.counts, "max": self.max}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls(data["counts"])
+        histogram.max = data["max"]
+        return histogram
+
+
+class CaptureStats:
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.callback_ns = Log2Histogram()
+        self.flush_ns = Log2Histogram()
+        self.events = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.dropped = 0
+        self.max_buffer_depth = 0
+        self.last_buffer_depth = 0
+        self.max_queue_depth = 0
+
+    def record_callback(self, start_ticks):
+        """Called by a callback once its event is buffered; start_ticks is its stamp."""
+        self.callback_ns.record(time.perf_counter_ns() - start_ticks)
+
+    def record_flush(self, depth, duration_ns, failed=False, queue_depth=0):
+        self.flushes += 1
+        self.last_buffer_depth = depth
+        self.max_buffer_depth = max(self.max_buffer_depth, depth)
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+        self.flush_ns.record(duration_ns)
+        # A failed batch goes back into the buffer and is counted when it is saved
+        if failed:
+            self.failed_flushes += 1
+        else:
+            self.events += depth
+
+    def to_dict(self):
+        return {
+            "session": self.clock.anchor(),
+            "updated": time.time(),
+            "events": self.events,
+            "flushes": self.flushes,
+            "failed_flushes": self.failed_flushes,
+            "dropped": self.dropped,
+            "max_buffer_depth": self.max_buffer_depth,
+            "last_buffer_depth": self.last_buffer_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "callback_ns": self.callback_ns.to_dict(),
+            "flush_ns": self.flush_ns.to_dict(),
+        }
+
+    def save(self, filename=CAPTURE_STATS_FILE):
+        os.makedirs(os.path.dirname(filename) or ".", exist_ok=True)
+        temporary = filename + ".tmp"
+        with open(temporary, "w") as stats_file:
+            json.dump(self.to_dict(), stats_file)
+        os.replace(temporary, filename)
+
+
+def format_ns(ns):
+    if ns is None:
+        return "-"
+    if ns < 1000:
+        return f"{ns} ns"
+    if ns < 1000_000:
+        return f"{ns / 1000:.1f} µs"
+    return f"{ns / 1e6:.1f} ms"
+
+
+def print_stats(filename=CAPTURE_STATS_FILE, budget_ns=CAPTURE_LATENCY_BUDGET_NS):
+    """Print the last snapshot saved by a logger; returns False if there is none."""
+    try:
+        with open(filename) as stats_file:
+            stats = json.load(stats_file)
+    except FileNotFoundError:
+        print(f"No capture stats in {filename} (they are saved by 'main.py start' after every flush)")
+        return False
+
+    started = stats["session"]["wall_ns"] / 1e9
+    print("=" * 80)
+    print("CAPTURE STATS")
+    print("=" * 80)
+    print(f"Session started:  {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(started))}")
+    print(f"Last update:      {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats['updated']))}")
+    print(f"Events flushed:   {stats['events']:,} in {stats['flushes']:,} flushes")
+    print(f"Failed flushes:   {stats.get('failed_flushes', 0):,} (their events are retried)")
+    print(f"Dropped events:   {stats['dropped']:,}")
+    print(f"Buffer depth:     {stats['last_buffer_depth']:,} last flush, {stats['max_buffer_depth']:,} max")
+    print(f"Live queue depth: {stats['max_queue_depth']:,} max")
+
+    for title, name in (("Callback latency", "callback_ns"), ("Flush duration", "flush_ns")):
+        histogram = Log2Histogram.from_dict(stats[name])
+        print(f"\n{title} ({histogram.total():,} samples, bucket upper bounds):")
+        print(f"  p50 {format_ns(histogram.quantile(0.5))}   p99 {format_ns(histogram.quantile(0.99))}"
+              f"   p99.9 {format_ns(histogram.quantile(0.999))}   max {format_ns(histogram.max if histogram.total() else None)}")
+
+    callback = Log2Histogram.from_dict(stats["callback_ns"])
+    if callback.total():
+        over = sum(callback.counts[budget_ns.bit_length() + 1:])
+        p99 = callback.quantile(0.99)
+        verdict = "within" if p99 <= budget_ns else "OVER"
+        print(f"\nCallback p99 {verdict} the {format_ns(budget_ns)} budget"
+              f" ({over:,} callbacks certainly over it)")
+    return True
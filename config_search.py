@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Search hold-tap settings for the fewest misfires on recorded typing.
+
+Instead of deriving timings from summary statistics, every combination
+of tapping-term, quick-tap, require-prior-idle and flavor in a grid is
+replayed against the recorded presses of each HRM key (holdtap_sim), and
+the config with the fewest misfires wins.
+
+Candidates are scored in a process pool. The recording is handed to
+each worker once, when it starts, and only config chunks and scores go
+back and forth. Workers share the best score found so far per key, and
+a replay stops as soon as it is worse, so most candidates are rejected
+after a fraction of the presses. Equal scores go to the earlier
+candidate in the grid, so the result does not depend on the number of
+workers.
+"""
+
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis_engine import AnalysisEngine, HRMPass
+from event_cache import EventCache
+from holdtap_sim import FLAVORS, OPPOSITE_HAND, HoldTapConfig, HoldTapRecording, count_misfires
+from hrmAnalysis import HRM_KEYS
+from log_reader import find_log_files, resolve_jobs
+from profiling import add_profile_arguments, profiler_from_args
+
+LOG_DIR = "./log"
+
+# Grid searched per key, in ms (None leaves the setting disabled)
+TAPPING_TERMS = tuple(range(100, 301, 10))
+QUICK_TAPS = (None,) + tuple(range(100, 201, 25))
+PRIOR_IDLES = (None,) + tuple(range(50, 151, 25))
+
+# Candidates per task sent to a worker
+SEARCH_CHUNK_SIZE = 64
+
+
+def candidate_grid(hold_trigger_keys=None):
+    """Every grid config, in the order ties are broken (fewer settings enabled first)."""
+    return [
+        HoldTapConfig(tapping_term, quick_tap, prior_idle, flavor, hold_trigger_keys)
+        for quick_tap in QUICK_TAPS
+        for prior_idle in PRIOR_IDLES
+        for flavor in FLAVORS
+        for tapping_term in TAPPING_TERMS
+    ]
+
+
+# Per worker process: the recording and the shared best scores, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(presses, key_table, bounds):
+    _worker["presses"] = presses
+    _worker["key_table"] = key_table
+    _worker["intended"] = {key: presses[key].intended_holds() for key in presses}
+    _worker["bounds"] = bounds
+
+
+def _score_chunk(key, candidates):
+    """Score (index, config) candidates of one key; returns (misfires, index) of those not pruned."""
+    presses, key_table = _worker["presses"][key], _worker["key_table"]
+    intended, bound = _worker["intended"][key], _worker["bounds"][key]
+    scores = []
+    for index, config in candidates:
+        misfires = count_misfires(presses, config, key_table, intended, limit=bound.value)
+        if misfires is None:
+            continue
+        scores.append((misfires, index))
+        with bound.get_lock():
+            if misfires < bound.value:
+                bound.value = misfires
+    return scores
+
+
+def search(recording, keys, seeds=None, hold_trigger_keys=None, jobs=1):
+    """
+    Best grid config per key of a HoldTapRecording.
+
+    seeds maps keys to a config scored first (e.g. the recommended one),
+    so pruning starts from a good bound; it only wins if nothing in the
+    grid does better. hold_trigger_keys maps keys to their trigger keys.
+    Returns {key: (config, misfires)}.
+    """
+    seeds = seeds or {}
+    hold_trigger_keys = hold_trigger_keys or {}
+    presses = {key: recording.presses[key] for key in keys}
+    bounds = {key: multiprocessing.Value('l', len(presses[key])) for key in keys}
+    grids = {}
+    for key in keys:
+        grid = candidate_grid(hold_trigger_keys.get(key))
+        if key in seeds:
+            grid.append(seeds[key])
+        grids[key] = grid
+
+    tasks = []
+    for key in keys:
+        # The seed (last) goes out first
+        candidates = list(enumerate(grids[key]))
+        candidates = candidates[-1:] + candidates[:-1] if key in seeds else candidates
+        for start in range(0, len(candidates), SEARCH_CHUNK_SIZE):
+            tasks.append((key, candidates[start:start + SEARCH_CHUNK_SIZE]))
+
+    jobs = resolve_jobs(jobs)
+    if jobs == 1:
+        _init_worker(presses, recording.key_table, bounds)
+        results = [_score_chunk(key, candidates) for key, candidates in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(presses, recording.key_table, bounds)) as pool:
+            results = list(pool.map(_score_chunk, *zip(*tasks)))
+
+    best = {}
+    for (key, _), scores in zip(tasks, results):
+        for misfires, index in scores:
+            if key not in best or (misfires, index) < best[key]:
+                best[key] = (misfires, index)
+    return {key: (grids[key][index], misfires) for key, (misfires, index) in best.items()}
+
+
+def to_recommendation(config):
+    """The calculate_recommendations entry for config (unset settings left out)."""
+    recommendation = {"tapping_term": config.tapping_term, "flavor": config.flavor}
+    if config.quick_tap is not None:
+        recommendation["quick_tap"] = config.quick_tap
+    if config.prior_idle is not None:
+        recommendation["prior_idle"] = config.prior_idle
+    return recommendation
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Search ZMK hold-tap settings for the fewest misfires on recorded typing."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument(
+        "--keys",
+        default=",".join(sorted(HRM_KEYS)),
+        help="Comma-separated HRM keys to tune (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--hold-trigger",
+        metavar="KEYS",
+        help="Keys that may trigger a hold: 'opposite' (the other hand) or a list such as asdfg"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Score candidates in N worker processes (default: 0 = one per CPU core)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    keys = [key.strip() for key in args.keys.split(",") if key.strip()]
+    for key in keys:
+        if key not in HRM_KEYS:
+            parser.error(f"'{key}' is not an HRM key (choose from {', '.join(sorted(HRM_KEYS))})")
+
+    profiler = profiler_from_args(args)
+    try:
+        search_logs(args, keys, profiler)
+    finally:
+        profiler.stop()
+    profiler.report()
+
+
+def search_logs(args, keys, profiler):
+    with profiler.stage("find_log_files"):
+        log_files = find_log_files(args.log_dir)
+    print(f"Replaying {len(log_files)} log files...")
+
+    engine = AnalysisEngine()
+    hrm = engine.register(HRMPass())
+    recording = engine.register(HoldTapRecording(keys))
+    cache = None if args.no_cache else EventCache()
+    with profiler.stage("record") as stage:
+        engine.run_logs(log_files, cache,
+                        on_error=lambda filepath, e: print(f"Error reading {filepath}: {e}"))
+        stage.events = engine.events_analyzed
+
+    if not engine.events_analyzed:
+        print("No keyboard log data found!")
+        print("Please run 'python main.py start' first and type the test script.")
+        return
+    print(f"Replayed {engine.events_analyzed} keyboard events")
+
+    hold_trigger_keys = {}
+    for key in keys:
+        if args.hold_trigger == "opposite":
+            hold_trigger_keys[key] = OPPOSITE_HAND.get(key)
+        elif args.hold_trigger:
+            hold_trigger_keys[key] = set(args.hold_trigger)
+
+    with profiler.stage("calculate_recommendations", engine.events_analyzed):
+        recommendations = hrm.analyzer.calculate_recommendations(quiet=True)
+    seeds = {
+        key: HoldTapConfig.from_recommendation(recommendations[key], hold_trigger_keys.get(key))
+        for key in keys if key in recommendations
+    }
+
+    grid_size = len(candidate_grid())
+    print(f"Searching {grid_size} configs per key in {resolve_jobs(args.jobs)} processes...")
+    # Events here are recorded presses of the searched keys
+    with profiler.stage("search", sum(len(recording.presses[key]) for key in keys)):
+        best = search(recording, keys, seeds, hold_trigger_keys, args.jobs)
+
+    print("\n" + "="*80)
+    print("HOLD-TAP CONFIG SEARCH")
+    print("="*80)
+    for key in keys:
+        count = len(recording.presses[key])
+        if key not in best or not count:
+            print(f"\nKey '{key}': No presses recorded")
+            continue
+        config, misfires = best[key]
+        print(f"\nKey '{key}': {config.describe()}")
+        print(f"  Misfires: {misfires} of {count} presses ({misfires / count * 100:.1f}%)")
+        if key in seeds:
+            seed_misfires = count_misfires(recording.presses[key], seeds[key], recording.key_table)
+            print(f"  Recommended config: {seed_misfires} misfires ({seeds[key].describe()})")
+
+    # Keys without presses only won the grid by default; leave them out
+    hrm.analyzer.generate_zmk_config({
+        key: to_recommendation(config) for key, (config, _) in best.items()
+        if len(recording.presses[key]) > 0
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,38 @@
 ENABLE_KEYBOARD = True
 
 ##### Log #####
-DEFAULT_LOG_MODE = "json"
+DEFAULT_LOG_MODE = "json"  # "json", "text", "binary" or "ndjson"
+
+# Compression of new log files: None, "gzip", "bz2", "lzma" or "zstd" (Python 3.14+)
+LOG_COMPRESSION = None
+
+# Streaming (ndjson) mode appends to one file per session, rotated by size or age
+NDJSON_ROTATE_BYTES = 64 * 1024 * 1024
+NDJSON_ROTATE_SECONDS = 24 * 60 * 60
+NDJSON_BUFFER_SIZE = 64 * 1024
+
+# Parsed-event cache used by the analyzers (hidden dir, so "clean" globs skip it)
+EVENT_CACHE_DIR = "./log/.cache/"
+EVENT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Records preallocated per capture buffer (the buffer doubles when full)
+LOG_BUFFER_CAPACITY = 4096
+
+# Capture-path instrumentation saved by the logger after every flush ("main.py stats")
+CAPTURE_STATS_FILE = "./log/.capture_stats.json"
+CAPTURE_LATENCY_BUDGET_NS = 1000
+
+# Unix socket of the analysis server (analysis_server.py, hrmAnalysis.py --connect)
+# and seconds between its scans for new log files
+ANALYSIS_SOCKET = "./log/.analysis.sock"
+ANALYSIS_POLL_INTERVAL = 2
+
+# "main.py compact": days of raw events kept in daily segments; older days
+# keep only their summary (None keeps everything)
+LOG_KEEP_RAW_DAYS = 30
+
+# Events handed to every pass at a time by analysis_engine
+ANALYSIS_BATCH_SIZE = 4096
 
 ##### Keyboard Logger #####
 KEYBOARD_LOG_FILENAME = "keyboard_log"
@@ -9,6 +40,9 @@ KEYBOARD_LOG_INTERVAL = 30
 KEYBOARD_LOG_ON_PRESS = True
 KEYBOARD_LOG_ON_RELEASE = True
 
+# Seconds between recommendation refreshes in "main.py tune"
+TUNE_REFRESH_INTERVAL = 5
+
 # The expected running time for the program
 PROGRAM_LIFETIME = 3
 
@@ -0,0 +1,139 @@
+"""
+Persistent cache of parsed keyboard log files.
+
+Flushed log files never change, so the events parsed from each one are
+stored once as a binary segment under EVENT_CACHE_DIR. An entry is keyed
+by the source file's absolute path and is only used while the source's
+size and mtime still match the ones recorded in the entry header, which
+also holds the file's first timestamp (so the k-way merge can order files
+without loading them). The cache is capped at EVENT_CACHE_MAX_BYTES; the least recently used
+entries are evicted first (an entry's mtime is bumped on every hit).
+"""
+
+import os
+import hashlib
+
+from constants import EVENT_CACHE_DIR, EVENT_CACHE_MAX_BYTES
+from segment import (
+    SEGMENT_EXTENSION,
+    events_from_columns,
+    read_segment_columns,
+    read_segment_header,
+    write_segment,
+)
+
+CACHE_FORMAT = 1
+
+
+class EventCache:
+
+    def __init__(self, cache_dir=EVENT_CACHE_DIR, max_bytes=EVENT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_path(self, filepath):
+        digest = hashlib.sha1(os.path.abspath(filepath).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + SEGMENT_EXTENSION)
+
+    @staticmethod
+    def source_key(filepath):
+        stat = os.stat(filepath)
+        return {
+            "format": CACHE_FORMAT,
+            "path": os.path.abspath(filepath),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def get(self, filepath):
+        """Return the cached KeyEvents of filepath, or None if missing or stale."""
+        entry = self.entry_path(filepath)
+        try:
+            segment = read_segment_columns(entry)
+        except (OSError, ValueError):
+            return None
+
+        if segment["header"].get("source") != self.source_key(filepath):
+            self.discard(entry)
+            return None
+
+        try:
+            os.utime(entry)  # mark as recently used
+        except OSError:
+            pass
+        return events_from_columns(segment)
+
+    def put(self, filepath, events):
+        """Store the parsed events of filepath."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry = self.entry_path(filepath)
+        # Write to a private temp file first so concurrent readers and
+        # writers (e.g. pool workers) never see a partial entry
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        first_timestamp = min(events.timestamps) if len(events) else None
+        write_segment(tmp, events.keys, events.timestamps, events.key_ids, events.is_press,
+                      header={"source": self.source_key(filepath), "first_timestamp": first_timestamp})
+        os.replace(tmp, entry)
+
+    def load(self, filepath, loader):
+        """Return the events of filepath from the cache, or parse them with loader and cache them."""
+        events = self.get(filepath)
+        if events is None:
+            events = loader(filepath)
+            try:
+                self.put(filepath, events)
+            except OSError:
+                pass  # caching is best effort
+        return events
+
+    def first_timestamp(self, filepath, loader):
+        """Earliest timestamp of filepath (None if it has no events).
+
+        A fresh entry answers from its header alone; otherwise the file is
+        parsed with loader and cached, as by load().
+        """
+        try:
+            header = read_segment_header(self.entry_path(filepath))
+        except (OSError, ValueError):
+            header = {}
+        if header.get("source") == self.source_key(filepath) and "first_timestamp" in header:
+            return header["first_timestamp"]
+        events = self.load(filepath, loader)
+        return min(events.timestamps) if len(events) else None
+
+    def discard(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes."""
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith(SEGMENT_EXTENSION):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.discard(path)
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir) if os.path.isdir(self.cache_dir) else ():
+            self.discard(os.path.join(self.cache_dir, name))
@@ -0,0 +1,131 @@
+"""
+Out-of-core, time-ordered event stream over many log files.
+
+Each flush file is already (almost always) time-ordered, so instead of
+loading the whole corpus and sorting it, merge_log_files does a heap-based
+k-way merge of the per-file streams. Files are opened lazily, in order of
+their first timestamp, only once the merge reaches that time, so only
+files whose time ranges overlap are resident at the same time.
+
+Ties are broken by file order and then position in the file, which gives
+exactly the order of a stable sort over all files concatenated.
+
+Ordering the files needs each one's first timestamp before the merge
+reaches it, and every file is parsed only once, when the merge opens it.
+Uncompressed segments are mapped, which is cheap. With an event cache a
+file is parsed into the cache, whose entry header holds the first
+timestamp, and read back from it by the merge. Without one, only the
+first record is read (log_reader.read_first_timestamp), so nothing is
+held or copied up front; a file whose first record is not its earliest
+event then has its earlier events merged late, when the file is opened.
+"""
+
+import heapq
+
+from log_reader import load_log_file, open_log_file, read_first_timestamp, try_load_log_file
+from segment import SEGMENT_EXTENSION
+
+
+def open_events(filepath, cache=None):
+    """Open one log file for scanning (segments are memory-mapped)."""
+    if filepath.endswith(SEGMENT_EXTENSION):
+        return open_log_file(filepath)
+    events, error = try_load_log_file(filepath, cache)
+    if error is not None:
+        raise ValueError(error)
+    return events
+
+
+def is_sorted(timestamps):
+    return all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1))
+
+
+def first_timestamp(filepath, cache=None):
+    """Earliest timestamp in a log file, or None if it has no events.
+
+    With a cache, a file parsed before is answered from its entry header.
+    Without one, files other than uncompressed segments are only read up
+    to their first event, whose timestamp is returned.
+    """
+    if filepath.endswith(SEGMENT_EXTENSION):
+        with open_log_file(filepath) as events:
+            return min(events.timestamps) if len(events) else None
+    if cache is not None:
+        return cache.first_timestamp(filepath, load_log_file)
+    return read_first_timestamp(filepath)
+
+
+def iter_file(filepath, file_index, key_table, cache=None, events=None):
+    """Yield (timestamp, file_index, position, key_id, is_press) for one file, time-ordered.
+
+    key ids are remapped into key_table. A file that is not time-ordered
+    is sorted on its own (stably), which only ever holds that one file.
+    events, if given, are the file's events already read.
+    """
+    if events is None:
+        events = open_events(filepath, cache)
+    with events:
+        remap = [key_table.intern(name) for name in events.keys]
+        timestamps, key_ids, is_press = events.timestamps, events.key_ids, events.is_press
+        positions = range(len(timestamps))
+        if not is_sorted(timestamps):
+            positions = sorted(positions, key=timestamps.__getitem__)
+        for position in positions:
+            yield timestamps[position], file_index, position, remap[key_ids[position]], is_press[position]
+
+
+def merge_log_files(filepaths, key_table, cache=None, on_error=None, loaded=None):
+    """
+    Yield (timestamp, key_id, is_press) from all files in global time order.
+
+    key_table receives every key name seen; ids refer to it. Files that
+    can't be read are skipped and reported through on_error(filepath, error).
+    loaded may map some of the paths to their events (KeyEvents), already
+    read; those files are not opened.
+    """
+    loaded = loaded or {}
+    starts = []
+    for file_index, filepath in enumerate(filepaths):
+        try:
+            if filepath in loaded:
+                events = loaded[filepath]
+                start = min(events.timestamps) if len(events) else None
+            else:
+                start = first_timestamp(filepath, cache)
+        except Exception as e:
+            if on_error is not None:
+                on_error(filepath, e)
+            continue
+        if start is not None:
+            starts.append((start, file_index, filepath))
+    starts.sort()
+
+    heap = []
+    pending = 0
+
+    def activate(start_index):
+        _, file_index, filepath = starts[start_index]
+        stream = iter_file(filepath, file_index, key_table, cache, loaded.get(filepath))
+        try:
+            entry = next(stream)
+        except Exception as e:
+            if on_error is not None:
+                on_error(filepath, e)
+            return
+        heapq.heappush(heap, (entry, stream))
+
+    while heap or pending < len(starts):
+        # Open every file that starts no later than the next event to emit
+        while pending < len(starts) and (not heap or starts[pending][0] <= heap[0][0][0]):
+            activate(pending)
+            pending += 1
+        if not heap:
+            continue
+
+        (timestamp, _, _, key_id, is_press), stream = heap[0]
+        yield timestamp, key_id, is_press
+
+        try:
+            heapq.heapreplace(heap, (next(stream), stream))
+        except StopIteration:
+            heapq.heappop(heap)
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Replay recorded typing against ZMK hold-tap configs.
+
+calculate_recommendations derives timings from summary statistics; this
+checks them. The recorded stream is first reduced, in one pass, to the
+handful of instants a hold-tap decision can depend on for every press of
+an HRM key (HoldTapRecording). Replaying a config (simulate) then only
+walks those presses, so many configs can be tried against the same
+session cheaply.
+
+The simulated state machine follows ZMK's behavior-hold-tap:
+- quick-tap-ms: pressed again within this long of its last press that
+  resolved as tap, the key taps immediately
+- require-prior-idle-ms: pressed within this long of another key press,
+  the key taps immediately
+- otherwise the key is undecided until, whichever comes first, it is
+  released (tap), tapping-term-ms runs out (hold), another key is pressed
+  (hold, with "hold-preferred") or a key pressed after it is released
+  (hold, with "balanced"; "tap-preferred" only uses the first two)
+- hold-trigger-key-positions: a hold decision becomes a tap if the first
+  key pressed while undecided is not a trigger key
+
+Every HRM key is simulated on its own; other HRM keys are ordinary keys
+to it.
+
+What the typist wanted is read from the timing: a press is an intended
+hold (modifier) if some other key was pressed and released while it was
+down ("hold j, tap g" for "Good"), and an intended tap otherwise.
+Misfires are unwanted mods (a tap resolved as hold) and missed mods (a
+hold resolved as tap, the "jgood" case).
+"""
+
+import argparse
+import math
+from array import array
+
+from analysis_engine import AnalysisEngine, AnalysisPass, HRMPass
+from event_cache import EventCache
+from hrmAnalysis import HRM_KEYS, LEFT_HAND_KEYS, RIGHT_HAND_KEYS
+from log_reader import find_log_files
+from profiling import add_profile_arguments, profiler_from_args
+
+LOG_DIR = "./log"
+
+FLAVORS = ("tap-preferred", "balanced", "hold-preferred")
+
+# Keys of the other hand, for --hold-trigger opposite
+OPPOSITE_HAND = {"f": RIGHT_HAND_KEYS, "j": LEFT_HAND_KEYS}
+
+
+class HoldTapConfig:
+    """Timing settings of one hold-tap behavior (times in ms, None = disabled).
+
+    hold_trigger_keys is a collection of key names standing in for
+    hold-trigger-key-positions (None = any key may trigger a hold).
+    """
+
+    def __init__(self, tapping_term=200, quick_tap=None, prior_idle=None,
+                 flavor="balanced", hold_trigger_keys=None):
+        if flavor not in FLAVORS:
+            raise ValueError(f"unknown flavor '{flavor}' (choose from {', '.join(FLAVORS)})")
+        self.tapping_term = tapping_term
+        self.quick_tap = quick_tap
+        self.prior_idle = prior_idle
+        self.flavor = flavor
+        self.hold_trigger_keys = None if hold_trigger_keys is None else frozenset(hold_trigger_keys)
+
+    @classmethod
+    def from_recommendation(cls, recommendation, hold_trigger_keys=None):
+        """Config from one entry of HRMAnalyzer.calculate_recommendations."""
+        return cls(
+            tapping_term=recommendation.get("tapping_term", 200),
+            quick_tap=recommendation.get("quick_tap"),
+            prior_idle=recommendation.get("prior_idle"),
+            flavor=recommendation.get("flavor", "balanced"),
+            hold_trigger_keys=hold_trigger_keys,
+        )
+
+    def describe(self):
+        parts = [f"tapping-term-ms={self.tapping_term}"]
+        if self.quick_tap is not None:
+            parts.append(f"quick-tap-ms={self.quick_tap}")
+        if self.prior_idle is not None:
+            parts.append(f"require-prior-idle-ms={self.prior_idle}")
+        parts.append(f'flavor="{self.flavor}"')
+        if self.hold_trigger_keys is not None:
+            parts.append(f"hold-trigger-keys={''.join(sorted(self.hold_trigger_keys))}")
+        return ", ".join(parts)
+
+
+class Presses:
+    """
+    Columnar record of the presses of one HRM key.
+
+    Per press: its time, release time, first press of another key while it
+    was down (time and key id), first release of a key pressed after it
+    while it was down, and the last press of another key before it.
+    Instants that never happened are +inf (-inf for the last one) and the
+    key id is -1.
+    """
+
+    def __init__(self):
+        self.press = array('d')
+        self.release = array('d')
+        self.interrupt = array('d')
+        self.interrupt_id = array('l')
+        self.nested_release = array('d')
+        self.prior_press = array('d')
+
+    def __len__(self):
+        return len(self.press)
+
+    def intended_holds(self):
+        """1 for every press that was meant as a hold, else 0."""
+        return bytearray(1 if t < math.inf else 0 for t in self.nested_release)
+
+
+class HoldTapRecording(AnalysisPass):
+    """The presses of each HRM key of a recorded event stream.
+
+    Feed it like any analysis pass (start, then consume batches of
+    (timestamp, key_id, is_press) in time order), or through record().
+    A repeated press of a key that is already down (auto-repeat) is not
+    a new press.
+    """
+
+    name = "holdtap"
+
+    def __init__(self, keys=HRM_KEYS):
+        self.keys = sorted(keys)
+        self.presses = {key: Presses() for key in self.keys}
+        self.key_table = None
+
+    def start(self, key_table):
+        super().start(key_table)
+        self._hrm = {key_table.intern(key): self.presses[key] for key in self.keys}
+        self._last_other = {key_id: -math.inf for key_id in self._hrm}
+        # HRM key id -> [press index, ids pressed after it (None once a nested release was seen)]
+        self._open = {}
+
+    def record(self, events, key_table):
+        self.start(key_table)
+        self.consume(events)
+
+    def consume(self, batch):
+        hrm, last_other, open_presses = self._hrm, self._last_other, self._open
+        inf = math.inf
+
+        for timestamp, key_id, is_press in batch:
+            if is_press:
+                for hrm_id, state in open_presses.items():
+                    if hrm_id == key_id or state[1] is None:
+                        continue
+                    presses = hrm[hrm_id]
+                    if presses.interrupt[state[0]] == inf:
+                        presses.interrupt[state[0]] = timestamp
+                        presses.interrupt_id[state[0]] = key_id
+                    state[1].add(key_id)
+
+                presses = hrm.get(key_id)
+                if presses is not None and key_id not in open_presses:
+                    open_presses[key_id] = [len(presses), set()]
+                    presses.press.append(timestamp)
+                    presses.release.append(inf)
+                    presses.interrupt.append(inf)
+                    presses.interrupt_id.append(-1)
+                    presses.nested_release.append(inf)
+                    presses.prior_press.append(last_other[key_id])
+
+                for hrm_id in last_other:
+                    if hrm_id != key_id:
+                        last_other[hrm_id] = timestamp
+
+            else:
+                if key_id in open_presses:
+                    index, _ = open_presses.pop(key_id)
+                    hrm[key_id].release[index] = timestamp
+                for hrm_id, state in open_presses.items():
+                    if state[1] is not None and key_id in state[1]:
+                        hrm[hrm_id].nested_release[state[0]] = timestamp
+                        state[1] = None
+
+    def report(self):
+        pass
+
+
+def _resolve(presses, config, key_table):
+    """Yield 1 for every press in presses that resolves as hold under config, else 0."""
+    term = config.tapping_term / 1000
+    quick_tap = config.quick_tap / 1000 if config.quick_tap else -1.0
+    prior_idle = config.prior_idle / 1000 if config.prior_idle else -1.0
+    balanced = config.flavor == "balanced"
+    hold_preferred = config.flavor == "hold-preferred"
+    triggers = None
+    if config.hold_trigger_keys is not None:
+        triggers = key_table.mask(config.hold_trigger_keys)
+
+    release, interrupt, interrupt_id = presses.release, presses.interrupt, presses.interrupt_id
+    nested_release, prior_press = presses.nested_release, presses.prior_press
+    last_tap = -math.inf
+
+    for i, down in enumerate(presses.press):
+        if down - last_tap < quick_tap or down - prior_press[i] < prior_idle:
+            last_tap = down
+            yield 0
+            continue
+
+        decided = down + term
+        if hold_preferred and interrupt[i] < decided:
+            decided = interrupt[i]
+        elif balanced and nested_release[i] < decided:
+            decided = nested_release[i]
+
+        if release[i] <= decided or (
+                triggers is not None and interrupt[i] <= decided and not triggers[interrupt_id[i]]):
+            last_tap = down
+            yield 0
+        else:
+            yield 1
+
+
+def simulate(presses, config, key_table=None):
+    """
+    Resolve every press in presses under config.
+
+    Returns a bytearray with 1 for each press that resolves as hold.
+    key_table (the recording's) is needed for hold_trigger_keys.
+    """
+    return bytearray(_resolve(presses, config, key_table))
+
+
+def misfires(presses, decisions):
+    """(unwanted, missed): indices of taps resolved as hold and holds resolved as tap."""
+    intended = presses.intended_holds()
+    unwanted = [i for i, hold in enumerate(decisions) if hold and not intended[i]]
+    missed = [i for i, hold in enumerate(decisions) if intended[i] and not hold]
+    return unwanted, missed
+
+
+def count_misfires(presses, config, key_table=None, intended=None, limit=None):
+    """
+    Number of misfires of config, without keeping the decisions.
+
+    intended is presses.intended_holds(), if already computed. Once more
+    than limit misfires are counted the replay stops and None is returned.
+    """
+    if intended is None:
+        intended = presses.intended_holds()
+    if limit is None:
+        limit = len(presses)
+    count = 0
+    for hold, wanted in zip(_resolve(presses, config, key_table), intended):
+        if hold != wanted:
+            count += 1
+            if count > limit:
+                return None
+    return count
+
+
+def print_misfire(key, presses, index, names):
+    down = presses.press[index]
+    held_ms = (presses.release[index] - down) * 1000
+    if presses.interrupt_id[index] < 0:
+        print(f"    {key} alone: held {held_ms:.0f}ms")
+        return
+    other = names[presses.interrupt_id[index]]
+    after_ms = (presses.interrupt[index] - down) * 1000
+    print(f"    {key}+{other}: held {held_ms:.0f}ms, {other} pressed after {after_ms:.0f}ms")
+
+
+def print_simulation(key, presses, config, key_table, examples=5):
+    decisions = simulate(presses, config, key_table)
+    unwanted, missed = misfires(presses, decisions)
+    count = len(presses)
+
+    print(f"\nKey '{key}': {config.describe()}")
+    if not count:
+        print("  No presses recorded")
+        return
+    print(f"  Presses: {count}, resolved as hold: {sum(decisions)}, "
+          f"intended holds: {sum(presses.intended_holds())}")
+    for label, indices in (("Unwanted mods", unwanted), ("Missed mods", missed)):
+        print(f"  {label}: {len(indices)} ({len(indices) / count * 100:.1f}%)")
+        for index in indices[:examples]:
+            print_misfire(key, presses, index, key_table.names)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay recorded typing against ZMK hold-tap settings and report misfires."
+    )
+    parser.add_argument(
+        "log_dir",
+        nargs="?",
+        default=LOG_DIR,
+        help=f"Directory holding the keyboard logs (default: {LOG_DIR})"
+    )
+    parser.add_argument(
+        "--keys",
+        default=",".join(sorted(HRM_KEYS)),
+        help="Comma-separated HRM keys to simulate (default: %(default)s)"
+    )
+    parser.add_argument("--tapping-term", type=int, metavar="MS",
+                        help="tapping-term-ms (default: the recommended value)")
+    parser.add_argument("--quick-tap", type=int, metavar="MS",
+                        help="quick-tap-ms (0 disables; default: the recommended value)")
+    parser.add_argument("--prior-idle", type=int, metavar="MS",
+                        help="require-prior-idle-ms (0 disables; default: the recommended value)")
+    parser.add_argument("--flavor", choices=FLAVORS,
+                        help="Hold-tap flavor (default: the recommended value)")
+    parser.add_argument(
+        "--hold-trigger",
+        metavar="KEYS",
+        help="Keys that may trigger a hold: 'opposite' (the other hand) or a list such as asdfg"
+    )
+    parser.add_argument("--examples", type=int, default=5, metavar="N",
+                        help="Misfires to show per kind (default: %(default)s)")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    keys = [key.strip() for key in args.keys.split(",") if key.strip()]
+    for key in keys:
+        if key not in HRM_KEYS:
+            parser.error(f"'{key}' is not an HRM key (choose from {', '.join(sorted(HRM_KEYS))})")
+
+    profiler = profiler_from_args(args)
+    try:
+        simulate_logs(args, keys, profiler)
+    finally:
+        profiler.stop()
+    profiler.report()
+
+
+def simulate_logs(args, keys, profiler):
+    with profiler.stage("find_log_files"):
+        log_files = find_log_files(args.log_dir)
+    print(f"Replaying {len(log_files)} log files...")
+
+    # One pass feeds both the recommendations and the recording
+    engine = AnalysisEngine()
+    hrm = engine.register(HRMPass())
+    recording = engine.register(HoldTapRecording(keys))
+    cache = None if args.no_cache else EventCache()
+    with profiler.stage("record") as stage:
+        engine.run_logs(log_files, cache,
+                        on_error=lambda filepath, e: print(f"Error reading {filepath}: {e}"))
+        stage.events = engine.events_analyzed
+
+    if not engine.events_analyzed:
+        print("No keyboard log data found!")
+        print("Please run 'python main.py start' first and type the test script.")
+        return
+    print(f"Replayed {engine.events_analyzed} keyboard events")
+
+    with profiler.stage("calculate_recommendations", engine.events_analyzed):
+        recommendations = hrm.analyzer.calculate_recommendations(quiet=True)
+    print("\n" + "="*80)
+    print("HOLD-TAP SIMULATION")
+    print("="*80)
+
+    for key in keys:
+        if args.hold_trigger == "opposite":
+            hold_trigger_keys = OPPOSITE_HAND.get(key)
+        elif args.hold_trigger:
+            hold_trigger_keys = set(args.hold_trigger)
+        else:
+            hold_trigger_keys = None
+
+        config = HoldTapConfig.from_recommendation(recommendations.get(key, {}), hold_trigger_keys)
+        if args.tapping_term is not None:
+            config.tapping_term = args.tapping_term
+        if args.quick_tap is not None:
+            config.quick_tap = args.quick_tap or None
+        if args.prior_idle is not None:
+            config.prior_idle = args.prior_idle or None
+        if args.flavor is not None:
+            config.flavor = args.flavor
+
+        # Events here are the key's recorded presses
+        with profiler.stage(f"simulate {key}", len(recording.presses[key])):
+            print_simulation(key, recording.presses[key], config, recording.key_table, args.examples)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,20 @@ spelling errors, or what you actually typed - only the timing patterns!
 Type fast and naturally - errors are expected and ignored!
 """
 
-import os
-import glob
-import json
-import statistics
 import argparse
-from datetime import datetime
 from collections import defaultdict
 
+from key_events import KeyEvents, KeyTable
+from event_cache import EventCache
+from event_stream import merge_log_files
+from interval_index import HeldKeys
+from log_reader import find_log_files, load_log_files
+from profiling import NO_PROFILER, add_profile_arguments, profiler_from_args
+from constants import ANALYSIS_SOCKET
+from segment import SEGMENT_EXTENSION, open_segment, read_segment
+from sketches import Distribution
+
 LOG_DIR = "./log"
-pattern = os.path.join(LOG_DIR, "keyboard_log_*.json")
 
 # Keys we're specifically analyzing as HRM modifiers
 HRM_KEYS = {"f", "j", "SPACE"}
@@ -36,125 +40,224 @@ RIGHT_HAND_KEYS = {"6", "7", "8", "9", "0", "p", "y", "u", "i", "o",
 SPACE_COMBO_KEYS = {"m", "n"}
 
 
-def parse_timestamp(ts):
-    """Parse various timestamp formats to datetime."""
-    if isinstance(ts, float):
-        return ts  # Return raw timestamp for precision
-    elif isinstance(ts, str):
-        try:
-            dt = datetime.strptime(ts, "%Y%m%d_%H%M%S")
-            return dt.timestamp()
-        except ValueError:
-            try:
-                dt = datetime.fromisoformat(ts)
-                return dt.timestamp()
-            except ValueError:
-                return None
-    return None
-
-
 class HRMAnalyzer:
     def __init__(self):
-        self.key_events = []  # All events in order
+        self.key_events = KeyEvents()  # All events in order
+
+        # (first_ts, last_ts, count, path) of segments left on disk to be
+        # scanned through mmap, in time order
+        self.mapped_segments = []
         self.key_down_times = {}  # Currently pressed keys
 
+        # Per-key timing distributions are kept as constant-size summaries
+        # (running moments and a quantile sketch), not lists of durations
+
         # Pure hold durations (key down to key up, no other keys pressed)
-        self.pure_taps = defaultdict(list)
+        self.pure_taps = defaultdict(Distribution)
 
         # HRM hold patterns (key held while another key is pressed)
-        self.hrm_holds = defaultdict(list)
+        self.hrm_holds = defaultdict(Distribution)
 
         # Time from HRM key down to next key press
-        self.hrm_activation_times = defaultdict(list)
+        self.hrm_activation_times = defaultdict(Distribution)
 
         # All hold durations for each key
-        self.all_hold_durations = defaultdict(list)
+        self.all_hold_durations = defaultdict(Distribution)
 
         # Track overlapping key sequences
         self.overlap_sequences = []
 
-    def load_logs(self):
-        """Load all keyboard log files."""
-        for filepath in glob.glob(pattern):
+        # Events consumed by analyze_events
+        self.events_analyzed = 0
+
+        # Keys held at the end of the last analyze_events call, so a live
+        # stream can be analyzed batch by batch
+        self.currently_held = HeldKeys()
+
+    def load_logs(self, use_mmap=False, jobs=1, cache=None, log_dir=LOG_DIR, profiler=NO_PROFILER):
+        """Load all keyboard log files (JSON or binary segments) under log_dir.
+
+        With use_mmap, binary segments are not read into memory; they are
+        memory-mapped and scanned in place by analyze_events. With jobs > 1
+        the remaining files are parsed in a process pool, and with an
+        EventCache only files not parsed by a previous run are parsed.
+        profiler times finding, parsing and sorting as separate stages.
+        """
+        with profiler.stage("find_log_files"):
+            log_files = find_log_files(log_dir)
+
+        with profiler.stage("parse") as stage:
+            self.parse_logs(log_files, use_mmap, jobs, cache)
+            stage.events = self.event_count
+
+        with profiler.stage("sort", self.event_count):
+            self.sort_loaded()
+
+    def parse_logs(self, log_files, use_mmap=False, jobs=1, cache=None):
+        to_parse = []
+        for filepath in log_files:
+            if not (use_mmap and filepath.endswith(SEGMENT_EXTENSION)):
+                to_parse.append(filepath)
+                continue
             try:
-                with open(filepath, "r") as f:
-                    raw = f.read().strip()
-                    outer = json.loads(raw)
-                    if isinstance(outer, str):
-                        outer = json.loads(outer)
-                    events = outer.get("records", [])
-
-                    for event in events:
-                        key = event.get("button")
-                        ts_raw = event.get("timestamp")
-                        is_press = event.get("is_on_press")
-
-                        if not key or ts_raw is None:
-                            continue
-
-                        timestamp = parse_timestamp(ts_raw)
-                        if timestamp is None:
-                            continue
-
-                        self.key_events.append({
-                            "key": key,
-                            "timestamp": timestamp,
-                            "is_press": is_press
-                        })
+                with open_segment(filepath) as segment:
+                    if not len(segment):
+                        continue
+                    if not segment.is_sorted():
+                        raise ValueError("segment is not time-ordered")
+                    self.mapped_segments.append(
+                        (segment.timestamps[0], segment.timestamps[-1], len(segment), filepath))
             except Exception as e:
                 print(f"Error reading {filepath}: {e}")
                 continue
 
-        # Sort events by timestamp
-        self.key_events.sort(key=lambda x: x["timestamp"])
-
-    def analyze_events(self):
-        """Analyze key events to detect HRM patterns."""
-        currently_held = {}  # key -> down_timestamp
-
-        for i, event in enumerate(self.key_events):
-            key = event["key"]
-            timestamp = event["timestamp"]
-            is_press = event["is_press"]
+        for filepath, events, error in load_log_files(to_parse, jobs, cache):
+            if error is not None:
+                print(f"Error reading {filepath}: {error}")
+                continue
+            self.key_events.extend(events)
 
+    def sort_loaded(self):
+        # Sort events by timestamp
+        self.key_events.sort()
+        self.mapped_segments.sort()
+
+        if not self.chunks_are_disjoint():
+            # Chained chunks would not be in global time order: copy the
+            # segments into memory and sort everything together instead
+            for _, _, _, filepath in self.mapped_segments:
+                self.key_events.extend(read_segment(filepath))
+            self.mapped_segments = []
+            self.key_events.sort()
+
+    @property
+    def event_count(self):
+        return len(self.key_events) + sum(count for _, _, count, _ in self.mapped_segments)
+
+    def chunk_ranges(self):
+        ranges = [(first, last, path) for first, last, _, path in self.mapped_segments]
+        if self.key_events:
+            ranges.append((self.key_events.timestamps[0], self.key_events.timestamps[-1], None))
+        return sorted(ranges, key=lambda r: r[0])
+
+    def chunks_are_disjoint(self):
+        ranges = self.chunk_ranges()
+        return all(prev[1] < cur[0] for prev, cur in zip(ranges, ranges[1:]))
+
+    def iter_chunks(self):
+        """Yield the in-memory events and each mapped segment in time order."""
+        for _, _, path in self.chunk_ranges():
+            if path is None:
+                yield self.key_events
+            else:
+                with open_segment(path) as segment:
+                    yield segment
+
+    def stream_logs(self, cache=None, log_dir=LOG_DIR):
+        """Analyze all log files as one k-way merged stream, without loading them."""
+        key_table = KeyTable()
+        events = merge_log_files(
+            find_log_files(log_dir), key_table, cache,
+            on_error=lambda filepath, e: print(f"Error reading {filepath}: {e}"))
+        self.analyze_events(events, key_table)
+
+    def iter_loaded_events(self, key_table):
+        """Yield (timestamp, key_id, is_press) over the loaded chunks in time order.
+
+        Chunks have their own key tables; ids are remapped into key_table
+        so held-key state carries across chunk boundaries.
+        """
+        for chunk in self.iter_chunks():
+            remap = [key_table.intern(name) for name in chunk.keys]
+            for local_id, timestamp, is_press in zip(chunk.key_ids, chunk.timestamps, chunk.is_press):
+                yield timestamp, remap[local_id], is_press
+
+    def analyze_events(self, events=None, key_table=None):
+        """Analyze key events to detect HRM patterns.
+
+        events is an iterable of (timestamp, key_id, is_press) in time order,
+        with ids from key_table; it defaults to the events from load_logs.
+        Only the currently held keys are kept while scanning, so a stream
+        such as event_stream.merge_log_files is analyzed in constant memory.
+        Held keys carry over to the next call, so a live stream can be fed
+        in batches (always with the same key_table).
+        """
+        if events is None:
+            key_table = KeyTable()
+            events = self.iter_loaded_events(key_table)
+
+        names = key_table.names
+        hrm_ids = [key_table.intern(key) for key in sorted(HRM_KEYS)]
+        hrm_id_set = set(hrm_ids)
+
+        currently_held = self.currently_held  # sweep line of open holds, by press time
+        down_times = currently_held.down_times  # key id -> down_timestamp
+
+        for timestamp, key_id, is_press in events:
+            self.events_analyzed += 1
             if is_press:
                 # Key pressed down
-                currently_held[key] = timestamp
+                currently_held.press(key_id, timestamp)
 
                 # Check if this is pressed while an HRM key is held
-                for hrm_key in HRM_KEYS:
-                    if hrm_key in currently_held and hrm_key != key:
+                for hrm_id in hrm_ids:
+                    if hrm_id in down_times and hrm_id != key_id:
                         # Calculate time from HRM key down to this key press
-                        activation_time = timestamp - currently_held[hrm_key]
-                        self.hrm_activation_times[hrm_key].append(activation_time)
+                        activation_time = timestamp - down_times[hrm_id]
+                        self.hrm_activation_times[names[hrm_id]].add(activation_time)
 
             else:
                 # Key released
-                if key not in currently_held:
+                down_time = currently_held.release(key_id)
+                if down_time is None:
                     continue
 
-                down_time = currently_held[key]
                 hold_duration = timestamp - down_time
-                self.all_hold_durations[key].append(hold_duration)
+                key = names[key_id]
+                self.all_hold_durations[key].add(hold_duration)
 
                 # Check if this was a pure tap or an HRM hold
                 # Pure tap = no other keys pressed during hold
                 # HRM hold = other keys pressed while this was held
 
-                other_keys_during_hold = []
-                for other_key, other_down_time in currently_held.items():
-                    if other_key != key and other_down_time > down_time:
-                        other_keys_during_hold.append(other_key)
-
-                if key in HRM_KEYS:
+                if key_id in hrm_id_set:
+                    # Keys pressed after this one went down and still held
+                    other_keys_during_hold = currently_held.pressed_after(down_time)
                     if other_keys_during_hold:
                         # This was an HRM hold (modifier use)
-                        self.hrm_holds[key].append(hold_duration)
+                        self.hrm_holds[key].add(hold_duration)
                     else:
                         # This was a pure tap (normal key use)
-                        self.pure_taps[key].append(hold_duration)
+                        self.pure_taps[key].add(hold_duration)
+
+    def analyze_vectorized(self):
+        """Same analysis as analyze_events over the loaded events, as NumPy array passes.
+
+        All loaded chunks are concatenated into flat columns first, so this
+        trades memory for speed; see vector_engine.
+        """
+        from vector_engine import concat_columns, group_by_key, hold_durations, hrm_timings, pair_events
+
+        key_table = KeyTable()
+        hrm_ids = [key_table.intern(key) for key in sorted(HRM_KEYS)]
+        timestamps, key_ids, is_press = concat_columns(self.iter_chunks(), key_table)
+        self.events_analyzed += len(timestamps)
+
+        # Both passes share one grouping and pairing of the events
+        order = group_by_key(key_ids)
+        pairs = pair_events(key_ids, is_press, order)
+
+        names = key_table.names
+        for key_id, durations in hold_durations(timestamps, key_ids, is_press, pairs).items():
+            self.all_hold_durations[names[key_id]].extend(durations.tolist())
 
-                del currently_held[key]
+        timings = hrm_timings(timestamps, key_ids, is_press, hrm_ids, order, pairs)
+        for hrm_id, (taps, holds, activations) in timings.items():
+            key = names[hrm_id]
+            for results, values in ((self.pure_taps, taps), (self.hrm_holds, holds),
+                                    (self.hrm_activation_times, activations)):
+                if len(values):
+                    results[key].extend(values.tolist())
 
     def print_statistics(self):
         """Print detailed statistics for HRM keys."""
@@ -168,82 +271,81 @@ class HRMAnalyzer:
             print(f"{'─'*80}")
 
             # Pure taps (normal typing)
-            taps = self.pure_taps.get(key, [])
+            taps = self.pure_taps.get(key)
             if taps:
-                taps_ms = [t * 1000 for t in taps]
                 print(f"\nPURE TAPS (normal typing, no other keys held):")
                 print(f"  Count: {len(taps)}")
-                print(f"  Average: {statistics.mean(taps_ms):.1f}ms")
-                print(f"  Std Dev: {statistics.stdev(taps_ms) if len(taps) > 1 else 0:.1f}ms")
-                print(f"  Min: {min(taps_ms):.1f}ms")
-                print(f"  Max: {max(taps_ms):.1f}ms")
-                print(f"  95th percentile: {sorted(taps_ms)[int(len(taps_ms) * 0.95)] if len(taps_ms) > 1 else max(taps_ms):.1f}ms")
+                print(f"  Average: {taps.mean * 1000:.1f}ms")
+                print(f"  Std Dev: {taps.stdev * 1000:.1f}ms")
+                print(f"  Min: {taps.min * 1000:.1f}ms")
+                print(f"  Max: {taps.max * 1000:.1f}ms")
+                print(f"  95th percentile: {taps.quantile(0.95) * 1000:.1f}ms")
             else:
                 print(f"\nPURE TAPS: No data")
 
             # HRM holds (modifier use)
-            holds = self.hrm_holds.get(key, [])
+            holds = self.hrm_holds.get(key)
             if holds:
-                holds_ms = [h * 1000 for h in holds]
                 print(f"\nHRM HOLDS (used as modifier with other keys):")
                 print(f"  Count: {len(holds)}")
-                print(f"  Average: {statistics.mean(holds_ms):.1f}ms")
-                print(f"  Std Dev: {statistics.stdev(holds_ms) if len(holds) > 1 else 0:.1f}ms")
-                print(f"  Min: {min(holds_ms):.1f}ms")
-                print(f"  Max: {max(holds_ms):.1f}ms")
-                print(f"  5th percentile: {sorted(holds_ms)[int(len(holds_ms) * 0.05)] if len(holds_ms) > 1 else min(holds_ms):.1f}ms")
+                print(f"  Average: {holds.mean * 1000:.1f}ms")
+                print(f"  Std Dev: {holds.stdev * 1000:.1f}ms")
+                print(f"  Min: {holds.min * 1000:.1f}ms")
+                print(f"  Max: {holds.max * 1000:.1f}ms")
+                print(f"  5th percentile: {holds.quantile(0.05) * 1000:.1f}ms")
             else:
                 print(f"\nHRM HOLDS: No data")
 
             # Activation times (time from key down to next key press)
-            activations = self.hrm_activation_times.get(key, [])
+            activations = self.hrm_activation_times.get(key)
             if activations:
-                act_ms = [a * 1000 for a in activations]
                 print(f"\nACTIVATION TIMING (key down → next key press):")
                 print(f"  Count: {len(activations)}")
-                print(f"  Average: {statistics.mean(act_ms):.1f}ms")
-                print(f"  Std Dev: {statistics.stdev(act_ms) if len(act_ms) > 1 else 0:.1f}ms")
-                print(f"  Min: {min(act_ms):.1f}ms")
-                print(f"  Max: {max(act_ms):.1f}ms")
-                print(f"  95th percentile: {sorted(act_ms)[int(len(act_ms) * 0.95)] if len(act_ms) > 1 else max(act_ms):.1f}ms")
+                print(f"  Average: {activations.mean * 1000:.1f}ms")
+                print(f"  Std Dev: {activations.stdev * 1000:.1f}ms")
+                print(f"  Min: {activations.min * 1000:.1f}ms")
+                print(f"  Max: {activations.max * 1000:.1f}ms")
+                print(f"  95th percentile: {activations.quantile(0.95) * 1000:.1f}ms")
             else:
                 print(f"\nACTIVATION TIMING: No data")
 
-    def calculate_recommendations(self):
-        """Calculate ZMK timing recommendations."""
-        print("\n" + "="*80)
-        print("ZMK CONFIGURATION RECOMMENDATIONS")
-        print("="*80)
+    def calculate_recommendations(self, quiet=False):
+        """Calculate ZMK timing recommendations.
+
+        With quiet, nothing is printed and only the dict is returned.
+        """
+        say = (lambda *args: None) if quiet else print
+        say("\n" + "="*80)
+        say("ZMK CONFIGURATION RECOMMENDATIONS")
+        say("="*80)
 
         recommendations = {}
 
         for key in sorted(HRM_KEYS):
-            taps = self.pure_taps.get(key, [])
-            holds = self.hrm_holds.get(key, [])
-            activations = self.hrm_activation_times.get(key, [])
+            taps = self.pure_taps.get(key)
+            holds = self.hrm_holds.get(key)
+            activations = self.hrm_activation_times.get(key)
 
             if not taps and not holds:
-                print(f"\nKey '{key}': No data available")
+                say(f"\nKey '{key}': No data available")
                 continue
 
-            print(f"\n{'─'*80}")
-            print(f"Recommendations for '{key}':")
-            print(f"{'─'*80}")
+            say(f"\n{'─'*80}")
+            say(f"Recommendations for '{key}':")
+            say(f"{'─'*80}")
 
             # Calculate tapping-term-ms
             # This should be above max tap time but below min hold time
             tapping_term = None
             if taps:
-                taps_ms = [t * 1000 for t in taps]
-                max_tap = max(taps_ms)
+                max_tap = taps.max * 1000
                 # Add 2 std deviations for safety
-                std_tap = statistics.stdev(taps_ms) if len(taps) > 1 else 0
+                std_tap = taps.stdev * 1000
                 tap_threshold = max_tap + (2 * std_tap)
 
                 # If we have holds, make sure we're below the minimum hold
                 if holds:
-                    holds_ms = [h * 1000 for h in holds]
-                    min_hold = min(holds_ms)
+                    min_hold = holds.min * 1000
 
                     # Find the sweet spot between max tap and min hold
                     if tap_threshold < min_hold:
@@ -251,50 +353,45 @@ class HRMAnalyzer:
                     else:
                         # Overlapping distributions - use conservative value
                         tapping_term = int(tap_threshold)
-                        print(f"  ⚠ WARNING: Tap and hold times overlap!")
-                        print(f"    Max tap: {max_tap:.1f}ms, Min hold: {min_hold:.1f}ms")
+                        say(f"  ⚠ WARNING: Tap and hold times overlap!")
+                        say(f"    Max tap: {max_tap:.1f}ms, Min hold: {min_hold:.1f}ms")
                 else:
                     tapping_term = int(tap_threshold)
             elif holds:
                 # No tap data, use conservative value below min hold
-                holds_ms = [h * 1000 for h in holds]
-                min_hold = min(holds_ms)
+                min_hold = holds.min * 1000
                 tapping_term = int(min_hold * 0.8)  # 80% of min hold
 
             if tapping_term:
                 # Clamp to reasonable range
                 tapping_term = max(100, min(300, tapping_term))
                 recommendations[key] = {"tapping_term": tapping_term}
-                print(f"\n  tapping-term-ms = {tapping_term}")
+                say(f"\n  tapping-term-ms = {tapping_term}")
 
             # Calculate quick-tap-ms
             # This should be below typical tap time to allow rapid tapping
             if taps:
-                taps_ms = [t * 1000 for t in taps]
-                avg_tap = statistics.mean(taps_ms)
+                avg_tap = taps.mean * 1000
                 quick_tap = int(avg_tap * 1.2)  # 120% of average tap
                 quick_tap = max(100, min(200, quick_tap))
-                recommendations[key]["quick_tap"] = quick_tap
-                print(f"  quick-tap-ms = {quick_tap}")
+                recommendations.setdefault(key, {})["quick_tap"] = quick_tap
+                say(f"  quick-tap-ms = {quick_tap}")
 
             # Calculate require-prior-idle-ms
             # This helps prevent accidental activation during rolling/sliding
             if activations:
-                act_ms = [a * 1000 for a in activations]
                 # Use 5th percentile - faster than this is likely a roll
-                percentile_5 = sorted(act_ms)[int(len(act_ms) * 0.05)] if len(act_ms) > 1 else min(act_ms)
+                percentile_5 = activations.quantile(0.05) * 1000
                 prior_idle = int(percentile_5 * 0.8)
                 prior_idle = max(50, min(150, prior_idle))
-                recommendations[key]["prior_idle"] = prior_idle
-                print(f"  require-prior-idle-ms = {prior_idle}")
-                print(f"    (prevents activation if key pressed within {prior_idle}ms of another)")
+                recommendations.setdefault(key, {})["prior_idle"] = prior_idle
+                say(f"  require-prior-idle-ms = {prior_idle}")
+                say(f"    (prevents activation if key pressed within {prior_idle}ms of another)")
 
             # Recommend flavor
             if taps and holds:
-                taps_ms = [t * 1000 for t in taps]
-                holds_ms = [h * 1000 for h in holds]
-                avg_tap = statistics.mean(taps_ms)
-                avg_hold = statistics.mean(holds_ms)
+                avg_tap = taps.mean * 1000
+                avg_hold = holds.mean * 1000
 
                 # If hold times are much longer than taps, use tap-preferred
                 if avg_hold > avg_tap * 2:
@@ -302,8 +399,8 @@ class HRMAnalyzer:
                 else:
                     flavor = "balanced"
 
-                recommendations[key]["flavor"] = flavor
-                print(f"  flavor = \"{flavor}\"")
+                recommendations.setdefault(key, {})["flavor"] = flavor
+                say(f"  flavor = \"{flavor}\"")
 
         return recommendations
 
@@ -351,8 +448,54 @@ def main():
         action="store_true",
         help="Include detailed explanations"
     )
+    parser.add_argument(
+        "--mmap",
+        action="store_true",
+        help="Scan binary log segments in place via mmap instead of loading them"
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Parse log files in N worker processes (0 = one per CPU core)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Re-parse every log file instead of using the parsed-event cache"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Merge-stream events file by file in constant memory instead of loading them all"
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="Pair presses and releases with NumPy array operations (needs numpy)"
+    )
+    parser.add_argument(
+        "--connect",
+        nargs="?",
+        const=ANALYSIS_SOCKET,
+        metavar="SOCKET",
+        help=f"Get the report from a running analysis_server.py (default socket: {ANALYSIS_SOCKET})"
+    )
+    add_profile_arguments(parser)
     args = parser.parse_args()
+    if args.connect:
+        connect(args.connect)
+        return
+    profiler = profiler_from_args(args)
+    try:
+        run(args, profiler)
+    finally:
+        profiler.stop()
+    profiler.report()
+
 
+def print_banner():
     print("\n" + "="*80)
     print("  HRM TIMING ANALYSIS")
     print("="*80)
@@ -360,25 +503,68 @@ def main():
     print("   We measure how long you hold keys and time between presses.")
     print("   Typos, spelling errors, and what you typed don't matter!\n")
 
-    analyzer = HRMAnalyzer()
 
-    print("Loading keyboard logs...")
-    analyzer.load_logs()
+def connect(socket_path):
+    """Print the report of a running analysis server instead of loading the logs."""
+    from analysis_server import query
 
-    if not analyzer.key_events:
-        print("No keyboard log data found!")
-        print("Please run 'python main.py start' first and type the test script.")
+    print_banner()
+    try:
+        _, status = query("status", socket_path)
+        output, _ = query("hrm", socket_path)
+    except OSError as e:
+        print(f"No analysis server on {socket_path} ({e})")
+        print("Start one with 'python3 analysis_server.py', or run without --connect.")
         return
+    print(f"Analysis server: {status['events']} keyboard events from {status['files']} log files")
+    print(output, end="")
+    print_next_steps()
 
-    print(f"Loaded {len(analyzer.key_events)} keyboard events")
 
-    print("Analyzing HRM patterns...")
-    analyzer.analyze_events()
+def run(args, profiler):
+    print_banner()
+
+    analyzer = HRMAnalyzer()
+
+    cache = None if args.no_cache else EventCache()
+
+    if args.stream:
+        print("Streaming keyboard logs and analyzing HRM patterns...")
+        with profiler.stage("stream_logs") as stage:
+            analyzer.stream_logs(cache=cache)
+            stage.events = analyzer.events_analyzed
+        if not analyzer.events_analyzed:
+            print("No keyboard log data found!")
+            print("Please run 'python main.py start' first and type the test script.")
+            return
+        print(f"Analyzed {analyzer.events_analyzed} keyboard events")
+    else:
+        print("Loading keyboard logs...")
+        analyzer.load_logs(use_mmap=args.mmap, jobs=args.jobs, cache=cache, profiler=profiler)
+
+        if not analyzer.event_count:
+            print("No keyboard log data found!")
+            print("Please run 'python main.py start' first and type the test script.")
+            return
+
+        print(f"Loaded {analyzer.event_count} keyboard events")
+
+        print("Analyzing HRM patterns...")
+        with profiler.stage("analyze_events", analyzer.event_count):
+            if args.vectorized:
+                analyzer.analyze_vectorized()
+            else:
+                analyzer.analyze_events()
 
     analyzer.print_statistics()
-    recommendations = analyzer.calculate_recommendations()
+    with profiler.stage("calculate_recommendations", analyzer.events_analyzed):
+        recommendations = analyzer.calculate_recommendations()
     analyzer.generate_zmk_config(recommendations)
 
+    print_next_steps()
+
+
+def print_next_steps():
     print("\n" + "="*80)
     print("KEY INSIGHTS & NEXT STEPS")
     print("="*80)
@@ -1,61 +1,178 @@
 import threading
-import json
+import time
 
 from utils import get_timestamp, print_message
-from log import Log, Record
-from constants import DEFAULT_LOG_MODE, LOG_DIR
+from log import Log
+from key_events import KeyTable
+from constants import DEFAULT_LOG_MODE, LOG_COMPRESSION, LOG_DIR
+from segment import SEGMENT_EXTENSION, write_segment
+from log_writer import NDJSONWriter
+from log_compression import compression_extension, open_log
+from capture_stats import CaptureStats, SessionClock
 
 class InputLogger(threading.Thread):
+    """
+    Base of the input loggers.
+
+    Input callbacks append to self.log while a single writer thread
+    (start_writer) saves it every interval. The log is double-buffered:
+    the writer swaps in the spare buffer under buffer_lock, an O(1)
+    exchange of two references, and serializes the full one outside the
+    lock, so the callbacks never wait for disk I/O. A batch whose write
+    fails is put back in front of the records captured since, so the next
+    flush retries it. stop() ends the writer after a final flush of
+    everything captured.
+
+    Records are stamped with perf_counter_ns() ticks of the session clock
+    and the writer saves self.stats after every flush.
+    """
 
     def __init__(self, time_interval=10):
         threading.Thread.__init__(self)
         self._stop_event = threading.Event()
         self.interval = time_interval
-        self.log = Log()
+        self.key_table = KeyTable()
+        self.clock = SessionClock()
+        self.stats = CaptureStats(self.clock)
+        self.log = Log(key_table=self.key_table, clock=self.clock)
+        self.spare_log = Log(key_table=self.key_table, clock=self.clock)
+        # Held by the callbacks while appending and by the writer while swapping
+        self.buffer_lock = threading.Lock()
+        self.writer = None
+        self.ndjson_writer = None
+        # Optional queue.SimpleQueue that also receives every
+        # (timestamp, key_id, is_press) as it is captured (live tuning)
+        self.event_queue = None
 
     def add_record(self, button, is_on_press, coordinates=[0.0, 0.0], timestamp=None):
-        ts = timestamp if timestamp is not None else get_timestamp()
-        record = Record(timestamp=ts, button=button, is_on_press=is_on_press, coordinates=coordinates)
-        self.log.append_log(record)
+        ticks = time.perf_counter_ns() if timestamp is None else self.clock.to_ticks(timestamp)
+        key_id = self.key_table.intern(button)
+        with self.buffer_lock:
+            self.log.append_ticks(ticks, key_id, is_on_press, coordinates[0], coordinates[1])
+
+    def start_writer(self, filename, mode=DEFAULT_LOG_MODE):
+        """Start the writer thread saving the log to LOG_DIR + filename every interval."""
+        self.writer = threading.Thread(target=self.write_loop, args=(LOG_DIR + filename, mode),
+                                       name="log-writer", daemon=True)
+        self.writer.start()
+
+    def write_loop(self, filename, mode):
+        while not self._stop_event.wait(self.interval):
+            self.try_save_log(filename, mode)
+        # Final flush: stop() has already stopped the input callbacks
+        self.try_save_log(filename, mode, final=True)
+        if self.ndjson_writer is not None:
+            self.ndjson_writer.close()
+
+    def try_save_log(self, filename, mode, final=False):
+        # A failed flush must not end the writer thread; its events are
+        # retried by the next flush, or dropped if this was the last one
+        try:
+            self.save_log(filename, mode)
+        except Exception as e:
+            print_message(f"Error while saving log: {e}")
+            if final:
+                self.stats.dropped += len(self.log)
+        try:
+            self.stats.save()
+        except OSError as e:
+            print_message(f"Error while saving capture stats: {e}")
+
+    def stop(self):
+        """Stop the writer after it has saved every captured event."""
+        self._stop_event.set()
+        if self.writer is not None:
+            self.writer.join()
+
+    def swap_buffer(self):
+        """Swap the spare buffer in for capturing and return the full one."""
+        spare = self.spare_log
+        if spare is None:
+            spare = Log(key_table=self.key_table, clock=self.clock)
+        spare.timestamp = get_timestamp()
+        with self.buffer_lock:
+            full, self.log = self.log, spare
+        self.spare_log = None
+        return full
 
-    def save_log_every_timeframe(self, filename, mode=DEFAULT_LOG_MODE):
-        threading.Timer(self.interval, self.save_log_every_timeframe, [filename]).start()
-        self.save_log(LOG_DIR + filename, mode)
+    def restore_buffer(self, log):
+        """Put back a batch whose write failed, ahead of the records captured since."""
+        with self.buffer_lock:
+            log.extend(self.log)
+            log, self.log = self.log, log
+        self.clear_buffer(log)
 
     def save_log(self, filename, mode=DEFAULT_LOG_MODE):
+        log = self.swap_buffer()
+        depth = len(log)
+        start = time.perf_counter_ns()
+        failed = True
+        try:
+            log.resolve_timestamps()
+            self.write_buffer(log, filename, mode)
+            failed = False
+        except Exception:
+            self.restore_buffer(log)
+            raise
+        finally:
+            queue_depth = self.event_queue.qsize() if self.event_queue is not None else 0
+            self.stats.record_flush(depth, time.perf_counter_ns() - start, failed, queue_depth)
+        self.clear_buffer(log)
+
+    def write_buffer(self, log, filename, mode):
         ts = get_timestamp()
         if mode == 'json':
             filename = self.generate_filename(ts, filename, mode)
-            self.save_json(filename)
+            self.save_json(filename, log)
             print_message("Save log to " + filename)
         elif mode == 'text':
             filename = self.generate_filename(ts, filename, mode)
-            self.save_text(filename)
+            self.save_text(filename, log)
+            print_message("Save log to " + filename)
+        elif mode == 'binary':
+            filename = self.generate_filename(ts, filename, mode)
+            self.save_binary(filename, log)
             print_message("Save log to " + filename)
+        elif mode == 'ndjson':
+            filename = self.save_ndjson(filename, log)
+            print_message("Append log to " + filename)
         else:
             raise ValueError('No such log option')
 
-        self.clear_buffer()
-
     def generate_filename(self, ts, filename, mode):
         if mode == 'json':
             extension = '.json'
         elif mode == 'text':
             extension = '.txt'
+        elif mode == 'binary':
+            extension = SEGMENT_EXTENSION
         else:
             raise ValueError('Option error for filename generation')
 
-        filename = filename + '_' + ts + extension
+        filename = filename + '_' + ts + extension + compression_extension(LOG_COMPRESSION)
         return filename
 
-    def save_json(self, filename):
-        with open(filename, 'w') as json_file:
-            json.dump(self.log.to_json(), json_file)
+    def save_json(self, filename, log):
+        with open_log(filename, 'w') as json_file:
+            log.write_json(json_file)
+
+    def save_text(self, filename, log):
+        with open_log(filename, "w") as text_file:
+            text_file.write(str(log))
+
+    def save_binary(self, filename, log):
+        write_segment(filename, **log.to_columns())
 
-    def save_text(self, filename):
-        with open(filename, "w") as text_file:
-            text_file.write(str(self.log))
+    def save_ndjson(self, filename, log):
+        # One append-only file per session; filename is the base name
+        if self.ndjson_writer is None or self.ndjson_writer.basename != filename:
+            if self.ndjson_writer is not None:
+                self.ndjson_writer.close()
+            self.ndjson_writer = NDJSONWriter(filename, compression=LOG_COMPRESSION, header=log.header())
+        return self.ndjson_writer.write_lines(log.iter_record_json())
 
-    def clear_buffer(self):
-        self.log = Log()
+    def clear_buffer(self, log):
+        # The saved buffer becomes the spare for the next swap
+        log.clear()
+        self.spare_log = log
 
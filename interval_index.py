@@ -0,0 +1,67 @@
+"""
+Key holds as [press, release) intervals.
+
+HeldKeys is the sweep line used while streaming events in time order: the
+keys currently down, ordered by press time, so "which keys went down
+after this one" is a bisect plus the k keys it returns instead of a scan
+of everything held.
+
+Only hrmAnalysis uses it. The cross-hand roll query ("overlap with the
+next cross-hand key") is answered by analyze_overlap.RollTracker in the
+same single pass without an index: a roll only waits for the first
+cross-hand press after it, and auto-repeat presses of a held key each
+open a roll of their own, which a one-hold-per-key index can't express.
+"""
+
+from bisect import bisect_right
+
+
+class HeldKeys:
+    """Keys currently held down, ordered by press time.
+
+    Presses must arrive in time order. A repeated press of a held key
+    restarts its hold. Released holds are dropped lazily and the order is
+    compacted once most entries are stale.
+    """
+
+    def __init__(self):
+        self.down_times = {}  # key id -> press timestamp of its open hold
+        self._positions = {}  # key id -> index of its open hold in _starts
+        self._starts = []
+        self._keys = []
+
+    def __len__(self):
+        return len(self.down_times)
+
+    def __contains__(self, key_id):
+        return key_id in self.down_times
+
+    def press(self, key_id, timestamp):
+        self.down_times[key_id] = timestamp
+        self._positions[key_id] = len(self._starts)
+        self._starts.append(timestamp)
+        self._keys.append(key_id)
+
+    def release(self, key_id):
+        """Close the hold of key_id and return its press timestamp (None if not held)."""
+        down_time = self.down_times.pop(key_id, None)
+        if down_time is not None:
+            del self._positions[key_id]
+            if len(self._starts) > 32 and len(self._starts) > 4 * len(self.down_times):
+                self._compact()
+        return down_time
+
+    def pressed_after(self, timestamp):
+        """Ids of held keys pressed strictly after timestamp, in press order."""
+        positions = self._positions
+        keys = self._keys
+        return [
+            keys[i] for i in range(bisect_right(self._starts, timestamp), len(keys))
+            if positions.get(keys[i]) == i
+        ]
+
+    def _compact(self):
+        live = sorted(self._positions.values())
+        self._starts = [self._starts[i] for i in live]
+        self._keys = [self._keys[i] for i in live]
+        self._positions = {key_id: i for i, key_id in enumerate(self._keys)}
@@ -0,0 +1,109 @@
+from array import array
+
+
+class KeyTable:
+    """
+    Interning table mapping key names to small integer ids.
+
+    Ids are dense and assigned in first-seen order, so per-key lookup
+    arrays can be indexed directly by id.
+    """
+
+    def __init__(self, names=()):
+        self.names = []
+        self.ids = {}
+        for name in names:
+            self.intern(name)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __getitem__(self, key_id):
+        return self.names[key_id]
+
+    def intern(self, name):
+        """Return the id of a key name, adding it to the table if needed."""
+        key_id = self.ids.get(name)
+        if key_id is None:
+            key_id = len(self.names)
+            self.names.append(name)
+            self.ids[name] = key_id
+        return key_id
+
+    def get(self, name, default=None):
+        return self.ids.get(name, default)
+
+    def mask(self, predicate):
+        """Lookup array with 1 at every id whose name satisfies predicate.
+
+        predicate may be a callable or a collection of key names.
+        """
+        if not callable(predicate):
+            predicate = predicate.__contains__
+        return bytearray(1 if predicate(name) else 0 for name in self.names)
+
+
+class KeyEvents:
+    """
+    Columnar store of key events.
+
+    Events are kept as parallel arrays (timestamp, key id, press flag) and
+    key ids index into ``keys``, the KeyTable of this dataset.
+    """
+
+    def __init__(self, keys=None):
+        self.keys = KeyTable(keys or ())
+        self.timestamps = array('d')
+        self.key_ids = array('H')
+        self.is_press = array('B')
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __iter__(self):
+        """Yield (key, timestamp, is_press) tuples in storage order."""
+        keys = self.keys.names
+        for timestamp, key_id, is_press in zip(self.timestamps, self.key_ids, self.is_press):
+            yield keys[key_id], timestamp, bool(is_press)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        # Nothing to release; lets KeyEvents stand in for a MappedSegment
+        pass
+
+    def key_id(self, name):
+        """Return the id of a key name, adding it to the table if needed."""
+        return self.keys.intern(name)
+
+    def append(self, key, timestamp, is_press):
+        self.timestamps.append(timestamp)
+        self.key_ids.append(self.key_id(key))
+        self.is_press.append(1 if is_press else 0)
+
+    def extend(self, other):
+        """Append all events of another KeyEvents, remapping its key ids."""
+        remap = [self.key_id(name) for name in other.keys]
+        self.timestamps.extend(other.timestamps)
+        if remap == list(range(len(remap))):
+            self.key_ids.extend(other.key_ids)
+        else:
+            self.key_ids.extend(remap[key_id] for key_id in other.key_ids)
+        self.is_press.extend(other.is_press)
+
+    def sort(self):
+        """Stable-sort events by timestamp."""
+        timestamps = self.timestamps
+        if all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1)):
+            return
+        order = sorted(range(len(timestamps)), key=timestamps.__getitem__)
+        self.timestamps = array('d', (timestamps[i] for i in order))
+        self.key_ids = array('H', (self.key_ids[i] for i in order))
+        self.is_press = array('B', (self.is_press[i] for i in order))
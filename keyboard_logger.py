@@ -1,5 +1,6 @@
 from pynput import keyboard
-import time  # for high-precision timestamps
+import string
+import time  # perf_counter_ns() capture stamps
 
 from utils import print_message
 from input_logger import InputLogger
@@ -14,6 +15,25 @@ class KeyboardLogger(InputLogger):
 
     def __init__(self):
         super().__init__(KEYBOARD_LOG_INTERVAL)
+        self.key_dispatch = self.build_key_dispatch()
+        self.listener = None
+
+    def build_key_dispatch(self):
+        # Map pynput Key/KeyCode objects straight to interned key ids so the
+        # callbacks skip parse_key for every key known up front
+        dispatch = {}
+        for key in keyboard.Key:
+            dispatch[key] = self.key_table.intern(self.parse_key(key))
+        for char in string.printable:
+            key = keyboard.KeyCode.from_char(char)
+            dispatch[key] = self.key_table.intern(self.parse_key(key))
+        return dispatch
+
+    def key_id(self, key):
+        key_id = self.key_dispatch.get(key)
+        if key_id is None:
+            key_id = self.key_dispatch[key] = self.key_table.intern(self.parse_key(key))
+        return key_id
 
     def parse_key(self, key):
         try:
@@ -33,22 +53,37 @@ class KeyboardLogger(InputLogger):
                 keyStr = str(key).strip()
         return keyStr
 
+    def record(self, key, is_press):
+        # Stamped first, so key parsing doesn't delay the timestamp
+        ticks = time.perf_counter_ns()
+        key_id = self.key_id(key)
+        with self.buffer_lock:
+            self.log.append_ticks(ticks, key_id, is_press)
+        if self.event_queue is not None:
+            self.event_queue.put((self.clock.to_seconds(ticks), key_id, is_press))
+        self.stats.record_callback(ticks)
+
     def on_press(self, key):
         if not KEYBOARD_LOG_ON_PRESS:
             return
-        keyStr = self.parse_key(key)
-        self.add_record(keyStr, is_on_press=True, timestamp=time.time())
+        self.record(key, True)
 
     def on_release(self, key):
         if not KEYBOARD_LOG_ON_RELEASE:
             return
-        keyStr = self.parse_key(key)
-        self.add_record(keyStr, is_on_press=False, timestamp=time.time())
+        self.record(key, False)
 
     def run(self):
         print_message("===== Start Recording Keyboard Input =====")
-        self.save_log_every_timeframe(KEYBOARD_LOG_FILENAME)
-        keyboard_listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
-        with keyboard_listener:
-            keyboard_listener.join()
+        self.start_writer(KEYBOARD_LOG_FILENAME)
+        self.listener = keyboard.Listener(on_press=self.on_press, on_release=self.on_release)
+        with self.listener:
+            self.listener.join()
+
+    def stop(self):
+        # No more callbacks, then the writer's final flush
+        if self.listener is not None:
+            self.listener.stop()
+        super().stop()
+        print_message("===== Stop Recording Keyboard Input =====")
 
@@ -0,0 +1,70 @@
+"""
+Live tuning: HRM recommendations refreshed while the logger runs.
+
+KeyboardLogger puts every captured event on a queue. LiveTuner drains
+it every few seconds into an HRMAnalyzer that keeps its state between
+batches (held keys, per-key timing summaries), so a refresh costs only
+the events captured since the previous one and nothing is read back
+from disk. The listener thread only ever does a non-blocking put.
+"""
+
+import queue
+
+from hrmAnalysis import HRMAnalyzer, HRM_KEYS
+from constants import TUNE_REFRESH_INTERVAL
+from utils import print_message
+
+
+class LiveTuner:
+
+    def __init__(self, logger, interval=TUNE_REFRESH_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self.analyzer = HRMAnalyzer()
+        self.events = queue.SimpleQueue()
+        # The HRM keys are interned here, before the listener starts, so
+        # the tuner thread never adds to the logger's key table
+        for key in HRM_KEYS:
+            logger.key_table.intern(key)
+        logger.event_queue = self.events
+
+    def drain(self):
+        """Analyze every event queued since the last call and return how many there were."""
+        batch = []
+        while True:
+            try:
+                batch.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.analyzer.analyze_events(batch, self.logger.key_table)
+        return len(batch)
+
+    def report(self):
+        analyzer = self.analyzer
+        recommendations = analyzer.calculate_recommendations(quiet=True)
+        print_message(f"{analyzer.events_analyzed} events analyzed")
+        for key in sorted(HRM_KEYS):
+            taps = len(analyzer.pure_taps.get(key) or ())
+            holds = len(analyzer.hrm_holds.get(key) or ())
+            rec = recommendations.get(key)
+            if not rec:
+                print(f"  {key:<5}  no data yet")
+                continue
+            print(f"  {key:<5}  tapping-term-ms = {rec.get('tapping_term', '-'):<4}"
+                  f"quick-tap-ms = {rec.get('quick_tap', '-'):<4}"
+                  f"require-prior-idle-ms = {rec.get('prior_idle', '-'):<4}"
+                  f"({taps} taps, {holds} holds)")
+
+    def run(self, stopping):
+        """Refresh the recommendations every interval seconds until stopping is set or the logger ends."""
+        print_message(f"===== Live tuning: recommendations refresh every {self.interval}s =====")
+        while self.logger.is_alive() and not stopping.wait(self.interval):
+            if self.drain():
+                self.report()
+
+    def finish(self):
+        """Analyze what is left on the queue once the logger has stopped and report."""
+        self.drain()
+        print_message("===== Final recommendations =====")
+        self.report()
@@ -1,30 +1,171 @@
 import json
-from utils import get_timestamp
+from array import array
+
+from utils import get_timestamp, parse_timestamp
+from constants import LOG_BUFFER_CAPACITY
+from key_events import KeyTable
 
 class Log:
+    """
+    Capture buffer of keyboard records.
+
+    Records are stored column-wise in preallocated arrays (timestamps,
+    key ids, press flags, coordinates), so appending from the input
+    callback allocates nothing until the buffer has to grow. Key ids index
+    into key_table, which is usually shared by all buffers of a session.
+
+    With a clock (capture_stats.SessionClock) records are appended with
+    integer perf_counter_ns() ticks (append_ticks), and resolve_timestamps
+    converts them to timestamps before the buffer is saved. Every format
+    then also stores the clock's anchor, and JSON records keep their ticks.
+    """
 
-    def __init__(self):
+    def __init__(self, capacity=LOG_BUFFER_CAPACITY, key_table=None, clock=None):
         self.timestamp = get_timestamp()
-        self.records = []
+        self.key_table = key_table if key_table is not None else KeyTable()
+        self.clock = clock
+        self.size = 0
+        self.ticks = array('q', bytes(8 * capacity)) if clock is not None else None
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.key_ids = array('H', bytes(2 * capacity))
+        self.is_press = array('B', bytes(capacity))
+        self.coord_x = array('d', bytes(8 * capacity))
+        self.coord_y = array('d', bytes(8 * capacity))
+
+    def __len__(self):
+        return self.size
 
     def __str__(self):
-        string = ''
-        for record in self.records:
-            string += str(record) + '\n'
-        return string
+        lines = ''.join(str(record) + '\n' for record in self.records)
+        if self.clock is not None:
+            lines = '# clock ' + json.dumps(self.clock.anchor()) + '\n' + lines
+        return lines
+
+    @property
+    def records(self):
+        # Record views of the buffer, for callers that want objects
+        names = self.key_table.names
+        return [
+            Record(self.timestamps[i], names[self.key_ids[i]], bool(self.is_press[i]),
+                   [self.coord_x[i], self.coord_y[i]])
+            for i in range(self.size)
+        ]
+
+    def clear(self):
+        """Empty the buffer for reuse, keeping its capacity."""
+        self.size = 0
+
+    def grow(self):
+        capacity = len(self.timestamps)
+        if self.ticks is not None:
+            self.ticks.extend(array('q', bytes(8 * capacity)))
+        self.timestamps.extend(array('d', bytes(8 * capacity)))
+        self.key_ids.extend(array('H', bytes(2 * capacity)))
+        self.is_press.extend(array('B', bytes(capacity)))
+        self.coord_x.extend(array('d', bytes(8 * capacity)))
+        self.coord_y.extend(array('d', bytes(8 * capacity)))
+
+    def append(self, timestamp, key_id, is_on_press, x=0.0, y=0.0):
+        i = self.size
+        if i == len(self.timestamps):
+            self.grow()
+        self.timestamps[i] = timestamp
+        self.key_ids[i] = key_id
+        self.is_press[i] = 1 if is_on_press else 0
+        self.coord_x[i] = x
+        self.coord_y[i] = y
+        self.size = i + 1
+
+    def append_ticks(self, ticks, key_id, is_on_press, x=0.0, y=0.0):
+        i = self.size
+        if i == len(self.timestamps):
+            self.grow()
+        self.ticks[i] = ticks
+        self.key_ids[i] = key_id
+        self.is_press[i] = 1 if is_on_press else 0
+        self.coord_x[i] = x
+        self.coord_y[i] = y
+        self.size = i + 1
+
+    def extend(self, other):
+        """Append the records of another buffer sharing this one's key table."""
+        for i in range(other.size):
+            if self.ticks is not None:
+                self.append_ticks(other.ticks[i], other.key_ids[i], other.is_press[i],
+                                  other.coord_x[i], other.coord_y[i])
+            else:
+                self.append(other.timestamps[i], other.key_ids[i], other.is_press[i],
+                            other.coord_x[i], other.coord_y[i])
+
+    def resolve_timestamps(self):
+        """Fill the timestamps of records appended with ticks."""
+        to_seconds = self.clock.to_seconds
+        timestamps, ticks = self.timestamps, self.ticks
+        for i in range(self.size):
+            timestamps[i] = to_seconds(ticks[i])
 
     def append_log(self, record):
-        self.records.append(record)
+        timestamp = parse_timestamp(record.timestamp)
+        if timestamp is None:
+            return
+        self.append(timestamp, self.key_table.intern(record.button), record.is_on_press,
+                    record.coordinates[0], record.coordinates[1])
+
+    def iter_record_json(self):
+        # One JSON object per record, formatted exactly like the records of to_json()
+        # Each key name is JSON-encoded once per table entry, not per record
+        size = self.size
+        names = [json.dumps(name) for name in self.key_table.names]
+        timestamps, key_ids, is_press = self.timestamps, self.key_ids, self.is_press
+        coord_x, coord_y, ticks = self.coord_x, self.coord_y, self.ticks
+        if ticks is None:
+            for i in range(size):
+                yield '{"timestamp": %r, "button": %s, "is_on_press": %s, "coordinates": [%r, %r]}' % (
+                    timestamps[i], names[key_ids[i]], 'true' if is_press[i] else 'false',
+                    coord_x[i], coord_y[i])
+        else:
+            for i in range(size):
+                yield ('{"timestamp": %r, "button": %s, "is_on_press": %s, "coordinates": [%r, %r],'
+                       ' "ticks": %d}') % (
+                    timestamps[i], names[key_ids[i]], 'true' if is_press[i] else 'false',
+                    coord_x[i], coord_y[i], ticks[i])
+
+    def header(self):
+        """Fields stored next to the records: the clock anchor, if any."""
+        return {"clock": self.clock.anchor()} if self.clock is not None else {}
+
+    def write_json(self, json_file):
+        # Same document as json.dump(self.to_json()), without per-record dicts
+        json_file.write('{"timestamp": %s, ' % json.dumps(self.timestamp))
+        for name, value in self.header().items():
+            json_file.write('%s: %s, ' % (json.dumps(name), json.dumps(value)))
+        json_file.write('"records": [')
+        json_file.write(', '.join(self.iter_record_json()))
+        json_file.write(']}')
 
     def to_json(self):
         # Serialize list of records as dictionaries
+        records = [record.to_dict() for record in self.records]
+        if self.ticks is not None:
+            for record, ticks in zip(records, self.ticks):
+                record["ticks"] = ticks
+        return dict({"timestamp": self.timestamp}, **self.header(), records=records)
+
+    def to_columns(self):
+        # Column arrays of a binary segment; the key table becomes its header
         return {
-            "timestamp": self.timestamp,
-            "records": [record.to_dict() for record in self.records]
+            "keys": list(self.key_table.names),
+            "timestamps": self.timestamps[:self.size],
+            "key_ids": self.key_ids[:self.size],
+            "is_press": self.is_press[:self.size],
+            "coord_x": array('h', (int(x) for x in self.coord_x[:self.size])),
+            "coord_y": array('h', (int(y) for y in self.coord_y[:self.size])),
+            "header": self.header(),
         }
 
 
 class Record:
+    __slots__ = ("timestamp", "button", "is_on_press", "coordinates")
 
     def __init__(self, timestamp, button, is_on_press, coordinates):
         self.timestamp = timestamp  # can be a float or string
@@ -50,4 +191,3 @@ class Record:
             "is_on_press": self.is_on_press,
             "coordinates": self.coordinates,
         }
-
@@ -0,0 +1,281 @@
+"""
+Compaction and retention of keyboard logs ("main.py compact").
+
+The logger writes one small file per KEYBOARD_LOG_INTERVAL. compact_logs
+merges those flush files, in time order, into one binary segment per day
+(keyboard_log_<YYYYmmdd>_day.bin). The header of each day segment carries
+a summary of the day: time range, event count and presses per key. Only
+files that end before today are compacted (unless include_today), so a
+running logger is never raced, and a flush file is deleted only after
+every day it covers has been written. Day segments are written under a
+temporary name and read back before they replace anything; a day whose
+existing segment can't be read is left as it is, with its flush files.
+
+Retention: days older than keep_raw_days are reduced to their summary,
+a segment with the same header and no events. Analyzers skip those like
+any empty log file.
+"""
+
+import os
+import re
+import datetime
+import tempfile
+from array import array
+
+from constants import KEYBOARD_LOG_FILENAME, LOG_COMPRESSION, LOG_DIR, LOG_KEEP_RAW_DAYS
+from event_cache import EventCache
+from event_stream import merge_log_files, open_events
+from key_events import KeyTable
+from log_compression import compression_extension, strip_compression
+from log_reader import find_log_files
+from segment import SEGMENT_EXTENSION, read_segment_header, write_segment
+
+DAY_SEGMENT_PATTERN = re.compile(re.escape(KEYBOARD_LOG_FILENAME) + r"_(\d{8})_day" + re.escape(SEGMENT_EXTENSION) + "$")
+
+
+def segment_day(filepath):
+    """The day of a day segment, or None for any other log file."""
+    match = DAY_SEGMENT_PATTERN.search(strip_compression(os.path.basename(filepath)))
+    return datetime.datetime.strptime(match.group(1), "%Y%m%d").date() if match else None
+
+
+def day_segment_path(log_dir, day, compression=None):
+    return os.path.join(log_dir, f"{KEYBOARD_LOG_FILENAME}_{day:%Y%m%d}_day{SEGMENT_EXTENSION}"
+                                 f"{compression_extension(compression)}")
+
+
+def day_start(day):
+    """Timestamp of local midnight at the start of day."""
+    return datetime.datetime.combine(day, datetime.time()).timestamp()
+
+
+def summarize(day, timestamps, key_ids, is_press, names):
+    """Summary header of one day of events."""
+    presses = [0] * len(names)
+    for key_id, pressed in zip(key_ids, is_press):
+        if pressed:
+            presses[key_id] += 1
+    return {
+        "day": day.isoformat(),
+        "first_timestamp": timestamps[0] if timestamps else None,
+        "last_timestamp": timestamps[-1] if timestamps else None,
+        "events": len(timestamps),
+        "key_presses": {name: count for name, count in zip(names, presses) if count},
+        "raw": True,
+    }
+
+
+def merge_summaries(summary, other):
+    """Fold the summary of events no longer on disk (other) into summary."""
+    merged = dict(summary)
+    stamps = [s[field] for s in (summary, other)
+              for field in ("first_timestamp", "last_timestamp") if s[field] is not None]
+    merged["first_timestamp"] = min(stamps) if stamps else None
+    merged["last_timestamp"] = max(stamps) if stamps else None
+    merged["events"] = summary["events"] + other["events"]
+    key_presses = dict(summary["key_presses"])
+    for name, count in other["key_presses"].items():
+        key_presses[name] = key_presses.get(name, 0) + count
+    merged["key_presses"] = key_presses
+    return merged
+
+
+def temporary_path(filepath):
+    """Hidden name next to filepath that keeps its codec suffix last, so it is written alike."""
+    directory, name = os.path.split(filepath)
+    return os.path.join(directory, ".tmp-" + name)
+
+
+def write_verified_segment(filepath, keys, timestamps, key_ids, is_press, summary):
+    """Write a segment under the temporary name of filepath and read its header back.
+
+    Returns the temporary path, for os.replace into filepath.
+    """
+    temporary = temporary_path(filepath)
+    write_segment(temporary, keys, timestamps, key_ids, is_press, header={"summary": summary})
+    try:
+        if read_segment_header(temporary).get("summary") != summary:
+            raise ValueError(f"{temporary} does not read back as written")
+    except Exception:
+        os.remove(temporary)
+        raise
+    return temporary
+
+
+def replace_segment(filepath, keys, timestamps, key_ids, is_press, summary):
+    """Write a segment next to filepath and move it into place."""
+    os.replace(write_verified_segment(filepath, keys, timestamps, key_ids, is_press, summary), filepath)
+
+
+def file_range(filepath, cache=None):
+    """(first, last) timestamp of a log file, or None if it has no events."""
+    with open_events(filepath, cache) as events:
+        if not len(events):
+            return None
+        return min(events.timestamps), max(events.timestamps)
+
+
+def compact_logs(log_dir=LOG_DIR, keep_raw_days=LOG_KEEP_RAW_DAYS, include_today=False,
+                 compression=LOG_COMPRESSION, today=None, report=print):
+    """
+    Merge flush files into day segments, then apply the retention policy.
+
+    Returns (flush files compacted, days written, days reduced to summaries).
+    """
+    today = today or datetime.date.today()
+    cutoff = float("inf") if include_today else day_start(today)
+
+    day_segments = {}
+    flush_files = []
+    for filepath in find_log_files(log_dir):
+        day = segment_day(filepath)
+        if day is None:
+            flush_files.append(filepath)
+        else:
+            day_segments.setdefault(day, []).append(filepath)
+
+    # Flush files are parsed once, into a scratch cache that the range
+    # scan and the merge share
+    with tempfile.TemporaryDirectory(prefix="hrm-compact-") as scratch:
+        cache = EventCache(scratch)
+
+        # Flush files that end before the cutoff, and the days they cover
+        sources = {}
+        days = set()
+        for filepath in flush_files:
+            try:
+                time_range = file_range(filepath, cache)
+            except Exception as e:
+                report(f"Skipping {filepath}: {e}")
+                continue
+            if time_range is None:
+                sources[filepath] = set()
+                continue
+            first, last = time_range
+            if last >= cutoff:
+                continue
+            sources[filepath] = set()
+            day = datetime.date.fromtimestamp(first)
+            while day <= datetime.date.fromtimestamp(last):
+                sources[filepath].add(day)
+                day += datetime.timedelta(days=1)
+            days |= sources[filepath]
+
+        # Days already compacted are merged again with the new events
+        previous = {}
+        unreadable = set()
+        inputs = list(sources)
+        for day in days:
+            for filepath in day_segments.get(day, ()):
+                try:
+                    summary = read_segment_header(filepath).get("summary")
+                except Exception as e:
+                    report(f"Error reading {filepath}: {e}")
+                    unreadable.add(day)
+                    continue
+                if summary is not None and not summary.get("raw", True):
+                    previous[day] = summary
+                else:
+                    inputs.append(filepath)
+
+        failed = []
+        key_table = KeyTable()
+        pending = []
+        current, start, end = None, None, None
+        timestamps, key_ids, is_press = array('d'), array('H'), array('B')
+
+        def write_day():
+            # Rewriting a day whose segment could not be read would lose its events
+            failed_paths = {filepath for filepath, _ in failed}
+            if any(filepath in failed_paths for filepath in day_segments.get(current, ())):
+                unreadable.add(current)
+            if current in unreadable:
+                return
+            names = key_table.names
+            summary = summarize(current, timestamps, key_ids, is_press, names)
+            if current in previous:
+                summary = merge_summaries(summary, previous[current])
+            filepath = day_segment_path(log_dir, current, compression)
+            temporary = write_verified_segment(filepath, names, timestamps, key_ids, is_press, summary)
+            pending.append((current, temporary, filepath))
+
+        try:
+            events = merge_log_files(inputs, key_table, cache,
+                                     on_error=lambda filepath, e: failed.append((filepath, e)))
+            for timestamp, key_id, pressed in events:
+                if current is None or not start <= timestamp < end:
+                    if current is not None:
+                        write_day()
+                    current = datetime.date.fromtimestamp(timestamp)
+                    start = day_start(current)
+                    end = day_start(current + datetime.timedelta(days=1))
+                    timestamps, key_ids, is_press = array('d'), array('H'), array('B')
+                timestamps.append(timestamp)
+                key_ids.append(key_id)
+                is_press.append(pressed)
+            if current is not None:
+                write_day()
+        except Exception:
+            for _, temporary, _ in pending:
+                os.remove(temporary)
+            raise
+
+    # A source kept for a skipped day must not also land in another
+    # rewritten day, or its events would be merged twice next time
+    skipped = set(unreadable)
+    while True:
+        spanned = set()
+        for covered in sources.values():
+            if covered & skipped:
+                spanned |= covered
+        if spanned <= skipped:
+            break
+        skipped |= spanned
+
+    # Every day is written and read back before it replaces anything
+    written = []
+    for day, temporary, filepath in pending:
+        if day in skipped:
+            os.remove(temporary)
+            continue
+        os.replace(temporary, filepath)
+        for old in day_segments.get(day, ()):
+            if old != filepath:
+                os.remove(old)
+        day_segments[day] = [filepath]
+        written.append(day)
+
+    # Sources are gone only once every day they cover is on disk
+    for filepath, error in failed:
+        report(f"Error reading {filepath}: {error}")
+    for day in sorted(skipped):
+        if day in unreadable:
+            report(f"Not compacting {day}: its day segment could not be read")
+        else:
+            report(f"Not compacting {day}: it shares flush files with a day that could not be compacted")
+    failed_paths = {filepath for filepath, _ in failed}
+    compacted = 0
+    for filepath, covered in sources.items():
+        if filepath not in failed_paths and not covered & skipped:
+            os.remove(filepath)
+            compacted += 1
+
+    reduced = []
+    if keep_raw_days is not None:
+        oldest_raw = today - datetime.timedelta(days=keep_raw_days)
+        for day, filepaths in sorted(day_segments.items()):
+            if day >= oldest_raw:
+                continue
+            for filepath in filepaths:
+                try:
+                    summary = read_segment_header(filepath).get("summary")
+                except Exception as e:
+                    report(f"Error reading {filepath}: {e}")
+                    continue
+                if summary is None or not summary.get("raw", True):
+                    continue
+                summary = dict(summary, raw=False)
+                replace_segment(filepath, [], array('d'), array('H'), array('B'), summary)
+                reduced.append(day)
+
+    return compacted, written, reduced
@@ -0,0 +1,61 @@
+"""
+Transparent compression of log files, chosen by file extension.
+
+A log file name may end in a compression suffix after its format
+extension (keyboard_log_..._.json.gz, .bin.xz, .ndjson.zst). open_log
+picks the codec from the suffix and returns a file object that
+compresses on write and decompresses incrementally on read, so readers
+stream through compressed files exactly like plain ones.
+
+zstd needs Python 3.14 (compression.zstd); the other codecs are always
+available.
+"""
+
+import bz2
+import gzip
+import lzma
+
+try:
+    from compression import zstd
+except ImportError:
+    zstd = None
+
+# Compression name -> (file suffix, module with a gzip.open-like open())
+CODECS = {
+    "gzip": (".gz", gzip),
+    "bz2": (".bz2", bz2),
+    "lzma": (".xz", lzma),
+}
+if zstd is not None:
+    CODECS["zstd"] = (".zst", zstd)
+
+COMPRESSED_EXTENSIONS = tuple(suffix for suffix, _ in CODECS.values())
+
+
+def compression_extension(compression):
+    """File suffix of a compression name ("" for None)."""
+    if compression is None:
+        return ""
+    if compression not in CODECS:
+        raise ValueError(f"Compression '{compression}' is not available "
+                         f"(choose from {', '.join(CODECS)})")
+    return CODECS[compression][0]
+
+
+def strip_compression(filepath):
+    """filepath without its compression suffix, if it has one."""
+    for suffix in COMPRESSED_EXTENSIONS:
+        if filepath.endswith(suffix):
+            return filepath[:-len(suffix)]
+    return filepath
+
+
+def open_log(filepath, mode="r", **kwargs):
+    """open() that (de)compresses by the file suffix; text or binary like open()."""
+    for suffix, codec in CODECS.values():
+        if filepath.endswith(suffix):
+            if "b" not in mode and "t" not in mode:
+                mode += "t"
+            kwargs.pop("buffering", None)
+            return codec.open(filepath, mode, **kwargs)
+    return open(filepath, mode, **kwargs)
@@ -0,0 +1,355 @@
+"""
+Format-agnostic loading of keyboard log files for the analyzers.
+
+JSON files (the ``Log.to_json()`` schema) are decoded record by record
+as they are read, NDJSON session files are streamed line by line, and
+binary segments are read straight into column arrays or memory-mapped
+in place. Any of them may be compressed (see log_compression); they are
+decompressed as they are read.
+"""
+
+import os
+import re
+import glob
+import json
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+
+from key_events import KeyEvents
+from segment import SEGMENT_EXTENSION, open_segment, read_segment, read_segment_start
+from log_writer import NDJSON_EXTENSION
+from log_compression import COMPRESSED_EXTENSIONS, open_log, strip_compression
+from utils import parse_timestamp
+
+LOG_EXTENSIONS = (".json", NDJSON_EXTENSION, SEGMENT_EXTENSION)
+
+# Characters of (decompressed) JSON read at a time
+JSON_CHUNK_SIZE = 1 << 16
+JSON_DECODER = json.JSONDecoder()
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+# What may still follow a number: a number decoded from a buffer that ends
+# in these characters may be cut off by the chunk boundary ("12345." + "678")
+NUMBER_TAIL = re.compile(r"[0-9.eE+-]*\Z")
+
+
+def cut_off(value, buffer, end):
+    """Whether value, decoded from buffer up to end, may continue in the next chunk."""
+    return end == len(buffer) or (type(value) in (int, float) and NUMBER_TAIL.match(buffer, end) is not None)
+
+
+def find_log_files(log_dir, pattern="keyboard_log_*"):
+    """Return all supported log files under log_dir matching pattern, compressed or not."""
+    files = []
+    for extension in LOG_EXTENSIONS:
+        for suffix in ("",) + COMPRESSED_EXTENSIONS:
+            files.extend(glob.glob(os.path.join(log_dir, pattern + extension + suffix)))
+    return sorted(files)
+
+
+class JSONChunks:
+    """Decodes JSON values one at a time from a text file read in chunks."""
+
+    def __init__(self, f, chunk_size=JSON_CHUNK_SIZE):
+        self.file = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+
+    def fill(self):
+        """Read the next chunk into the buffer; False at the end of the file."""
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """The next non-whitespace character ("" at the end of the file)."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def skip(self, char):
+        """Consume char if it comes next; returns whether it did."""
+        if self.peek() != char:
+            return False
+        self.pos += 1
+        return True
+
+    def expect(self, char):
+        if not self.skip(char):
+            raise ValueError(f"Expected '{char}' in JSON log")
+
+    def value(self):
+        """Decode the next JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = JSON_DECODER.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.fill():
+                    raise
+                continue
+            if not cut_off(value, self.buffer, end) or not self.fill():
+                self.pos = end
+                return value
+
+    def items(self):
+        """Yield the items of the JSON array that comes next.
+
+        Items are decoded straight off the buffer; only an item cut off by
+        the end of the buffer waits for the next chunk.
+        """
+        self.expect("[")
+        # scan_once is what raw_decode calls, minus its per-call wrapper
+        decode = JSON_DECODER.scan_once
+        skip_whitespace = WHITESPACE.match
+        while True:
+            buffer, pos = self.buffer, self.pos
+            while True:
+                try:
+                    value, end = decode(buffer, pos)
+                except StopIteration:
+                    # Whitespace, a separator that came after a chunk boundary,
+                    # the end of the array, or the end of the buffer
+                    skipped = skip_whitespace(buffer, pos).end()
+                    if buffer.startswith("]", skipped):
+                        self.pos = skipped + 1
+                        return
+                    if buffer.startswith(",", skipped):
+                        pos = skipped + 1
+                        continue
+                    if skipped == pos:
+                        break
+                    pos = skipped
+                    continue
+                except ValueError:
+                    # An item cut off by the end of the buffer
+                    break
+                # Records are objects; only a number can decode from a cut-off item
+                if end == len(buffer) or (type(value) in (int, float) and cut_off(value, buffer, end)):
+                    break
+                yield value
+                # Log.write_json separates records with ", "
+                if buffer.startswith(", ", end):
+                    pos = end + 2
+                else:
+                    pos = skip_whitespace(buffer, end).end()
+                    if buffer.startswith(",", pos):
+                        pos += 1
+            self.pos = pos
+            if not self.fill():
+                raise ValueError("Unterminated array in JSON log")
+
+
+def iter_json_records(filepath):
+    """Yield the record dicts of a JSON log file.
+
+    Records are decoded one at a time while the file is read (and
+    decompressed) in chunks, so a flush is never held in memory whole.
+    Older logs that store the document as a JSON string are decoded at once.
+    """
+    with open_log(filepath, "r") as f:
+        stream = JSONChunks(f)
+        if stream.peek() != "{":
+            outer = stream.value()
+            if isinstance(outer, str):
+                outer = json.loads(outer)
+            yield from outer.get("records", [])
+            return
+
+        stream.expect("{")
+        while not stream.skip("}"):
+            name = stream.value()
+            stream.expect(":")
+            if name == "records":
+                yield from stream.items()
+            else:
+                stream.value()
+            stream.skip(",")
+
+
+def iter_ndjson_records(filepath):
+    """Yield the record dicts of an NDJSON log file, one line at a time."""
+    with open_log(filepath, "r") as f:
+        try:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A partially written last line (e.g. after a crash)
+                    continue
+        except EOFError:
+            # A compressed file still being appended to ends mid-stream
+            return
+
+
+def read_ndjson_tail(filepath, offset=0):
+    """Events of the complete lines of an NDJSON file from offset on.
+
+    offset counts uncompressed bytes. Returns (events, offset after the
+    last complete line), so a file that is still being appended to can
+    be read again from where this left off.
+    """
+    records = []
+    with open_log(filepath, "rb") as f:
+        f.seek(offset)
+        try:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # A blank or partially written line
+                    continue
+        except EOFError:
+            # A compressed file still being appended to ends mid-stream
+            pass
+
+    events = KeyEvents()
+    for key, timestamp, is_press in iter_events(records):
+        events.append(key, timestamp, is_press)
+    return events, offset
+
+
+def iter_events(records):
+    """Turn record dicts into (key, timestamp, is_press), skipping malformed ones."""
+    for record in records:
+        key = record.get("button")
+        ts_raw = record.get("timestamp")
+
+        if not key or ts_raw is None:
+            continue
+
+        timestamp = parse_timestamp(ts_raw)
+        if timestamp is None:
+            continue
+
+        yield key, timestamp, record.get("is_on_press")
+
+
+def iter_log_events(filepath):
+    """Yield (key, timestamp, is_press) from any supported log file."""
+    uncompressed = strip_compression(filepath)
+    if uncompressed.endswith(SEGMENT_EXTENSION):
+        yield from read_segment(filepath)
+    elif uncompressed.endswith(NDJSON_EXTENSION):
+        yield from iter_events(iter_ndjson_records(filepath))
+    else:
+        yield from iter_events(iter_json_records(filepath))
+
+
+def read_first_timestamp(filepath):
+    """Timestamp of the first event of a log file, or None if it has none.
+
+    Reads only as far as that event: one JSON chunk, one NDJSON line or a
+    segment header.
+    """
+    if strip_compression(filepath).endswith(SEGMENT_EXTENSION):
+        return read_segment_start(filepath)
+    events = iter_log_events(filepath)
+    try:
+        for _, timestamp, _ in events:
+            return timestamp
+        return None
+    finally:
+        events.close()
+
+
+def load_log_file(filepath):
+    """Load any supported log file into KeyEvents, by extension."""
+    if strip_compression(filepath).endswith(SEGMENT_EXTENSION):
+        return read_segment(filepath)
+
+    events = KeyEvents()
+    for key, timestamp, is_press in iter_log_events(filepath):
+        events.append(key, timestamp, is_press)
+    return events
+
+
+def try_load_log_file(filepath, cache=None):
+    """Return (events, None), or (None, error message) if the file can't be read.
+
+    With an EventCache, previously parsed files are served from the cache.
+    Uncompressed binary segments are already compact and are always read
+    directly.
+    """
+    try:
+        if cache is not None and not filepath.endswith(SEGMENT_EXTENSION):
+            return cache.load(filepath, load_log_file), None
+        return load_log_file(filepath), None
+    except Exception as e:
+        return None, str(e)
+
+
+def resolve_jobs(jobs):
+    """Number of worker processes for a --jobs value (0 means one per CPU)."""
+    if jobs is None or jobs < 0:
+        return 1
+    return jobs or os.cpu_count() or 1
+
+
+def load_log_files(filepaths, jobs=1, cache=None):
+    """
+    Yield (filepath, events, error) for every file, in the given order.
+
+    With jobs > 1 the files are parsed in a process pool and each worker
+    sends back compact per-file column arrays; the output is identical
+    to the serial path. With an EventCache, only new or changed files are
+    parsed and the cache is trimmed to its size cap afterwards.
+    """
+    jobs = resolve_jobs(jobs)
+    if jobs == 1 or len(filepaths) < 2:
+        for filepath in filepaths:
+            yield (filepath,) + try_load_log_file(filepath, cache)
+    else:
+        chunksize = max(1, len(filepaths) // (jobs * 4))
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(partial(try_load_log_file, cache=cache), filepaths, chunksize=chunksize)
+            for filepath, (events, error) in zip(filepaths, results):
+                yield filepath, events, error
+
+    if cache is not None:
+        cache.evict()
+
+
+def open_log_file(filepath):
+    """Like load_log_file, but memory-maps binary segments instead of reading them.
+
+    The result should be closed (or used as a context manager) when done.
+    """
+    if filepath.endswith(SEGMENT_EXTENSION):
+        return open_segment(filepath)
+    return load_log_file(filepath)
+
+
+def open_log_files(filepaths, jobs=1, cache=None):
+    """
+    Yield (filepath, events, error) like load_log_files, for one-pass scans.
+
+    Serially, binary segments are memory-mapped (see open_log_file); the
+    caller should close each events object once it has been scanned.
+    """
+    if resolve_jobs(jobs) > 1:
+        yield from load_log_files(filepaths, jobs, cache)
+        return
+
+    for filepath in filepaths:
+        if filepath.endswith(SEGMENT_EXTENSION):
+            try:
+                events, error = open_log_file(filepath), None
+            except Exception as e:
+                events, error = None, str(e)
+        else:
+            events, error = try_load_log_file(filepath, cache)
+        yield filepath, events, error
+
+    if cache is not None:
+        cache.evict()
@@ -0,0 +1,76 @@
+"""
+Append-only newline-delimited JSON log writer.
+
+Each record is written as one JSON object per line to a per-session file,
+so flushing a buffer only appends the new records instead of serializing
+a whole Log into a new file. Files rotate by size (of the uncompressed
+text) or age, and may be compressed (see log_compression). An optional
+header object (e.g. the session clock anchor) is the first line of
+every file; it has no "button", so readers skip it like any non-record.
+"""
+
+import json
+import time
+
+from utils import get_timestamp
+from log_compression import compression_extension, open_log
+from constants import (
+    NDJSON_BUFFER_SIZE,
+    NDJSON_ROTATE_BYTES,
+    NDJSON_ROTATE_SECONDS,
+)
+
+NDJSON_EXTENSION = ".ndjson"
+
+
+class NDJSONWriter:
+
+    def __init__(self, basename, rotate_bytes=NDJSON_ROTATE_BYTES,
+                 rotate_seconds=NDJSON_ROTATE_SECONDS, buffer_size=NDJSON_BUFFER_SIZE,
+                 compression=None, header=None):
+        self.basename = basename
+        self.header = header
+        self.extension = NDJSON_EXTENSION + compression_extension(compression)
+        self.rotate_bytes = rotate_bytes
+        self.rotate_seconds = rotate_seconds
+        self.buffer_size = buffer_size
+        self.filename = None
+        self._file = None
+        self._opened_at = 0.0
+        self._written = 0
+
+    def open(self):
+        self.filename = self.basename + '_' + get_timestamp() + self.extension
+        self._file = open_log(self.filename, 'a', buffering=self.buffer_size)
+        self._opened_at = time.monotonic()
+        self._written = 0
+        if self.header:
+            self._written += self._file.write(json.dumps(self.header) + '\n')
+
+    def should_rotate(self):
+        if self.rotate_seconds and time.monotonic() - self._opened_at >= self.rotate_seconds:
+            return True
+        # Counted, not tell(): bz2 and lzma write streams can't report a position
+        return bool(self.rotate_bytes) and self._written >= self.rotate_bytes
+
+    def write_lines(self, lines):
+        """Append JSON-encoded records, one per line, and flush them to disk."""
+        if self._file is None:
+            self.open()
+        elif self.should_rotate():
+            self.close()
+            self.open()
+
+        write = self._file.write
+        written = 0
+        for line in lines:
+            written += write(line)
+            written += write('\n')
+        self._file.flush()
+        self._written += written
+        return self.filename
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
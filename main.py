@@ -1,9 +1,16 @@
 import sys
 import os
 import glob
+import signal
+import argparse
+import threading
 
 from keyboard_logger import KeyboardLogger
-from constants import ENABLE_KEYBOARD
+from event_cache import EventCache
+from live_tuner import LiveTuner
+from log_compactor import compact_logs
+from capture_stats import print_stats
+from constants import ENABLE_KEYBOARD, LOG_KEEP_RAW_DAYS
 
 
 def main(argv):
@@ -11,15 +18,83 @@ def main(argv):
 
     if action == "start":
         start_logger()
+    elif action == "tune":
+        tune()
     elif action == "clean":
         clean_log()
+    elif action == "compact":
+        compact(argv[1:])
+    elif action == "stats":
+        print_stats()
     else:
         raise ValueError("wrong running option")
 
 
 def start_logger():
     if ENABLE_KEYBOARD:
-        KeyboardLogger().start()
+        run_until_stopped(KeyboardLogger())
+
+
+def tune():
+    # Log as usual, and feed every event to a live analyzer as well
+    logger = KeyboardLogger()
+    tuner = LiveTuner(logger)
+    stopping = stop_on_signals()
+    logger.start()
+    tuner.run(stopping)
+    logger.stop()
+    # Events captured since the last refresh are still on the queue
+    tuner.finish()
+
+
+def stop_on_signals():
+    """Return an event that SIGINT/SIGTERM set, instead of interrupting or killing the process."""
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+    return stopping
+
+
+def run_until_stopped(logger):
+    # SIGINT/SIGTERM stop the logger with a final flush instead of killing it mid-write
+    stopping = stop_on_signals()
+    logger.start()
+    while logger.is_alive() and not stopping.wait(0.5):
+        pass
+    logger.stop()
+
+
+def compact(argv):
+    parser = argparse.ArgumentParser(
+        prog="main.py compact",
+        description="Merge flush files into daily segments and apply the retention policy."
+    )
+    parser.add_argument(
+        "--keep-raw-days",
+        type=int,
+        default=LOG_KEEP_RAW_DAYS,
+        metavar="N",
+        help="Days of raw events to keep; older days keep only their summary (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--keep-all",
+        action="store_true",
+        help="Keep the raw events of every day"
+    )
+    parser.add_argument(
+        "--include-today",
+        action="store_true",
+        help="Compact today's files as well (stop the logger first)"
+    )
+    args = parser.parse_args(argv)
+
+    keep_raw_days = None if args.keep_all else args.keep_raw_days
+    compacted, written, reduced = compact_logs(keep_raw_days=keep_raw_days, include_today=args.include_today)
+    print(f"Compacted {compacted} flush files into {len(written)} daily segments")
+    for day in written:
+        print(f"  {day}")
+    if reduced:
+        print(f"Reduced {len(reduced)} days older than {keep_raw_days} days to summaries")
 
 
 def clean_log():
@@ -29,6 +104,7 @@ def clean_log():
             os.remove(file_path)
         except:
             print("Error while deleting file : ", file_path)
+    EventCache().clear()
 
 
 if __name__ == "__main__":
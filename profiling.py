@@ -0,0 +1,197 @@
+"""
+Stage-level profiling for the analysis CLIs (--profile).
+
+A StageProfiler times named stages (with profiler.stage("sort"): ...)
+and reports wall time, events per second and peak memory per stage.
+A stage's peak is the most memory traced while it ran, including what
+earlier stages still hold; stages may nest, and a stage's peak includes
+its children's. Peak memory comes from tracemalloc, which slows the
+traced code down, so the wall times of a --profile run are pessimistic.
+
+The profiler can also run cProfile over the whole run (saved as a pstats
+file) and sample the main thread's stack every few milliseconds into a
+collapsed-stack file ("frame;frame;frame count" lines, the input of
+flamegraph.pl, speedscope and similar tools).
+
+Code paths take a profiler argument and default to NO_PROFILER, whose
+stages record nothing.
+"""
+
+import sys
+import time
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+# Seconds between stack samples for the collapsed-stack file
+SAMPLE_INTERVAL = 0.002
+
+
+class Stage:
+    """Result of one profiled stage; set events inside the block when only known then."""
+
+    def __init__(self, name, events=None, depth=0):
+        self.name = name
+        self.events = events
+        self.depth = depth
+        self.seconds = None
+        self.peak_bytes = None
+
+    @property
+    def events_per_second(self):
+        if self.events is None or not self.seconds:
+            return None
+        return self.events / self.seconds
+
+
+class StackSampler(threading.Thread):
+    """Samples the stack of one thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def save(self, filename):
+        with open(filename, "w") as collapsed_file:
+            for stack, count in sorted(self.counts.items()):
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+class StageProfiler:
+
+    def __init__(self, enabled=True, memory=True, pstats_file=None, collapsed_file=None):
+        self.enabled = enabled
+        self.memory = memory
+        self.pstats_file = pstats_file
+        self.collapsed_file = collapsed_file
+        self.stages = []
+        self._open = []
+        self._cprofile = None
+        self._sampler = None
+        self._started_tracing = False
+
+    def start(self):
+        """Start the run-wide profilers (tracemalloc, cProfile, stack sampler)."""
+        if not self.enabled:
+            return self
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.pstats_file:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if self.collapsed_file:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        """Stop the run-wide profilers and save their files."""
+        if self._sampler is not None:
+            self._sampler.stop()
+            self._sampler.save(self.collapsed_file)
+            self._sampler = None
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.pstats_file)
+            self._cprofile = None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    @contextmanager
+    def stage(self, name, events=None):
+        """Profile the with-block as stage name; yields its Stage."""
+        stage = Stage(name, events, len(self._open))
+        if not self.enabled:
+            yield stage
+            return
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # The parent keeps the peak it reached so far; ours starts here
+            if self._open:
+                parent = self._open[-1]
+                parent.peak_bytes = max(parent.peak_bytes or 0, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self.stages.append(stage)
+        self._open.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds = time.perf_counter() - start
+            self._open.pop()
+            if tracing:
+                stage.peak_bytes = max(stage.peak_bytes or 0, tracemalloc.get_traced_memory()[1])
+                if self._open:
+                    parent = self._open[-1]
+                    parent.peak_bytes = max(parent.peak_bytes or 0, stage.peak_bytes)
+
+    def report(self, file=None):
+        if not self.enabled:
+            return
+        file = file or sys.stdout
+        print("\n" + "=" * 80, file=file)
+        print("PROFILE", file=file)
+        print("=" * 80, file=file)
+        print(f"  {'stage':<34}{'wall s':>10}{'events/s':>16}{'peak MiB':>12}", file=file)
+        for stage in self.stages:
+            rate = stage.events_per_second
+            rate_text = f"{rate:,.0f}" if rate is not None else "-"
+            peak_text = f"{stage.peak_bytes / 2**20:.1f}" if stage.peak_bytes is not None else "-"
+            name = "  " * stage.depth + stage.name
+            print(f"  {name:<34}{stage.seconds:>10.3f}{rate_text:>16}{peak_text:>12}", file=file)
+        if self.pstats_file:
+            print(f"\ncProfile stats saved to {self.pstats_file} (python -m pstats {self.pstats_file})", file=file)
+        if self.collapsed_file:
+            print(f"Collapsed stacks saved to {self.collapsed_file} (flamegraph.pl {self.collapsed_file} > profile.svg)",
+                  file=file)
+
+
+NO_PROFILER = StageProfiler(enabled=False)
+
+
+def add_profile_arguments(parser):
+    """Add --profile, --pstats and --collapsed to an analysis CLI."""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Report wall time, events/s and peak memory per stage"
+    )
+    parser.add_argument(
+        "--pstats",
+        metavar="FILE",
+        help="Save cProfile stats of the run to FILE (implies --profile)"
+    )
+    parser.add_argument(
+        "--collapsed",
+        metavar="FILE",
+        help="Save sampled stacks to FILE in flamegraph collapsed format (implies --profile)"
+    )
+
+
+def profiler_from_args(args):
+    """Started StageProfiler for the profile arguments (NO_PROFILER without them)."""
+    if not (args.profile or args.pstats or args.collapsed):
+        return NO_PROFILER
+    return StageProfiler(pstats_file=args.pstats, collapsed_file=args.collapsed).start()
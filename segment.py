@@ -0,0 +1,234 @@
+"""
+Columnar binary segment format for keyboard logs.
+
+Layout (all little-endian):
+
+    preamble   magic "HRMB", uint16 version, uint16 reserved,
+               uint32 record count, uint32 header length
+    header     UTF-8 JSON object, at least {"keys": [...]}, padded with
+               spaces so the columns start on an 8-byte boundary
+    columns    float64 timestamp[n]
+               int16   coordinate_x[n]
+               int16   coordinate_y[n]
+               uint16  key_id[n]        (index into header["keys"])
+               uint8   is_press[n]
+
+Columns are stored back to back in decreasing item size so every column
+stays naturally aligned, which lets MappedSegment expose them as
+zero-copy memoryviews of an mmap. A whole segment may also be
+compressed (.bin.gz, .bin.xz, ...); it is then read, never mapped.
+"""
+
+import sys
+import json
+import mmap
+import struct
+from array import array
+
+from key_events import KeyEvents, KeyTable
+from log_compression import open_log
+
+MAGIC = b"HRMB"
+VERSION = 1
+SEGMENT_EXTENSION = ".bin"
+
+PREAMBLE = struct.Struct("<4sHHII")
+
+# (name, array typecode) in on-disk order
+COLUMNS = (
+    ("timestamps", "d"),
+    ("coord_x", "h"),
+    ("coord_y", "h"),
+    ("key_ids", "H"),
+    ("is_press", "B"),
+)
+
+
+def write_segment(filename, keys, timestamps, key_ids, is_press,
+                  coord_x=None, coord_y=None, header=None):
+    """Write one segment from parallel column sequences.
+
+    header may hold extra JSON-serializable fields stored next to "keys".
+    """
+    count = len(timestamps)
+    if coord_x is None:
+        coord_x = array("h", bytes(2 * count))
+    if coord_y is None:
+        coord_y = array("h", bytes(2 * count))
+
+    columns = {
+        "timestamps": timestamps,
+        "coord_x": coord_x,
+        "coord_y": coord_y,
+        "key_ids": key_ids,
+        "is_press": is_press,
+    }
+
+    header = dict(header or {}, keys=list(keys))
+    header = json.dumps(header).encode("utf-8")
+    header += b" " * (-(PREAMBLE.size + len(header)) % 8)
+
+    with open_log(filename, "wb") as segment_file:
+        segment_file.write(PREAMBLE.pack(MAGIC, VERSION, 0, count, len(header)))
+        segment_file.write(header)
+        for name, typecode in COLUMNS:
+            column = columns[name]
+            if not isinstance(column, array) or column.typecode != typecode:
+                column = array(typecode, column)
+            if len(column) != count:
+                raise ValueError(f"Column '{name}' has {len(column)} rows, expected {count}")
+            if sys.byteorder == "big":
+                column = array(typecode, column)
+                column.byteswap()
+            column.tofile(segment_file)
+
+
+def read_segment_header(filename):
+    """Read only the JSON header of a segment."""
+    with open_log(filename, "rb") as segment_file:
+        magic, version, _, _, header_len = PREAMBLE.unpack(segment_file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a keyboard log segment")
+        if version != VERSION:
+            raise ValueError(f"Unsupported segment version {version} in {filename}")
+        return json.loads(segment_file.read(header_len))
+
+
+def read_segment_start(filename):
+    """Earliest timestamp of a segment (None if it is empty), without reading its columns.
+
+    Compacted segments keep it in their summary; otherwise it is the first
+    record's timestamp, which comes right after the header.
+    """
+    with open_log(filename, "rb") as segment_file:
+        magic, version, _, count, header_len = PREAMBLE.unpack(
+            segment_file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a keyboard log segment")
+        if version != VERSION:
+            raise ValueError(f"Unsupported segment version {version} in {filename}")
+
+        summary = json.loads(segment_file.read(header_len)).get("summary") or {}
+        if "first_timestamp" in summary:
+            return summary["first_timestamp"]
+        if not count:
+            return None
+        first = array("d")
+        first.fromfile(segment_file, 1)
+        if sys.byteorder == "big":
+            first.byteswap()
+        return first[0]
+
+
+def read_segment_columns(filename):
+    """Read a segment into a dict holding its header and column arrays.
+
+    A compressed segment is decompressed column by column as it is read.
+    """
+    with open_log(filename, "rb") as segment_file:
+        magic, version, _, count, header_len = PREAMBLE.unpack(
+            segment_file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a keyboard log segment")
+        if version != VERSION:
+            raise ValueError(f"Unsupported segment version {version} in {filename}")
+
+        segment = {"header": json.loads(segment_file.read(header_len))}
+        for name, typecode in COLUMNS:
+            column = array(typecode)
+            column.fromfile(segment_file, count)
+            if sys.byteorder == "big":
+                column.byteswap()
+            segment[name] = column
+    return segment
+
+
+def read_segment(filename):
+    """Read a segment as KeyEvents (coordinates are dropped)."""
+    return events_from_columns(read_segment_columns(filename))
+
+
+def events_from_columns(segment):
+    """Wrap the columns returned by read_segment_columns as KeyEvents."""
+    events = KeyEvents(segment["header"]["keys"])
+    events.timestamps = segment["timestamps"]
+    events.key_ids = segment["key_ids"]
+    events.is_press = segment["is_press"]
+    return events
+
+
+class MappedSegment:
+    """
+    Read-only, memory-mapped view of a segment.
+
+    timestamps, key_ids, is_press, coord_x and coord_y are memoryviews
+    into the mapping, so scanning a segment never copies it into the
+    Python heap. Use as a context manager (or call close()) to unmap.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as segment_file:
+            self._mmap = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic, version, _, count, header_len = PREAMBLE.unpack_from(self._view)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{filename} is not a keyboard log segment")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported segment version {version} in {filename}")
+
+        offset = PREAMBLE.size
+        self.header = json.loads(bytes(self._view[offset:offset + header_len]))
+        self.keys = KeyTable(self.header["keys"])
+        offset += header_len
+
+        self._columns = []
+        for name, typecode in COLUMNS:
+            size = array(typecode).itemsize * count
+            column = self._view[offset:offset + size].cast(typecode)
+            if sys.byteorder == "big":
+                # No zero-copy on big-endian hosts: fall back to swapped copies
+                column = array(typecode, column.tobytes())
+                column.byteswap()
+            self._columns.append(column)
+            setattr(self, name, column)
+            offset += size
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __iter__(self):
+        """Yield (key, timestamp, is_press) tuples in storage order."""
+        keys = self.keys.names
+        for timestamp, key_id, is_press in zip(self.timestamps, self.key_ids, self.is_press):
+            yield keys[key_id], timestamp, bool(is_press)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def is_sorted(self):
+        timestamps = self.timestamps
+        return all(timestamps[i] <= timestamps[i + 1] for i in range(len(timestamps) - 1))
+
+    def close(self):
+        # Views must be released before the mapping can be closed
+        for column in getattr(self, "_columns", ()):
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns = []
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def open_segment(filename):
+    """Memory-map a segment for zero-copy scanning."""
+    return MappedSegment(filename)
@@ -0,0 +1,230 @@
+"""
+Constant-memory summaries of timing distributions.
+
+RunningStats keeps count, mean and variance with Welford's update plus
+the exact min and max. KLLSketch is a KLL quantile sketch: values are
+buffered in a stack of compactors, and a full compactor sorts its items
+and promotes every other one to the next level at twice the weight. With
+k items in the top compactor the rank error of a quantile is roughly
+1.7/k, and fewer than k values are kept exactly. Both can be merged, so
+per-file or per-worker summaries combine into one.
+
+Distribution bundles the two and is what the analyzers store per key.
+"""
+
+import math
+import operator
+import random
+from bisect import bisect_right
+
+SKETCH_K = 256
+
+
+class RunningStats:
+    """Count, mean, sample variance, min and max of a stream (Welford)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def extend(self, values):
+        """Add a batch of values: its moments are computed at once and merged in."""
+        count = len(values)
+        if not count:
+            return
+        batch = RunningStats()
+        batch.count = count
+        batch.mean = sum(values) / count
+        deviations = [value - batch.mean for value in values]
+        batch.m2 = sum(map(operator.mul, deviations, deviations))
+        batch.min = min(values)
+        batch.max = max(values)
+        self.merge(batch)
+
+    def merge(self, other):
+        """Fold another RunningStats into this one (Chan et al.)."""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+
+
+class KLLSketch:
+    """Mergeable quantile sketch with bounded rank error (KLL).
+
+    Compaction uses a seeded random generator, so the same input always
+    gives the same answers.
+    """
+
+    def __init__(self, k=SKETCH_K, seed=0):
+        self.k = k
+        self.count = 0
+        self.compactors = [[]]
+        self._size = 0
+        self._max_size = self.capacity(0)
+        self._random = random.Random(seed)
+        self._values = None  # sorted values, built on first query
+        self._ranks = None   # cumulative weights of _values
+
+    def __len__(self):
+        return self.count
+
+    def capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return max(2, int(math.ceil(self.k * (2 / 3) ** depth)))
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        self._values = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def extend(self, values):
+        """Add a list of values; the sketch is the same as after add() on each in turn.
+
+        Level 0 is filled a slice at a time up to the next compaction, so the
+        compactions (and their coin flips) happen at the same points.
+        """
+        start = 0
+        count = len(values)
+        while start < count:
+            stop = min(start + max(self._max_size - self._size, 1), count)
+            self.compactors[0].extend(values[start:stop])
+            self._size += stop - start
+            start = stop
+            if self._size >= self._max_size:
+                self._compress()
+        self.count += count
+        self._values = None
+
+    def _add_level(self):
+        self.compactors.append([])
+        self._max_size = sum(self.capacity(level) for level in range(len(self.compactors)))
+
+    def merge(self, other):
+        """Fold another KLLSketch into this one."""
+        while len(self.compactors) < len(other.compactors):
+            self._add_level()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.count += other.count
+        self._size = sum(len(items) for items in self.compactors)
+        self._values = None
+        while self._size >= self._max_size:
+            self._compress()
+
+    def _compress(self):
+        for level in range(len(self.compactors)):
+            items = self.compactors[level]
+            if len(items) < self.capacity(level):
+                continue
+            if level + 1 == len(self.compactors):
+                self._add_level()
+            # Promote every other item of the sorted run; an odd one out stays
+            items.sort()
+            leftover = [items.pop()] if len(items) % 2 else []
+            self.compactors[level + 1].extend(items[self._random.randint(0, 1)::2])
+            self.compactors[level] = leftover
+            self._size = sum(len(level_items) for level_items in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def _build(self):
+        weighted = sorted(
+            (value, 1 << level)
+            for level, items in enumerate(self.compactors) for value in items
+        )
+        self._values = [value for value, _ in weighted]
+        self._ranks = []
+        total = 0
+        for _, weight in weighted:
+            total += weight
+            self._ranks.append(total)
+
+    def quantile(self, q):
+        """Value at rank int(q * count) of the sorted stream (approximately).
+
+        This is sorted(values)[int(len(values) * q)] whenever the sketch
+        still holds every value.
+        """
+        if not self.count:
+            raise ValueError("quantile of an empty sketch")
+        if self._values is None:
+            self._build()
+        rank = min(int(self.count * q), self.count - 1)
+        index = bisect_right(self._ranks, rank)
+        return self._values[min(index, len(self._values) - 1)]
+
+
+class Distribution:
+    """Running moments and a quantile sketch of one stream of values.
+
+    Falsy while empty, like the lists it replaces.
+    """
+
+    def __init__(self, k=SKETCH_K):
+        self.stats = RunningStats()
+        self.sketch = KLLSketch(k)
+
+    def __len__(self):
+        return self.stats.count
+
+    def add(self, value):
+        self.stats.add(value)
+        self.sketch.add(value)
+
+    def extend(self, values):
+        """Add a list of values in bulk; the quantiles are those add() would give."""
+        self.stats.extend(values)
+        self.sketch.extend(values)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def mean(self):
+        return self.stats.mean
+
+    @property
+    def stdev(self):
+        return self.stats.stdev
+
+    @property
+    def min(self):
+        return self.stats.min
+
+    @property
+    def max(self):
+        return self.stats.max
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Synthetic typist: realistic keyboard logs at scale, with known ground truth.
+
+A parametric model of a typist (TypistModel) is sampled with NumPy, all
+keystrokes at once:
+- keys are drawn by English letter frequency (plus SPACE and punctuation)
+- press-to-press flight times and tap hold times are log-normal, with a
+  per-key scale for the hold times
+- a keystroke followed by a key of the other hand rolls with some
+  probability: it is released only after the next key went down
+- f, j and SPACE are sometimes held as modifiers: the key goes down, a
+  partner key (other hand for f/j, m or n for SPACE) is tapped inside
+  the hold, and the modifier is released shortly after
+
+Events are split into flush files like the logger writes them
+(KEYBOARD_LOG_INTERVAL seconds each), in JSON (Log.to_json schema),
+NDJSON or binary segments. The same seed and model always give the same
+files. The ground truth (what was intended and the sampled timings of
+each HRM key) is written next to them as .ground_truth.json, and
+--validate checks what the analyzers recover from the files against it.
+"""
+
+import os
+import json
+import argparse
+import datetime
+from array import array
+
+import numpy as np
+
+from constants import KEYBOARD_LOG_FILENAME, KEYBOARD_LOG_INTERVAL, LOG_DIR
+from hrmAnalysis import HRM_KEYS, LEFT_HAND_KEYS, RIGHT_HAND_KEYS, SPACE_COMBO_KEYS
+from key_events import KeyTable
+from log import Log
+from log_compression import CODECS, compression_extension, open_log
+from log_reader import find_log_files
+from log_writer import NDJSON_EXTENSION
+from segment import SEGMENT_EXTENSION, write_segment
+from utils import format_count, parse_count
+from vector_engine import next_event_index
+
+MODES = {"json": ".json", "ndjson": NDJSON_EXTENSION, "binary": SEGMENT_EXTENSION}
+
+GROUND_TRUTH_FILENAME = ".ground_truth.json"
+
+# Relative key frequencies of English text
+KEY_FREQUENCIES = {
+    "SPACE": 18.0, "e": 10.2, "t": 7.5, "a": 6.5, "o": 6.2, "i": 5.7, "n": 5.6,
+    "s": 5.3, "h": 5.0, "r": 4.9, "d": 3.4, "l": 3.3, "u": 2.3, "c": 2.2,
+    "m": 2.0, "w": 1.9, "f": 1.8, "g": 1.6, "y": 1.6, "p": 1.5, "b": 1.2,
+    ",": 1.0, ".": 1.0, "v": 0.8, "k": 0.6, "j": 0.15, "x": 0.15, "q": 0.1, "z": 0.07,
+}
+KEY_NAMES = list(KEY_FREQUENCIES)
+
+# Partner keys tapped inside a modifier hold
+PARTNERS = {
+    "f": RIGHT_HAND_KEYS - HRM_KEYS,
+    "j": LEFT_HAND_KEYS - HRM_KEYS,
+    "SPACE": SPACE_COMBO_KEYS,
+}
+
+# -1 left hand, 1 right hand (other keys never roll)
+HANDS = dict([(key, -1) for key in LEFT_HAND_KEYS] + [(key, 1) for key in RIGHT_HAND_KEYS])
+
+# Timestamp of the first keystroke (2026-01-01 00:00 UTC)
+DEFAULT_START = 1767225600.0
+
+
+class TypistModel:
+    """Parameters of the synthetic typist.
+
+    Times are in ms and log-normal, given as a median and a sigma (the
+    spread of their logarithm). Rates are probabilities per keystroke.
+    """
+
+    def __init__(self, flight_ms=140, flight_sigma=0.35, tap_ms=95, tap_sigma=0.3,
+                 key_sigma=0.15, roll_rate=0.3, overlap_ms=25, overlap_sigma=0.4,
+                 hrm_hold_rate=0.08, activation_ms=70, activation_sigma=0.3,
+                 release_lag_ms=40, release_lag_sigma=0.4):
+        self.flight_ms = flight_ms
+        self.flight_sigma = flight_sigma
+        self.tap_ms = tap_ms
+        self.tap_sigma = tap_sigma
+        self.key_sigma = key_sigma
+        self.roll_rate = roll_rate
+        self.overlap_ms = overlap_ms
+        self.overlap_sigma = overlap_sigma
+        self.hrm_hold_rate = hrm_hold_rate
+        self.activation_ms = activation_ms
+        self.activation_sigma = activation_sigma
+        self.release_lag_ms = release_lag_ms
+        self.release_lag_sigma = release_lag_sigma
+
+    def to_dict(self):
+        return dict(vars(self))
+
+    def sample(self, strokes, rng):
+        """
+        Sample strokes keystrokes.
+
+        Returns (press_times, key_ids, holds, intended_holds): press times
+        from 0 and hold durations in seconds, ids into KEY_NAMES, and a
+        mask of the keystrokes held as a modifier.
+        """
+        def lognormal(median_ms, sigma, size):
+            return rng.lognormal(np.log(median_ms / 1000), sigma, size)
+
+        weights = np.array([KEY_FREQUENCIES[name] for name in KEY_NAMES])
+        key_ids = rng.choice(len(KEY_NAMES), size=strokes, p=weights / weights.sum())
+        flights = lognormal(self.flight_ms, self.flight_sigma, strokes)
+        key_scale = np.exp(rng.normal(0.0, self.key_sigma, len(KEY_NAMES)))
+        holds = lognormal(self.tap_ms, self.tap_sigma, strokes) * key_scale[key_ids]
+
+        # Modifier holds: the next keystroke becomes a partner key tapped
+        # inside the hold, and the one after waits for the release
+        hrm_ids = [KEY_NAMES.index(key) for key in sorted(HRM_KEYS)]
+        holding = np.isin(key_ids, hrm_ids) & (rng.random(strokes) < self.hrm_hold_rate)
+        holding[-2:] = False
+        holding[1:] &= ~holding[:-1]
+        index = np.flatnonzero(holding)
+        for hrm_id in hrm_ids:
+            chosen = index[key_ids[index] == hrm_id]
+            partners = [i for i, key in enumerate(KEY_NAMES) if key in PARTNERS[KEY_NAMES[hrm_id]]]
+            key_ids[chosen + 1] = rng.choice(partners, size=len(chosen))
+        activation = lognormal(self.activation_ms, self.activation_sigma, len(index))
+        release_lag = lognormal(self.release_lag_ms, self.release_lag_sigma, len(index))
+        flights[index + 1] = activation
+        holds[index] = activation + holds[index + 1] + release_lag
+        flights[index + 2] = np.maximum(flights[index + 2], holds[index + 1] + release_lag + 0.01)
+
+        # Cross-hand rolls, away from modifier holds: released after the
+        # next key went down, but before that key is released
+        hands = np.array([HANDS.get(name, 0) for name in KEY_NAMES])[key_ids]
+        involved = np.zeros(strokes, dtype=bool)
+        involved[index] = involved[index + 1] = True
+        rolling = ((hands[:-1] * hands[1:]) < 0) & ~involved[:-1] & ~involved[1:]
+        rolling &= rng.random(strokes - 1) < self.roll_rate
+        overlap = np.minimum(lognormal(self.overlap_ms, self.overlap_sigma, strokes - 1), 0.8 * holds[1:])
+        holds[:-1] = np.where(rolling, np.maximum(holds[:-1], flights[1:] + overlap), holds[:-1])
+
+        # A key is released before it is pressed again
+        press_times = np.cumsum(flights)
+        following = next_event_index(key_ids.astype(np.uint16))
+        gap = np.full(strokes, np.inf)
+        repeated = following < strokes
+        gap[repeated] = press_times[following[repeated]] - press_times[repeated]
+        holds = np.minimum(holds, 0.9 * gap)
+
+        return press_times, key_ids, holds, holding
+
+
+def ground_truth(model, seed, press_times, key_ids, holds, holding):
+    """What was typed, per HRM key: keystrokes, modifier holds and their timings (ms)."""
+    keys = {}
+    for key in sorted(HRM_KEYS):
+        strokes = key_ids == KEY_NAMES.index(key)
+        taps = holds[strokes & ~holding] * 1000
+        hrm_holds = holds[strokes & holding] * 1000
+        keys[key] = {
+            "presses": int(strokes.sum()),
+            "taps": len(taps),
+            "holds": len(hrm_holds),
+            "tap_ms": {"mean": float(taps.mean()), "p95": float(np.percentile(taps, 95))} if len(taps) else None,
+            "hold_ms": {"mean": float(hrm_holds.mean()), "p5": float(np.percentile(hrm_holds, 5))} if len(hrm_holds) else None,
+        }
+    return {"seed": seed, "events": 2 * len(key_ids), "model": model.to_dict(), "keys": keys}
+
+
+def as_array(typecode, values):
+    column = array(typecode)
+    column.frombytes(np.ascontiguousarray(values, dtype=np.dtype(typecode)).tobytes())
+    return column
+
+
+def write_log_file(filepath, mode, label, timestamps, key_ids, is_press):
+    """Write one flush file of events in the given log mode."""
+    if mode == "binary":
+        write_segment(filepath, KEY_NAMES, as_array('d', timestamps),
+                      as_array('H', key_ids), as_array('B', is_press))
+        return
+
+    log = Log(capacity=0, key_table=KeyTable(KEY_NAMES))
+    log.timestamp = label
+    log.size = len(timestamps)
+    log.timestamps = as_array('d', timestamps)
+    log.key_ids = as_array('H', key_ids)
+    log.is_press = as_array('B', is_press)
+    log.coord_x = array('d', bytes(8 * log.size))
+    log.coord_y = array('d', bytes(8 * log.size))
+    with open_log(filepath, "w") as log_file:
+        if mode == "json":
+            log.write_json(log_file)
+        else:
+            for line in log.iter_record_json():
+                log_file.write(line)
+                log_file.write("\n")
+
+
+def write_corpus(log_dir, event_count, seed=0, model=None, mode="json",
+                 seconds_per_file=KEYBOARD_LOG_INTERVAL, start=DEFAULT_START, compression=None):
+    """
+    Write about event_count events (one press and one release per keystroke)
+    as flush files of seconds_per_file under log_dir, optionally compressed.
+
+    Returns the ground truth, which is also saved as GROUND_TRUTH_FILENAME.
+    """
+    model = model or TypistModel()
+    rng = np.random.default_rng(seed)
+    press_times, key_ids, holds, holding = model.sample(max(event_count // 2, 3), rng)
+
+    timestamps = np.concatenate((press_times, press_times + holds)) + start
+    ids = np.concatenate((key_ids, key_ids)).astype(np.uint16)
+    is_press = np.concatenate((np.ones(len(key_ids), np.uint8), np.zeros(len(key_ids), np.uint8)))
+    order = np.argsort(timestamps, kind="stable")
+    timestamps, ids, is_press = timestamps[order], ids[order], is_press[order]
+
+    os.makedirs(log_dir, exist_ok=True)
+    extension = MODES[mode] + compression_extension(compression)
+    file_starts = np.arange(start, timestamps[-1] + seconds_per_file, seconds_per_file)
+    bounds = np.searchsorted(timestamps, file_starts)
+    for file_start, first, last in zip(file_starts, bounds, bounds[1:]):
+        if first == last:
+            continue
+        label = datetime.datetime.fromtimestamp(file_start, datetime.timezone.utc).strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(log_dir, f"{KEYBOARD_LOG_FILENAME}_{label}{extension}")
+        write_log_file(filepath, mode, label, timestamps[first:last], ids[first:last], is_press[first:last])
+
+    truth = ground_truth(model, seed, press_times, key_ids, holds, holding)
+    with open(os.path.join(log_dir, GROUND_TRUTH_FILENAME), "w") as f:
+        json.dump(truth, f, indent=2)
+    return truth
+
+
+def validate(log_dir, truth):
+    """Print what the analyzers recover from log_dir next to the ground truth."""
+    from analysis_engine import AnalysisEngine, HRMPass
+    from holdtap_sim import HoldTapConfig, HoldTapRecording, count_misfires
+
+    engine = AnalysisEngine()
+    hrm = engine.register(HRMPass())
+    recording = engine.register(HoldTapRecording())
+    engine.run_logs(find_log_files(log_dir))
+    recommendations = hrm.analyzer.calculate_recommendations(quiet=True)
+
+    print("\n" + "="*80)
+    print("GROUND TRUTH vs RECOVERED")
+    print("="*80)
+    print(f"Events: {truth['events']} written, {engine.events_analyzed} analyzed")
+    for key, expected in truth["keys"].items():
+        presses = recording.presses[key]
+        intended = presses.intended_holds()
+        print(f"\nKey '{key}':")
+        print(f"  Presses:       {expected['presses']:>8} true {len(presses):>8} recovered")
+        print(f"  Modifier holds:{expected['holds']:>8} true {sum(intended):>8} recovered")
+        if not expected["tap_ms"] or not expected["hold_ms"] or key not in recommendations:
+            continue
+        low, high = expected["tap_ms"]["p95"], expected["hold_ms"]["p5"]
+        tapping_term = recommendations[key].get("tapping_term")
+        if low < high:
+            verdict = "inside" if tapping_term and low <= tapping_term <= high else "outside"
+            print(f"  Tap/hold gap:  {low:.0f}-{high:.0f}ms (95th pct tap to 5th pct hold)")
+            print(f"  Recommended tapping-term-ms: {tapping_term} ({verdict} the gap)")
+        else:
+            print(f"  Tap/hold gap:  none (95th pct tap {low:.0f}ms > 5th pct hold {high:.0f}ms)")
+            print(f"  Recommended tapping-term-ms: {tapping_term}")
+        config = HoldTapConfig.from_recommendation(recommendations[key])
+        misfires = count_misfires(presses, config, recording.key_table, intended)
+        print(f"  Recommended config misfires: {misfires} of {len(presses)} presses")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic keyboard logs from a parametric typist model."
+    )
+    parser.add_argument("--events", default="1M",
+                        help="Number of events to generate, e.g. 10k or 2M (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: %(default)s)")
+    parser.add_argument("--mode", choices=MODES, default="json",
+                        help="Log file format (default: %(default)s)")
+    parser.add_argument("--compression", choices=CODECS,
+                        help="Compress the log files (default: uncompressed)")
+    parser.add_argument("--log-dir", default=LOG_DIR,
+                        help="Where to write the logs (default: %(default)s)")
+    parser.add_argument("--seconds-per-file", type=float, default=KEYBOARD_LOG_INTERVAL,
+                        help="Typing time per flush file (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="Write even if the directory already holds keyboard logs")
+    parser.add_argument("--validate", action="store_true",
+                        help="Analyze the generated logs and compare with the ground truth")
+    args = parser.parse_args()
+
+    if find_log_files(args.log_dir) and not args.force:
+        parser.error(f"{args.log_dir} already holds keyboard logs (use another --log-dir or --force)")
+
+    event_count = parse_count(args.events)
+    print(f"Generating {format_count(event_count)} events ({args.mode}) in {args.log_dir}...")
+    truth = write_corpus(args.log_dir, event_count, args.seed, mode=args.mode,
+                         seconds_per_file=args.seconds_per_file, compression=args.compression)
+    print(f"Wrote {len(find_log_files(args.log_dir))} log files")
+
+    if args.validate:
+        validate(args.log_dir, truth)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from config_search import search
+from holdtap_sim import HoldTapConfig, HoldTapRecording
+from key_events import KeyTable
+
+
+def typing_session(seed=0, keystrokes=1500):
+    """(timestamp, key_id, is_press) of random typing with some f/j modifier holds."""
+    rng = random.Random(seed)
+    key_table = KeyTable()
+    letters = "asdfghjklqwertyuiop"
+    events = []
+    t = 0.0
+    for _ in range(keystrokes):
+        t += rng.uniform(0.08, 0.3)
+        if rng.random() < 0.1:
+            # Hold f or j and tap a key of the other hand
+            hrm = rng.choice("fj")
+            other = rng.choice("jkl" if hrm == "f" else "asd")
+            down = t
+            t += rng.uniform(0.05, 0.2)
+            events.append((down, hrm, True))
+            events.append((t, other, True))
+            events.append((t + rng.uniform(0.03, 0.1), other, False))
+            events.append((t + rng.uniform(0.12, 0.3), hrm, False))
+            t += 0.3
+        else:
+            key = rng.choice(letters)
+            events.append((t, key, True))
+            events.append((t + rng.uniform(0.05, 0.35), key, False))
+    events.sort(key=lambda event: event[0])
+    return [(t, key_table.intern(key), is_press) for t, key, is_press in events], key_table
+
+
+class ConfigSearchTest(unittest.TestCase):
+
+    def test_parallel_search_matches_serial(self):
+        events, key_table = typing_session()
+        recording = HoldTapRecording(("f", "j"))
+        recording.record(events, key_table)
+        seeds = {"f": HoldTapConfig(tapping_term=180, quick_tap=120)}
+
+        serial = search(recording, ["f", "j"], seeds=seeds, jobs=1)
+        parallel = search(recording, ["f", "j"], seeds=seeds, jobs=3)
+        self.assertEqual(sorted(serial), ["f", "j"])
+        self.assertEqual({key: (config.describe(), misfires) for key, (config, misfires) in serial.items()},
+                         {key: (config.describe(), misfires) for key, (config, misfires) in parallel.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
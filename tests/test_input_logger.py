@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+
+from input_logger import InputLogger
+from log_reader import load_log_file
+
+
+class SwapBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = InputLogger()
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "keyboard")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_swap_reuses_the_spare_buffer(self):
+        spare = self.logger.spare_log
+        self.logger.add_record("a", True)
+        full = self.logger.swap_buffer()
+        self.assertIs(self.logger.log, spare)
+        self.assertEqual(len(full), 1)
+
+        self.logger.clear_buffer(full)
+        self.logger.add_record("a", False)
+        self.assertIs(self.logger.swap_buffer(), spare)
+        # The cleared buffer is empty, so falsy, but still the one reused
+        self.assertIs(self.logger.log, full)
+
+    def test_saved_buffers_alternate(self):
+        first, second = self.logger.log, self.logger.spare_log
+        for expected in (first, second, first):
+            self.logger.add_record("a", True)
+            self.logger.save_log(self.filename, "ndjson")
+            self.assertIs(self.logger.spare_log, expected)
+        self.logger.ndjson_writer.close()
+
+    def test_failed_write_keeps_the_batch(self):
+        self.logger.add_record("a", True, timestamp=1.0)
+        with self.assertRaises(ValueError):
+            self.logger.save_log(self.filename, "no such mode")
+        self.logger.add_record("a", False, timestamp=2.0)
+        self.assertEqual(len(self.logger.log), 2)
+        self.assertEqual(self.logger.stats.failed_flushes, 1)
+
+        self.logger.save_log(self.filename, "ndjson")
+        self.logger.ndjson_writer.close()
+        events = load_log_file(self.logger.ndjson_writer.filename)
+        self.assertEqual(list(events.timestamps), [1.0, 2.0])
+        self.assertEqual(self.logger.stats.events, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
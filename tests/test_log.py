@@ -0,0 +1,49 @@
+import io
+import json
+import unittest
+
+from capture_stats import SessionClock
+from log import Log
+
+
+def filled_log(clock=None):
+    log = Log(capacity=2, clock=clock)
+    for i in range(5):
+        key_id = log.key_table.intern("a" if i % 2 else 'quote"')
+        if clock is None:
+            log.append(1.5 + i, key_id, i % 2 == 0, 10.0, 20.0)
+        else:
+            log.append_ticks(clock.ticks_ns + i * 1000, key_id, i % 2 == 0, 10.0, 20.0)
+    if clock is not None:
+        log.resolve_timestamps()
+    return log
+
+
+class LogTest(unittest.TestCase):
+
+    def test_write_json_matches_to_json(self):
+        for clock in (None, SessionClock()):
+            log = filled_log(clock)
+            json_file = io.StringIO()
+            log.write_json(json_file)
+            self.assertEqual(json_file.getvalue(), json.dumps(log.to_json()))
+
+    def test_clocked_logs_keep_ticks_and_anchor(self):
+        clock = SessionClock()
+        log = filled_log(clock)
+        document = log.to_json()
+        self.assertEqual(document["clock"], clock.anchor())
+        self.assertEqual([record["ticks"] for record in document["records"]],
+                         [clock.ticks_ns + i * 1000 for i in range(5)])
+        self.assertEqual(log.to_columns()["header"], {"clock": clock.anchor()})
+        self.assertTrue(str(log).startswith("# clock "))
+
+    def test_extend_appends_in_order(self):
+        log, other = filled_log(), filled_log()
+        log.extend(other)
+        self.assertEqual(len(log), 10)
+        self.assertEqual(list(log.timestamps[5:10]), list(other.timestamps[:5]))
+
+
+if __name__ == "__main__":
+    unittest.main()
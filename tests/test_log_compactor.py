@@ -0,0 +1,115 @@
+import datetime
+import os
+import tempfile
+import unittest
+
+from log import Log
+from log_compactor import compact_logs, day_segment_path, day_start
+from log_reader import find_log_files, load_log_file
+from segment import read_segment_header
+
+TODAY = datetime.date(2026, 1, 10)
+
+
+def day(offset):
+    return TODAY + datetime.timedelta(days=offset)
+
+
+class CompactorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_dir = self.directory.name
+        self.messages = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def flush_file(self, name, timestamps):
+        """A JSON flush file of alternating f presses and releases at timestamps."""
+        log = Log()
+        key_id = log.key_table.intern("f")
+        for i, timestamp in enumerate(timestamps):
+            log.append(timestamp, key_id, i % 2 == 0)
+        filepath = os.path.join(self.log_dir, f"keyboard_log_{name}.json")
+        with open(filepath, "w") as json_file:
+            log.write_json(json_file)
+        return filepath
+
+    def day_file(self, offset, name, hours=(9, 10)):
+        start = day_start(day(offset))
+        return self.flush_file(name, [start + hour * 3600 + i for hour in hours for i in range(2)])
+
+    def compact(self, **options):
+        options.setdefault("keep_raw_days", None)
+        return compact_logs(self.log_dir, today=TODAY, compression=None,
+                            report=self.messages.append, **options)
+
+    def all_events(self):
+        events = []
+        for filepath in find_log_files(self.log_dir):
+            loaded = load_log_file(filepath)
+            events.extend(zip(loaded.timestamps, loaded.is_press))
+        return sorted(events)
+
+    def test_compacts_past_days_only(self):
+        self.day_file(-3, "a")
+        self.day_file(-3, "b", hours=(11,))
+        self.day_file(-2, "c")
+        today = self.day_file(0, "d")
+        before = self.all_events()
+
+        compacted, written, reduced = self.compact()
+        self.assertEqual((compacted, written, reduced), (3, [day(-3), day(-2)], []))
+        self.assertEqual(sorted(find_log_files(self.log_dir)),
+                         sorted([day_segment_path(self.log_dir, day(-3)),
+                                 day_segment_path(self.log_dir, day(-2)), today]))
+        self.assertEqual(self.all_events(), before)
+        summary = read_segment_header(day_segment_path(self.log_dir, day(-3)))["summary"]
+        self.assertEqual(summary["events"], 6)
+
+        # New flush files of a compacted day are merged into its segment
+        self.day_file(-3, "e", hours=(12,))
+        before = self.all_events()
+        self.assertEqual(self.compact()[1], [day(-3)])
+        self.assertEqual(self.all_events(), before)
+
+    def test_retention_keeps_summaries_of_old_days(self):
+        self.day_file(-5, "a")
+        self.day_file(-1, "b")
+        compacted, written, reduced = self.compact(keep_raw_days=3)
+        self.assertEqual(reduced, [day(-5)])
+
+        old = day_segment_path(self.log_dir, day(-5))
+        self.assertEqual(len(load_log_file(old)), 0)
+        summary = read_segment_header(old)["summary"]
+        self.assertFalse(summary["raw"])
+        self.assertEqual(summary["events"], 4)
+        self.assertEqual(len(load_log_file(day_segment_path(self.log_dir, day(-1)))), 4)
+
+        # Reducing again changes nothing
+        self.assertEqual(self.compact(keep_raw_days=3), (0, [], []))
+
+    def test_unreadable_day_is_skipped_with_its_flush_files(self):
+        broken = day_segment_path(self.log_dir, day(-4))
+        with open(broken, "wb") as segment_file:
+            segment_file.write(b"garbage")
+        kept = self.day_file(-4, "a")
+        # Spans midnight into the next day, which must then be kept too
+        spanning = self.flush_file("b", [day_start(day(-3)) - 1, day_start(day(-3)) + 1])
+        shared = self.day_file(-3, "c")
+        self.day_file(-1, "d")
+
+        compacted, written, _ = self.compact()
+        self.assertEqual((compacted, written), (1, [day(-1)]))
+        for filepath in (broken, kept, spanning, shared):
+            self.assertTrue(os.path.exists(filepath), filepath)
+        with open(broken, "rb") as segment_file:
+            self.assertEqual(segment_file.read(), b"garbage")
+        self.assertFalse(os.path.exists(day_segment_path(self.log_dir, day(-3))))
+        self.assertTrue(any(str(day(-4)) in message for message in self.messages))
+        self.assertFalse([name for name in os.listdir(self.log_dir) if name.startswith(".tmp-")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from log import Log
+from log_compression import open_log
+from log_reader import JSONChunks, iter_json_records, load_log_file, read_first_timestamp, \
+    read_ndjson_tail
+
+# Chunk sizes that cut numbers, strings, escapes and separators in every place
+CHUNK_SIZES = (1, 2, 3, 5, 7, 13, 64, 1 << 16)
+
+
+def sample_log(count=200):
+    log = Log()
+    names = ["f", "j", "SPACE", 'quote"', "back\\slash", "é", "日本"]
+    for i in range(count):
+        log.append(1767225600.0 + i / 7, log.key_table.intern(names[i % len(names)]),
+                   i % 2 == 0, float(i), -1.5 * i)
+    return log
+
+
+class JSONChunksTest(unittest.TestCase):
+
+    def test_items_across_chunk_boundaries(self):
+        values = [1, -2.5e-3, 123456789.125, "a, b", 'q"uote', "\\u00e9", [], {"k": [1, {}]},
+                  True, None, 1e308]
+        for text in (json.dumps(values), json.dumps(values, indent=2), json.dumps(values, separators=(",", ":"))):
+            for chunk_size in CHUNK_SIZES:
+                stream = JSONChunks(io.StringIO(text), chunk_size)
+                self.assertEqual(list(stream.items()), values, f"chunk size {chunk_size}")
+                self.assertEqual(stream.peek(), "")
+
+    def test_values_across_chunk_boundaries(self):
+        text = ' 12345.678 "string" {"a": [1, 2]}  -7'
+        for chunk_size in CHUNK_SIZES:
+            stream = JSONChunks(io.StringIO(text), chunk_size)
+            self.assertEqual([stream.value() for _ in range(4)],
+                             [12345.678, "string", {"a": [1, 2]}, -7], f"chunk size {chunk_size}")
+
+    def test_log_document_across_chunk_boundaries(self):
+        json_file = io.StringIO()
+        sample_log().write_json(json_file)
+        expected = json.loads(json_file.getvalue())["records"]
+        for chunk_size in CHUNK_SIZES:
+            stream = JSONChunks(io.StringIO(json_file.getvalue()), chunk_size)
+            stream.expect("{")
+            self.assertEqual(stream.value(), "timestamp")
+            stream.expect(":")
+            stream.value()
+            stream.expect(",")
+            self.assertEqual(stream.value(), "records")
+            stream.expect(":")
+            self.assertEqual(list(stream.items()), expected, f"chunk size {chunk_size}")
+            stream.expect("}")
+
+    def test_unterminated_array(self):
+        with self.assertRaises(ValueError):
+            list(JSONChunks(io.StringIO("[1, 2, 3"), 4).items())
+
+
+class LogReaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_json_records(self):
+        log = sample_log()
+        for name in ("log.json", "log.json.gz", "log.json.xz"):
+            filepath = self.path(name)
+            with open_log(filepath, "w") as json_file:
+                log.write_json(json_file)
+            self.assertEqual(list(iter_json_records(filepath)), log.to_json()["records"])
+            events = load_log_file(filepath)
+            self.assertEqual(list(events.timestamps), list(log.timestamps[:len(log)]))
+            self.assertEqual(read_first_timestamp(filepath), log.timestamps[0])
+
+    def test_legacy_json_string_document(self):
+        log = sample_log(10)
+        filepath = self.path("legacy.json")
+        with open(filepath, "w") as json_file:
+            json.dump(json.dumps(log.to_json()), json_file)
+        self.assertEqual(list(iter_json_records(filepath)), log.to_json()["records"])
+
+    def test_ndjson_tail_stops_at_partial_line(self):
+        log = sample_log(10)
+        lines = list(log.iter_record_json())
+        filepath = self.path("log.ndjson")
+        with open(filepath, "w") as ndjson_file:
+            ndjson_file.write("\n".join(lines[:6]) + "\n" + lines[6][:20])
+        events, offset = read_ndjson_tail(filepath)
+        self.assertEqual(len(events), 6)
+
+        with open(filepath, "a") as ndjson_file:
+            ndjson_file.write(lines[6][20:] + "\n" + "\n".join(lines[7:]) + "\n")
+        events, offset = read_ndjson_tail(filepath, offset)
+        self.assertEqual(list(events.timestamps), list(log.timestamps[6:10]))
+        self.assertEqual(offset, os.path.getsize(filepath))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+from array import array
+
+from segment import open_segment, read_segment, read_segment_columns, read_segment_header, \
+    read_segment_start, write_segment
+
+KEYS = ["f", "j", "SPACE", "é"]
+
+
+def columns(count=1000):
+    return {
+        "keys": KEYS,
+        "timestamps": array("d", (1767225600.0 + i * 0.0125 for i in range(count))),
+        "key_ids": array("H", (i % len(KEYS) for i in range(count))),
+        "is_press": array("B", (i % 2 for i in range(count))),
+        "coord_x": array("h", (i - 500 for i in range(count))),
+        "coord_y": array("h", (500 - i for i in range(count))),
+    }
+
+
+class SegmentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_round_trip(self):
+        for name in ("log.bin", "log.bin.gz", "log.bin.bz2", "log.bin.xz"):
+            written = columns()
+            filepath = self.path(name)
+            write_segment(filepath, header={"clock": {"wall_ns": 1}}, **written)
+
+            read = read_segment_columns(filepath)
+            self.assertEqual(read["header"], {"clock": {"wall_ns": 1}, "keys": KEYS})
+            for column in ("timestamps", "key_ids", "is_press", "coord_x", "coord_y"):
+                self.assertEqual(read[column], written[column], f"{name} {column}")
+
+            events = read_segment(filepath)
+            self.assertEqual(events.keys.names, KEYS)
+            self.assertEqual(list(events.timestamps), list(written["timestamps"]))
+            self.assertEqual(read_segment_start(filepath), written["timestamps"][0])
+
+    def test_mapped_segment_matches_read(self):
+        written = columns()
+        filepath = self.path("log.bin")
+        write_segment(filepath, **written)
+        with open_segment(filepath) as mapped:
+            self.assertEqual(len(mapped), len(written["timestamps"]))
+            self.assertEqual(list(mapped.keys), KEYS)
+            self.assertEqual(list(mapped.timestamps), list(written["timestamps"]))
+            self.assertEqual(list(mapped.key_ids), list(written["key_ids"]))
+            self.assertEqual(list(mapped.is_press), list(written["is_press"]))
+
+    def test_empty_segment(self):
+        filepath = self.path("empty.bin")
+        write_segment(filepath, KEYS, array("d"), array("H"), array("B"))
+        self.assertEqual(len(read_segment(filepath)), 0)
+        self.assertIsNone(read_segment_start(filepath))
+
+    def test_summary_start(self):
+        filepath = self.path("day.bin")
+        write_segment(filepath, [], array("d"), array("H"), array("B"),
+                      header={"summary": {"first_timestamp": 12.5}})
+        self.assertEqual(read_segment_header(filepath)["summary"], {"first_timestamp": 12.5})
+        self.assertEqual(read_segment_start(filepath), 12.5)
+
+    def test_rejects_other_files(self):
+        filepath = self.path("garbage.bin")
+        with open(filepath, "wb") as f:
+            f.write(b"not a segment at all")
+        with self.assertRaises(ValueError):
+            read_segment_header(filepath)
+
+    def test_column_length_mismatch(self):
+        written = columns(10)
+        written["key_ids"] = written["key_ids"][:5]
+        with self.assertRaises(ValueError):
+            write_segment(self.path("bad.bin"), **written)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import random
+import statistics
+import unittest
+
+from sketches import SKETCH_K, Distribution, KLLSketch, RunningStats
+
+
+def shuffled(count, seed=0):
+    values = list(range(count))
+    random.Random(seed).shuffle(values)
+    return values
+
+
+class KLLSketchTest(unittest.TestCase):
+
+    def assert_rank_error(self, sketch, count):
+        # The values are 0..count-1, so a value is its own rank
+        for percent in range(1, 100):
+            q = percent / 100
+            error = abs(sketch.quantile(q) - int(q * count)) / count
+            self.assertLessEqual(error, 1.7 / SKETCH_K, f"q={q}")
+
+    def test_rank_error_is_bounded(self):
+        sketch = KLLSketch()
+        for value in shuffled(100_000):
+            sketch.add(value)
+        self.assert_rank_error(sketch, 100_000)
+
+    def test_merged_rank_error_is_bounded(self):
+        values = shuffled(100_000, seed=1)
+        sketches = [KLLSketch() for _ in range(4)]
+        for i, value in enumerate(values):
+            sketches[i % 4].add(value)
+        merged = sketches[0]
+        for sketch in sketches[1:]:
+            merged.merge(sketch)
+        self.assertEqual(len(merged), 100_000)
+        self.assert_rank_error(merged, 100_000)
+
+    def test_small_streams_are_exact(self):
+        values = shuffled(SKETCH_K - 1)
+        sketch = KLLSketch()
+        sketch.extend(values)
+        for q in (0.0, 0.05, 0.5, 0.95, 1.0):
+            self.assertEqual(sketch.quantile(q), sorted(values)[min(int(q * len(values)), len(values) - 1)])
+
+    def test_extend_matches_add(self):
+        values = [random.Random(2).lognormvariate(-2, 0.5) for _ in range(20_000)]
+        one_by_one, batched = KLLSketch(), KLLSketch()
+        for value in values:
+            one_by_one.add(value)
+        for start in range(0, len(values), 777):
+            batched.extend(values[start:start + 777])
+        self.assertEqual(batched.compactors, one_by_one.compactors)
+        self.assertEqual(batched.quantile(0.95), one_by_one.quantile(0.95))
+
+    def test_empty_sketch_has_no_quantile(self):
+        with self.assertRaises(ValueError):
+            KLLSketch().quantile(0.5)
+
+
+class RunningStatsTest(unittest.TestCase):
+
+    def test_add_extend_and_merge_agree(self):
+        values = [random.Random(3).gauss(0.15, 0.04) for _ in range(5_000)]
+        added, extended, merged = RunningStats(), RunningStats(), RunningStats()
+        for value in values:
+            added.add(value)
+        extended.extend(values[:1234])
+        extended.extend(values[1234:])
+        half = RunningStats()
+        half.extend(values[2500:])
+        merged.extend(values[:2500])
+        merged.merge(half)
+        for stats in (added, extended, merged):
+            self.assertEqual(stats.count, len(values))
+            self.assertAlmostEqual(stats.mean, statistics.fmean(values), places=12)
+            self.assertAlmostEqual(stats.stdev, statistics.stdev(values), places=12)
+            self.assertEqual((stats.min, stats.max), (min(values), max(values)))
+
+    def test_distribution_is_falsy_while_empty(self):
+        distribution = Distribution()
+        self.assertFalse(distribution)
+        distribution.extend([0.1, 0.2])
+        self.assertEqual(len(distribution), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,35 @@ def get_timestamp():
     ts = now.strftime('%Y%m%d_%H%M%S')
     return ts
 
+def parse_timestamp(ts):
+    """Parse various timestamp formats to seconds since the epoch."""
+    if isinstance(ts, (float, int)) and not isinstance(ts, bool):
+        return float(ts)  # Return raw timestamp for precision
+    elif isinstance(ts, str):
+        try:
+            dt = datetime.datetime.strptime(ts, "%Y%m%d_%H%M%S")
+            return dt.timestamp()
+        except ValueError:
+            try:
+                dt = datetime.datetime.fromisoformat(ts)
+                return dt.timestamp()
+            except ValueError:
+                return None
+    return None
+
+def parse_count(text):
+    """Integer count from text such as 2500, 10k or 1.5M."""
+    text = text.strip()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+def format_count(count):
+    """Short form of a count (10k, 1M), or the number itself."""
+    for scale, suffix in ((1_000_000, "M"), (1_000, "k")):
+        if count >= scale and count % scale == 0:
+            return f"{count // scale}{suffix}"
+    return str(count)
+
 def print_message(msg):
     ts = get_timestamp()
-    print("[" + ts + "]: " + msg)
\ No newline at end of file
+    print("[" + ts + "]: " + msg)
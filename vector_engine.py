@@ -0,0 +1,175 @@
+"""
+Vectorized press/release pairing and hold-tap timing (NumPy).
+
+The per-event loops in the analyzers keep a dict of currently held keys
+and walk it on every press and release. Here the same quantities are
+derived for the whole event set at once: events are grouped by key id
+with a stable argsort, every release is paired with the last press of
+its key through running maxima of event positions, and the "was another
+key still held" test of a release becomes a range-max query.
+
+Results are the same floats, in the same order, as the loops produce.
+"""
+
+import numpy as np
+
+
+def event_columns(events):
+    """(timestamps, key_ids, is_press) of KeyEvents or a MappedSegment as NumPy arrays.
+
+    Array and memoryview columns are wrapped without copying.
+    """
+    return (
+        np.asarray(events.timestamps, dtype=np.float64),
+        np.asarray(events.key_ids, dtype=np.uint16),
+        np.asarray(events.is_press, dtype=np.uint8).astype(bool),
+    )
+
+
+def concat_columns(chunks, key_table):
+    """Concatenate the columns of several chunks, remapping key ids into key_table."""
+    timestamps, key_ids, is_press = [], [], []
+    for chunk in chunks:
+        remap = np.array([key_table.intern(name) for name in chunk.keys], dtype=np.uint16)
+        chunk_timestamps, chunk_key_ids, chunk_is_press = event_columns(chunk)
+        timestamps.append(chunk_timestamps.copy())
+        key_ids.append(remap[chunk_key_ids] if len(remap) else chunk_key_ids.copy())
+        is_press.append(chunk_is_press)
+        # Drop the views before a mapped chunk gets closed
+        del chunk_timestamps, chunk_key_ids, chunk_is_press
+    if not timestamps:
+        return np.empty(0, np.float64), np.empty(0, np.uint16), np.empty(0, bool)
+    return np.concatenate(timestamps), np.concatenate(key_ids), np.concatenate(is_press)
+
+
+def group_by_key(key_ids):
+    """Permutation that groups events by key id, keeping each key's events in order.
+
+    key_ids should be uint16 (as stored), for which NumPy's stable sort
+    is a radix sort.
+    """
+    return np.argsort(key_ids, kind="stable")
+
+
+def pair_events(key_ids, is_press, order=None):
+    """Pair every release with the press that started its hold.
+
+    Follows the loop semantics: a repeated press restarts the hold, and a
+    release of a key that isn't held is ignored. Returns (press_index,
+    release_index) into the input, ordered by key id and then position.
+    """
+    count = len(key_ids)
+    if order is None:
+        order = group_by_key(key_ids)
+    sorted_ids = key_ids[order]
+    sorted_press = is_press[order]
+    positions = np.arange(count)
+
+    # First position of each key's group, at every position
+    new_group = np.ones(count, dtype=bool)
+    new_group[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    # Last press at or before each position, and last release strictly before it
+    last_press = np.maximum.accumulate(np.where(sorted_press, positions, -1))
+    last_release = np.maximum.accumulate(np.where(sorted_press, -1, positions))
+    previous_release = np.concatenate(([-1], last_release[:-1]))
+
+    paired = ~sorted_press & (last_press >= group_start) & (last_press > previous_release)
+    return order[last_press[paired]], order[positions[paired]]
+
+
+def hold_durations(timestamps, key_ids, is_press, pairs=None):
+    """Return {key_id: durations} of all holds, keys in order of their first release.
+
+    pairs may pass in the result of pair_events for these columns.
+    """
+    press_index, release_index = pairs if pairs is not None else pair_events(key_ids, is_press)
+    durations = timestamps[release_index] - timestamps[press_index]
+    paired_ids = key_ids[release_index]
+
+    # Split the key-ordered pairs into one run per key
+    boundaries = np.flatnonzero(np.diff(paired_ids)) + 1
+    starts = np.concatenate(([0], boundaries))
+    runs = np.split(durations, boundaries)
+    first_release = np.minimum.reduceat(release_index, starts) if len(release_index) else []
+    by_first_release = np.argsort(first_release, kind="stable")
+    return {int(paired_ids[starts[i]]): runs[i] for i in by_first_release}
+
+
+def next_event_index(key_ids, order=None):
+    """Index of the next event of the same key, or len(key_ids) if there is none."""
+    count = len(key_ids)
+    if order is None:
+        order = group_by_key(key_ids)
+    following = np.full(count, count, dtype=np.intp)
+    same_key = key_ids[order[1:]] == key_ids[order[:-1]]
+    following[order[:-1][same_key]] = order[1:][same_key]
+    return following
+
+
+def hrm_timings(timestamps, key_ids, is_press, hrm_ids, order=None, pairs=None):
+    """Tap/hold durations and activation times of the HRM keys.
+
+    Events must be in time order. Returns {hrm_id: (pure_taps, hrm_holds,
+    activation_times)}, the arrays analyze_events collects per key. order
+    and pairs may pass in group_by_key and pair_events of these columns.
+    """
+    count = len(timestamps)
+    positions = np.arange(count)
+    if order is None:
+        order = group_by_key(key_ids)
+    press_index, release_index = pairs if pairs is not None else pair_events(key_ids, is_press, order)
+
+    # A press starts a hold that lasts until that key's next event; the hold
+    # is still going at a release r if that next event comes after r
+    hold_end = np.where(is_press, next_event_index(key_ids, order), -1)
+
+    results = {}
+    for hrm_id in hrm_ids:
+        # Activation: every press of another key while hrm_id is held
+        own_events = key_ids == hrm_id
+        last_own = np.maximum.accumulate(np.where(own_events, positions, -1))
+        held = last_own >= 0
+        held[held] = is_press[last_own[held]]
+        activating = is_press & ~own_events & held
+        activations = timestamps[activating] - timestamps[last_own[activating]]
+
+        pairs = key_ids[release_index] == hrm_id
+        down, up = press_index[pairs], release_index[pairs]
+        durations = timestamps[up] - timestamps[down]
+
+        # Hold: some other key was pressed after hrm_id went down (strictly
+        # later timestamp) and is still held when hrm_id is released
+        first = np.maximum(down + 1, np.searchsorted(timestamps, timestamps[down], side="right"))
+        first = np.minimum(first, up)
+        is_hold = np.zeros(len(up), dtype=bool)
+        if len(up):
+            bounds = np.empty(2 * len(up), dtype=np.intp)
+            bounds[0::2] = first
+            bounds[1::2] = up
+            latest_end = np.maximum.reduceat(hold_end, bounds)[0::2]
+            is_hold = (first < up) & (latest_end > up)
+
+        results[hrm_id] = (durations[~is_hold], durations[is_hold], activations)
+    return results
+
+
+def flight_times(timestamps, key_ids, is_press):
+    """Bigram flight times: release of one key to the press of the next.
+
+    Events must be in time order. Every press is paired with the press
+    that follows it; the flight time is the later press minus the
+    release of the earlier one, negative when the keys overlap (a roll).
+    Presses never released are skipped. Returns (first_ids, second_ids,
+    flights) as parallel arrays in press order.
+    """
+    count = len(timestamps)
+    press_index, release_index = pair_events(key_ids, is_press)
+    released_at = np.full(count, np.nan)
+    released_at[press_index] = timestamps[release_index]
+
+    presses = np.flatnonzero(is_press)
+    first, second = presses[:-1], presses[1:]
+    flights = timestamps[second] - released_at[first]
+    released = ~np.isnan(flights)
+    return key_ids[first[released]], key_ids[second[released]], flights[released]